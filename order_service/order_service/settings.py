@@ -29,12 +29,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'orders.middleware.LoadSheddingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'orders.middleware.ReplicaRoutingMiddleware',
+    'orders.middleware.IdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'order_service.urls'
@@ -68,15 +71,171 @@ else:
     DATABASES = {
         'default': {
             'ENGINE': os.getenv(
-                'DB_ENGINE', default='django.db.backends.postgresql'),
+                'DB_ENGINE', default='orders.backends.postgresql'),
             'NAME': os.getenv('DB_NAME', default='postgres'),
             'USER': os.getenv('POSTGRES_USER', default='postgres'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
             'HOST': os.getenv('DB_HOST', default='db'),
-            'PORT': os.getenv('DB_PORT', default='5432')
+            'PORT': os.getenv('DB_PORT', default='5432'),
+            # С пулом соединение возвращается в пул в конце запроса,
+            # поэтому постоянные соединения Django не нужны (0)
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+            'CONN_HEALTH_CHECKS': True,
+            # Пул на процесс (воркер), см. orders/db_pool.py
+            'POOL': {
+                'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', '0')),
+                'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+                'IDLE_TIMEOUT': int(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')),
+                'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+                'CHECK_AFTER': int(os.getenv('DB_POOL_CHECK_AFTER', '0')),
+            },
         }
     }
 
+# Реплики только для чтения: DB_REPLICA_HOSTS=host1,host2 для PostgreSQL,
+# SQLITE_REPLICA_NAMES=replica.sqlite3 для локальной проверки на SQLite
+if DEBUG:
+    replica_settings = [
+        {**DATABASES['default'], 'NAME': os.path.join(BASE_DIR, name)}
+        for name in os.getenv('SQLITE_REPLICA_NAMES', '').split(',') if name
+    ]
+else:
+    replica_settings = [
+        {**DATABASES['default'], 'HOST': host}
+        for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host
+    ]
+
+REPLICA_DATABASES = []
+for index, replica in enumerate(replica_settings, start=1):
+    DATABASES[f'replica_{index}'] = {**replica, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['orders.routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи клиент читает с основной БД (read-your-writes)
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+# Кэш: общий для всех процессов 'default' (Redis при REDIS_URL, иначе
+# таблица cache_table в БД, создается после migrate) и двухуровневый
+# 'tiered' с LRU в памяти процесса перед 'default' (orders/cache.py)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_table',
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '100000'))},
+    }
+
+CACHES = {
+    'default': SHARED_CACHE,
+    'tiered': {
+        'BACKEND': 'orders.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': int(os.getenv('CACHE_L1_MAX_ENTRIES', '1000')),
+            'L1_TIMEOUT': int(os.getenv('CACHE_L1_TIMEOUT', '5')),
+        },
+    },
+}
+
+# Сколько секунд кэшируются счетчики остатков в ответе /products/stock/
+# (сбрасываются раньше при изменении списка наблюдения)
+STOCK_SUMMARY_TTL = int(os.getenv('STOCK_SUMMARY_TTL', '60'))
+
+# Доставленные и отмененные заказы переносятся в архив через N дней
+# после последнего изменения (команда archive_orders)
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+
+# Сколько секунд кэшируется число заказов клиента в истории заказов
+CUSTOMER_ORDER_COUNT_TTL = int(os.getenv('CUSTOMER_ORDER_COUNT_TTL', '300'))
+
+# Порог «мало на складе» по умолчанию; переопределяется в категории и товаре
+LOW_STOCK_THRESHOLD = int(os.getenv('LOW_STOCK_THRESHOLD', '10'))
+
+# Количество строк-счетчиков остатка для товаров с sharded_stock
+STOCK_SHARDS = int(os.getenv('STOCK_SHARDS', '8'))
+
+# Код страны для телефонов без него (нормализация в orders/customers.py)
+PHONE_DEFAULT_COUNTRY_CODE = os.getenv('PHONE_DEFAULT_COUNTRY_CODE', '7')
+
+# Outbox событий заказов: куда доставляет dispatch_outbox (file:<путь>,
+# http(s)://<url> или путь к классу приемника), размер пачки, аренда
+# пачки диспетчером и предельная пауза перед повтором после ошибки
+OUTBOX_SINK = os.getenv('OUTBOX_SINK', f"file:{BASE_DIR / 'logs' / 'outbox.ndjson'}")
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '100'))
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '30'))
+OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv('OUTBOX_MAX_BACKOFF_SECONDS', '300'))
+OUTBOX_HTTP_TIMEOUT = float(os.getenv('OUTBOX_HTTP_TIMEOUT', '5'))
+
+# Фоновые задачи (run_workers): число процессов-воркеров, время видимости
+# задачи (аренда; после него задача упавшего воркера возвращается в
+# очередь), попытки, предельная пауза между ними и опрос пустой очереди
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', '2'))
+JOBS_VISIBILITY_TIMEOUT = int(os.getenv('JOBS_VISIBILITY_TIMEOUT', '300'))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+JOBS_MAX_BACKOFF_SECONDS = int(os.getenv('JOBS_MAX_BACKOFF_SECONDS', '600'))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', '1'))
+JOBS_EXPORT_DIR = os.getenv('JOBS_EXPORT_DIR', str(BASE_DIR / 'exports'))
+
+# Сброс нагрузки (orders.middleware.LoadSheddingMiddleware), все лимиты на
+# процесс: сколько запросов в обработке допустимо (низкоприоритетные
+# отклоняются уже при половине), задержка БД, выше которой отклоняются
+# низкоприоритетные запросы, и пауза в Retry-After ответа 503
+LOAD_SHEDDING_ENABLED = os.getenv('LOAD_SHEDDING_ENABLED', 'True').lower() == 'true'
+LOAD_SHEDDING_MAX_INFLIGHT = int(os.getenv('LOAD_SHEDDING_MAX_INFLIGHT', '64'))
+LOAD_SHEDDING_DB_LATENCY_MS = float(os.getenv('LOAD_SHEDDING_DB_LATENCY_MS', '250'))
+LOAD_SHEDDING_RETRY_AFTER = int(os.getenv('LOAD_SHEDDING_RETRY_AFTER', '2'))
+# Приоритеты по имени URL или "МЕТОД имя" (high, normal по умолчанию, low) и лимиты
+# одновременных запросов эндпоинта; лимиты переопределяются переменной
+# вида LOAD_SHEDDING_CONCURRENCY="product-stock=4,add-order-item=32"
+LOAD_SHEDDING_PRIORITIES = {
+    'POST order-list': 'high',
+    'add-order-item': 'high',
+    'order-status-update': 'high',
+    'product-stock': 'low',
+    'async-product-stock': 'low',
+    'order-export': 'low',
+}
+LOAD_SHEDDING_CONCURRENCY = {
+    'product-stock': 8,
+    'async-product-stock': 8,
+    'order-export': 2,
+}
+LOAD_SHEDDING_CONCURRENCY.update(
+    (name.strip(), int(limit))
+    for name, limit in (
+        item.split('=', 1)
+        for item in os.getenv('LOAD_SHEDDING_CONCURRENCY', '').split(',') if '=' in item
+    )
+)
+
+# Сколько секунд готовый ответ на одинаковые запросы (orders.coalescing)
+# переиспользуется после вычисления; 0 — только объединение одновременных
+COALESCE_WINDOW_SECONDS = float(os.getenv('COALESCE_WINDOW_SECONDS', '0.5'))
+
+# Снимок цен и остатков горячих товаров для /products/availability/
+# (orders/availability.py): сколько товаров держать в памяти процесса
+# (0 — выключен), как часто перечитывать измененные и как часто все
+AVAILABILITY_SNAPSHOT_SIZE = int(os.getenv('AVAILABILITY_SNAPSHOT_SIZE', '0'))
+AVAILABILITY_SNAPSHOT_REFRESH_SECONDS = float(os.getenv('AVAILABILITY_SNAPSHOT_REFRESH_SECONDS', '1'))
+AVAILABILITY_SNAPSHOT_FULL_REFRESH_SECONDS = float(
+    os.getenv('AVAILABILITY_SNAPSHOT_FULL_REFRESH_SECONDS', '60')
+)
+
+# Idempotency-Key: сколько хранится ответ, сколько повтор ждет выполняющийся
+# запрос с тем же ключом и через сколько незавершенный запрос считается
+# брошенным, если его запись никто не блокирует (например, воркер был перезапущен)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 60 * 60)))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '10'))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '60'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -119,10 +278,27 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'orders.throttling.EndpointThrottle',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# Общие для всех клиентов лимиты эндпоинтов по имени URL или "МЕТОД имя"
+# (скользящее окно, orders/throttling.py); переопределяются переменной вида
+# THROTTLE_ENDPOINT_RATES="add-order-item=6000/min,product-stock=20000/min"
+THROTTLE_ENDPOINT_RATES = {
+    'add-order-item': '6000/min',
+    'POST order-list': '6000/min',
+    'order-status-update': '6000/min',
+    'product-import': '10/min',
+}
+THROTTLE_ENDPOINT_RATES.update(
+    item.strip().split('=', 1)
+    for item in os.getenv('THROTTLE_ENDPOINT_RATES', '').split(',') if '=' in item
+)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -1,14 +1,22 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
+from django.utils import timezone
 from django.db.models import Sum, Count
 
-from .models import Category, Customer, Product, Order, OrderItem
+from . import inventory, outbox
+from .customers import is_phone_query, lookup_customers
+from .search import search_products, search_terms
+from .watchlist import forget_stock_summary
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, Category, Customer, Job, OutboxEvent, Product, Order,
+    OrderItem, StockAlert
+)
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'parent', 'product_count', 'created_at']
+    list_display = ['name', 'parent', 'low_stock_threshold', 'product_count', 'created_at']
     list_filter = ['parent', 'created_at']
     search_fields = ['name']
     readonly_fields = ['created_at', 'updated_at']
@@ -22,45 +30,140 @@ class CategoryAdmin(admin.ModelAdmin):
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ['name', 'email', 'phone', 'order_count', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['name', 'email', 'phone']
+    search_fields = ['name']
     readonly_fields = ['created_at', 'updated_at']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Телефон и email ищутся по нормализованным индексированным полям,
+        # остальное — по имени
+        term = search_term.strip()
+        if is_phone_query(term):
+            customers, _ = lookup_customers(phone=term, queryset=queryset, limit=None)
+        elif '@' in term:
+            customers, _ = lookup_customers(email=term, queryset=queryset, limit=None)
+        else:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=customers.values('pk')), False
     
     def order_count(self, obj):
         return obj.order_set.count()
     order_count.short_description = 'Количество заказов'
 
 
+class StockLevelFilter(admin.SimpleListFilter):
+    """Фильтр по списку наблюдения вместо сравнения остатка по всему каталогу"""
+    title = 'Остаток'
+    parameter_name = 'stock_level'
+
+    def lookups(self, request, model_admin):
+        return StockAlert.Level.choices
+
+    def queryset(self, request, queryset):
+        if self.value() in StockAlert.Level.values:
+            return queryset.filter(stock_alert__level=self.value())
+        return queryset
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = [
-        'name', 'category', 'quantity', 'price', 
-        'stock_status', 'is_active', 'created_at'
+        'name', 'sku', 'category', 'quantity', 'price', 
+        'stock_status', 'is_active', 'sharded_stock', 'created_at'
     ]
-    list_filter = ['category', 'is_active', 'created_at']
-    search_fields = ['name', 'description']
-    readonly_fields = ['created_at', 'updated_at']
+    list_filter = [StockLevelFilter, 'category', 'is_active', 'sharded_stock', 'created_at']
+    list_select_related = ['category', 'stock_alert']
+    search_fields = ['name', 'sku', 'description']
+    readonly_fields = ['sharded_stock', 'created_at', 'updated_at']
     list_editable = ['quantity', 'price', 'is_active']
-    actions = ['activate_products', 'deactivate_products']
+    actions = [
+        'activate_products', 'deactivate_products',
+        'enable_stock_sharding', 'disable_stock_sharding'
+    ]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо icontains по каждому полю
+        if not search_terms(search_term):
+            return queryset, False
+        return search_products(queryset, search_term), False
+
+    def get_readonly_fields(self, request, obj=None):
+        # Остаток шардированного товара меняется только через шарды
+        if obj and obj.sharded_stock:
+            return self.readonly_fields + ['quantity']
+        return self.readonly_fields
+
+    def get_changelist_formset(self, request, **kwargs):
+        formset = super().get_changelist_formset(request, **kwargs)
+
+        class ProductChangelistFormSet(formset):
+            def _construct_form(self, i, **kwargs):
+                form = super()._construct_form(i, **kwargs)
+                # То же в списке: иначе правку перезапишет inventory.reconcile()
+                if form.instance.sharded_stock and 'quantity' in form.fields:
+                    form.fields['quantity'].disabled = True
+                return form
+
+        return ProductChangelistFormSet
     
     def stock_status(self, obj):
-        if obj.quantity == 0:
+        # Уровень из списка наблюдения с учетом порогов товара и категории
+        try:
+            level = obj.stock_alert.level
+        except StockAlert.DoesNotExist:
+            level = None
+        if level == StockAlert.Level.OUT:
             return format_html('<span style="color: red;">❌ Нет в наличии</span>')
-        elif obj.quantity <= 10:
+        elif level == StockAlert.Level.LOW:
             return format_html('<span style="color: orange;">⚠️ Мало</span>')
         else:
             return format_html('<span style="color: green;">✓ В наличии</span>')
     stock_status.short_description = 'Статус'
     
     def activate_products(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = queryset.update(is_active=True, updated_at=timezone.now())
+        # update() не вызывает save(): счетчики остатков считают только активные товары
+        forget_stock_summary()
         self.message_user(request, f'{updated} товаров активировано')
     activate_products.short_description = "Активировать выбранные товары"
     
     def deactivate_products(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, updated_at=timezone.now())
+        # update() не вызывает save(): счетчики остатков считают только активные товары
+        forget_stock_summary()
         self.message_user(request, f'{updated} товаров деактивировано')
     deactivate_products.short_description = "Деактивировать выбранные товары"
 
+    def enable_stock_sharding(self, request, queryset):
+        for product in queryset.filter(sharded_stock=False):
+            inventory.enable_sharding(product)
+        self.message_user(request, 'Остаток выбранных товаров разделен на шарды')
+    enable_stock_sharding.short_description = "Включить шардированный остаток (распродажа)"
+
+    def disable_stock_sharding(self, request, queryset):
+        for product in queryset.filter(sharded_stock=True):
+            inventory.disable_sharding(product)
+        self.message_user(request, 'Остаток выбранных товаров собран обратно')
+    disable_stock_sharding.short_description = "Выключить шардированный остаток"
+
+
+@admin.register(StockAlert)
+class StockAlertAdmin(admin.ModelAdmin):
+    list_display = ['product', 'level', 'product_quantity', 'threshold', 'changed_at']
+    list_filter = ['level']
+    list_select_related = ['product']
+    search_fields = ['product__name', 'product__sku']
+    readonly_fields = ['product', 'level', 'threshold', 'changed_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def product_quantity(self, obj):
+        return obj.product.quantity
+    product_quantity.short_description = 'Остаток'
+
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -111,12 +214,12 @@ class OrderAdmin(admin.ModelAdmin):
     items_count.short_description = 'Товаров'
     
     def mark_as_processing(self, request, queryset):
-        updated = queryset.update(status=Order.Status.PROCESSING)
+        updated = outbox.change_order_status(queryset, Order.Status.PROCESSING)
         self.message_user(request, f'{updated} заказов переведено в обработку')
     mark_as_processing.short_description = "Перевести в обработку"
     
     def mark_as_shipped(self, request, queryset):
-        updated = queryset.update(status=Order.Status.SHIPPED)
+        updated = outbox.change_order_status(queryset, Order.Status.SHIPPED)
         self.message_user(request, f'{updated} заказов переведено в отправленные')
     mark_as_shipped.short_description = "Перевести в отправленные"
 
@@ -137,6 +240,72 @@ class OrderItemAdmin(admin.ModelAdmin):
     total_price.short_description = 'Общая стоимость'
 
 
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    fields = ['product', 'quantity', 'unit_price', 'created_at']
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Архив только для просмотра: заказы попадают сюда командой archive_orders"""
+    list_display = ['id', 'customer', 'status', 'total_amount', 'created_at', 'archived_at']
+    list_filter = ['status', 'archived_at']
+    search_fields = ['customer__name', 'id']
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    """События пишутся изменениями заказов и отправляются командой dispatch_outbox"""
+    list_display = ['id', 'event_type', 'aggregate_id', 'created_at', 'attempts', 'dispatched_at']
+    list_filter = ['event_type', ('dispatched_at', admin.EmptyFieldListFilter)]
+    search_fields = ['aggregate_id']
+    readonly_fields = [field.name for field in OutboxEvent._meta.fields]
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def retry_now(self, request, queryset):
+        updated = queryset.filter(dispatched_at__isnull=True).update(available_at=timezone.now())
+        self.message_user(request, f'{updated} событий будут отправлены при следующем запуске')
+    retry_now.short_description = "Отправить повторно без ожидания"
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Задачи ставятся в очередь через API или jobs.enqueue и выполняются run_workers"""
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'task']
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ['requeue']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def requeue(self, request, queryset):
+        updated = queryset.filter(status=Job.Status.FAILED).update(
+            status=Job.Status.QUEUED, attempts=0, available_at=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f'{updated} задач возвращено в очередь')
+    requeue.short_description = "Вернуть неудачные задачи в очередь"
+
+
 admin.site.site_header = "Order Service Administration"
 admin.site.site_title = "Order Service Admin"
 admin.site.index_title = "Добро пожаловать в панель управления"
\ No newline at end of file
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        # Регистрация провайдеров метрик и фоновых задач
+        from . import availability, cache, db_pool, jobs, outbox, shedding, tasks  # noqa: F401
+        from .cache import ensure_cache_table
+        from .search import ensure_search_index
+
+        post_migrate.connect(ensure_search_index, sender=self)
+        post_migrate.connect(ensure_cache_table, sender=self)
@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVABLE_STATUSES = [Order.Status.DELIVERED, Order.Status.CANCELLED]
+
+ORDER_FIELDS = ['id', 'customer_id', 'status', 'total_amount', 'notes', 'created_at', 'updated_at']
+ITEM_FIELDS = ['id', 'order_id', 'product_id', 'quantity', 'unit_price', 'created_at']
+
+
+def archivable_orders(days):
+    """Доставленные и отмененные заказы, не менявшиеся дольше days дней"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, updated_at__lt=cutoff)
+
+
+def archive_batch(days, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Переносит одну пачку заказов вместе с позициями в архивные таблицы
+    в одной транзакции. Заблокированные другими транзакциями заказы
+    пропускаются и попадут в следующий запуск. Возвращает число
+    перенесенных заказов.
+    """
+    with transaction.atomic():
+        order_ids = list(
+            archivable_orders(days)
+            .select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return 0
+
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(**row)
+            for row in Order.objects.filter(id__in=order_ids).values(*ORDER_FIELDS)
+        ])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(**row)
+            for row in OrderItem.objects.filter(order_id__in=order_ids).values(*ITEM_FIELDS)
+        ])
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(id__in=order_ids).delete()
+        return len(order_ids)
+
+
+def archive_orders(days=None, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None, pause=0):
+    """
+    Архивирует заказы пачками, пока они не закончатся или не исчерпан
+    max_batches. pause — пауза между пачками в секундах, чтобы не
+    нагружать основную БД.
+    """
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        archived = archive_batch(days, batch_size)
+        if not archived:
+            break
+        total += archived
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return total
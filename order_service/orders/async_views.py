@@ -0,0 +1,187 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .fieldsets import (
+    PRODUCT_COLUMNS, parse_fields, parse_order_fieldsets,
+    shape_order_queryset, shape_product_queryset
+)
+from .filters import MAX_PAGE_SIZE, filter_orders, ordering_warnings, parse_order_filters
+from .middleware import primary_pinned
+from .models import ArchivedOrder, Order, Product
+from .serializers import ArchivedOrderDetailSerializer, OrderDetailSerializer, ProductStockSerializer
+from .coalescing import request_scope
+from .watchlist import STOCK_LISTING, stock_levels, stock_listing_key, stock_summary
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False,
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def invalid_fields(error):
+    return json_response({
+        'error': 'Invalid fields parameter',
+        'details': str(error)
+    }, status=400)
+
+
+class AsyncAPIView(View):
+    """
+    Асинхронный аналог APIView только для чтения: аутентификация выполняется
+    классами DRF, обработчики используют асинхронный ORM Django.
+    """
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+
+    async def dispatch(self, request, *args, **kwargs):
+        drf_request = Request(
+            request,
+            authenticators=[auth() for auth in self.authentication_classes]
+        )
+        def authenticate():
+            user = drf_request.user
+            # Закрепление за основной БД запоминается на запросе здесь же:
+            # проверка читает общий кэш, который может храниться в БД
+            primary_pinned(request)
+            return user
+
+        try:
+            user = await sync_to_async(authenticate)()
+        except exceptions.APIException as e:
+            return json_response({'detail': str(e.detail)}, status=e.status_code)
+
+        if not user or not user.is_authenticated:
+            return json_response(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=403
+            )
+
+        self.user = user
+        self.query_params = drf_request.query_params
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncOrderDetailView(AsyncAPIView):
+    async def get(self, request, order_id):
+        try:
+            fields, item_fields = parse_order_fieldsets(self.query_params, archived=True)
+        except ValueError as e:
+            return invalid_fields(e)
+
+        try:
+            nested_fields = {'items': item_fields}
+            order = await (
+                shape_order_queryset(Order.objects.all(), fields, item_fields)
+                .filter(id=order_id)
+                .afirst()
+            )
+            if order is not None:
+                return json_response(
+                    OrderDetailSerializer(order, fields=fields, nested_fields=nested_fields).data
+                )
+
+            archived_order = await (
+                shape_order_queryset(ArchivedOrder.objects.all(), fields, item_fields)
+                .aget(id=order_id)
+            )
+            return json_response(
+                ArchivedOrderDetailSerializer(archived_order, fields=fields, nested_fields=nested_fields).data
+            )
+
+        except Exception as e:
+            logger.error(f"Error retrieving order {order_id}: {str(e)}")
+            return json_response({
+                'error': 'Error retrieving order'
+            }, status=404)
+
+
+class AsyncOrderListView(AsyncAPIView):
+    async def get(self, request):
+        try:
+            filters, ordering = parse_order_filters(self.query_params)
+            fields, item_fields = parse_order_fieldsets(self.query_params)
+            page = int(self.query_params.get('page', 1))
+            page_size = min(int(self.query_params.get('page_size', 20)), MAX_PAGE_SIZE)
+            if page < 1 or page_size < 1:
+                raise ValueError("page and page_size must be positive")
+        except ValueError as e:
+            return json_response({
+                'error': 'Invalid list parameters',
+                'details': str(e)
+            }, status=400)
+
+        try:
+            orders = filter_orders(Order.objects.all(), filters, ordering)
+
+            start = (page - 1) * page_size
+            end = start + page_size
+
+            # aiterator() не поддерживает prefetch_related в Django 4.2,
+            # поэтому страница выбирается асинхронной итерацией по QuerySet
+            paginated_orders = [
+                order async for order in shape_order_queryset(orders[start:end], fields, item_fields)
+            ]
+            total_orders = await orders.acount()
+
+            data = {
+                'orders': OrderDetailSerializer(
+                    paginated_orders, many=True, fields=fields, nested_fields={'items': item_fields}
+                ).data,
+                'page': page,
+                'page_size': page_size,
+                'total_orders': total_orders,
+                'has_next': end < total_orders
+            }
+            warnings = ordering_warnings(filters, ordering)
+            if warnings:
+                data['warnings'] = warnings
+            return json_response(data)
+
+        except Exception as e:
+            logger.error(f"Error listing orders: {str(e)}")
+            return json_response({
+                'error': 'Error retrieving orders list'
+            }, status=500)
+
+
+class AsyncProductStockView(AsyncAPIView):
+    async def get(self, request):
+        try:
+            fields = parse_fields(self.query_params.get('fields'), list(PRODUCT_COLUMNS))
+        except ValueError as e:
+            return invalid_fields(e)
+
+        try:
+            levels = stock_levels(self.query_params)
+            key = stock_listing_key(levels, fields, request_scope(request, self.user))
+            return json_response(
+                await STOCK_LISTING.arun(key, lambda: self.listing(levels, fields))
+            )
+
+        except Exception as e:
+            logger.error(f"Error retrieving product stock: {str(e)}")
+            return json_response({
+                'error': 'Error retrieving product stock'
+            }, status=500)
+
+    async def listing(self, levels, fields):
+        products = Product.objects.filter(is_active=True)
+        for level in levels:
+            products = products.filter(stock_alert__level=level)
+
+        product_list = [product async for product in shape_product_queryset(products, fields).aiterator()]
+        return {
+            'products': ProductStockSerializer(product_list, many=True, fields=fields).data,
+            'total_count': len(product_list),
+            # Счетчики читают список наблюдения (через кэш), а не весь каталог
+            **await sync_to_async(stock_summary)(*levels)
+        }
@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models
+from django.db.models.functions import Coalesce
+
+from . import metrics
+from .models import Product, ProductStockShard
+
+# Сколько позиций можно проверить одним запросом /products/availability/
+MAX_QUOTE_LINES = 200
+
+# Инкрементальное обновление перечитывает товары, измененные чуть раньше
+# прошлого обновления: updated_at ставят часы разных серверов приложения
+SNAPSHOT_OVERLAP = timedelta(seconds=5)
+
+QUOTE_COLUMNS = ('id', 'price', 'stock', 'is_active', 'sharded_stock', 'updated_at')
+
+
+def quote_rows(product_ids):
+    """
+    Цена, остаток и активность товаров одним запросом по id. Остаток
+    шардированного товара — сумма шардов (подзапрос), а не отстающее
+    Product.quantity.
+    """
+    shards_total = (
+        ProductStockShard.objects.filter(product=models.OuterRef('pk'))
+        .values('product')
+        .annotate(total=models.Sum('quantity'))
+        .values('total')
+    )
+    rows = Product.objects.filter(id__in=product_ids).annotate(
+        stock=models.Case(
+            models.When(
+                sharded_stock=True,
+                then=Coalesce(models.Subquery(shards_total), models.Value(0)),
+            ),
+            default=models.F('quantity'),
+        )
+    ).values_list(*QUOTE_COLUMNS)
+    return {row[0]: dict(zip(QUOTE_COLUMNS, row)) for row in rows}
+
+
+class HotSkuSnapshot:
+    """
+    Цены и остатки самых запрашиваемых товаров в памяти процесса
+    (AVAILABILITY_SNAPSHOT_SIZE, 0 — выключен). Раз в
+    AVAILABILITY_SNAPSHOT_REFRESH_SECONDS перечитываются только товары,
+    измененные с прошлого обновления (по updated_at), и товары, ставшие
+    горячими; раз в AVAILABILITY_SNAPSHOT_FULL_REFRESH_SECONDS — все, чтобы
+    подхватить изменения через QuerySet.update(). Шардированные товары не
+    хранятся: их остаток меняется без записи в products.
+
+    Ответ по снимку может отставать на интервал обновления; окончательная
+    проверка остатка выполняется при добавлении товара в заказ.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+            self._requests = Counter()
+            self._watermark = None
+            self._refreshed_at = None
+            self._full_refreshed_at = None
+            self.stats = {
+                'hits': 0, 'misses': 0, 'refreshes': 0, 'full_refreshes': 0, 'rows_loaded': 0,
+            }
+
+    @property
+    def size(self):
+        return settings.AVAILABILITY_SNAPSHOT_SIZE
+
+    def lookup(self, product_ids):
+        """Строки снимка для product_ids; запросы учитываются при выборе горячих товаров"""
+        with self._lock:
+            self._requests.update(product_ids)
+            found = {pk: self._entries[pk] for pk in product_ids if pk in self._entries}
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(product_ids) - len(found)
+            return found
+
+    def refresh(self, now=None):
+        """Обновляет снимок, если подошел срок; одновременно — не больше одного потока"""
+        now = time.monotonic() if now is None else now
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                if self._refreshed_at is not None and (
+                    now - self._refreshed_at < settings.AVAILABILITY_SNAPSHOT_REFRESH_SECONDS
+                ):
+                    return False
+                full = self._watermark is None or self._full_refreshed_at is None or (
+                    now - self._full_refreshed_at >= settings.AVAILABILITY_SNAPSHOT_FULL_REFRESH_SECONDS
+                )
+                hot = {pk for pk, _ in self._requests.most_common(self.size)}
+                known = hot & set(self._entries)
+                watermark = self._watermark
+
+            products = Product.objects.filter(id__in=hot)
+            if not full:
+                changed = models.Q(id__in=known, updated_at__gte=watermark - SNAPSHOT_OVERLAP)
+                products = Product.objects.filter(models.Q(id__in=hot - known) | changed)
+            rows = quote_rows(products.values('id')) if hot else {}
+
+            with self._lock:
+                entries = {} if full else {pk: row for pk, row in self._entries.items() if pk in hot}
+                for pk, row in rows.items():
+                    if row['sharded_stock']:
+                        entries.pop(pk, None)
+                    else:
+                        entries[pk] = row
+                self._entries = entries
+                seen = [row['updated_at'] for row in rows.values()]
+                if watermark is not None:
+                    seen.append(watermark)
+                self._watermark = max(seen, default=None)
+                self._refreshed_at = now
+                self.stats['refreshes'] += 1
+                self.stats['rows_loaded'] += len(rows)
+                if full:
+                    self._full_refreshed_at = now
+                    self.stats['full_refreshes'] += 1
+                    # Старые запросы весят меньше, чтобы горячие товары менялись
+                    self._requests = Counter({
+                        pk: count // 2 for pk, count in self._requests.most_common(self.size * 4)
+                        if count > 1
+                    })
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def snapshot(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.size, **self.stats}
+
+
+snapshot = HotSkuSnapshot()
+
+
+def quote(lines):
+    """
+    Доступность позиций корзины: lines — список {'product_id', 'quantity'}.
+    Несколько строк одного товара проверяются по суммарному количеству.
+    Товары читаются из снимка горячих товаров, остальные — одним запросом.
+    """
+    product_ids = list(dict.fromkeys(line['product_id'] for line in lines))
+    rows = {}
+    # Внутри транзакции снимок не читается и не заполняется: он общий
+    # для процесса, а данные транзакции могут быть откачены
+    if snapshot.size and not connection.in_atomic_block:
+        snapshot.refresh()
+        rows = snapshot.lookup(product_ids)
+    missing = [pk for pk in product_ids if pk not in rows]
+    if missing:
+        rows.update(quote_rows(missing))
+
+    demand = Counter()
+    for line in lines:
+        demand[line['product_id']] += line['quantity']
+
+    quoted = []
+    for line in lines:
+        row = rows.get(line['product_id'])
+        if row is None:
+            reason = 'not_found'
+        elif not row['is_active']:
+            reason = 'inactive'
+        elif row['stock'] < demand[line['product_id']]:
+            reason = 'insufficient_stock'
+        else:
+            reason = None
+        quoted.append({
+            'product_id': line['product_id'],
+            'quantity': line['quantity'],
+            'available': reason is None,
+            'reason': reason,
+            'is_active': row['is_active'] if row else None,
+            'price': row['price'] if row else None,
+            'available_quantity': row['stock'] if row else None,
+            'line_total': row['price'] * line['quantity'] if row else None,
+        })
+    return quoted
+
+
+def availability_stats():
+    """Попадания и обновления снимка горячих товаров текущего процесса"""
+    return snapshot.snapshot()
+
+
+metrics.register('availability', availability_stats)
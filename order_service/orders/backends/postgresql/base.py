@@ -0,0 +1,55 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2 import extensions
+
+from orders.db_pool import get_pool
+
+
+def check_connection(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def reset_connection(connection):
+    if connection.closed:
+        raise ValueError('Connection is closed')
+    if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        # Незавершенная транзакция откатывается; у сломанного соединения
+        # rollback() выбросит исключение и пул его закроет
+        connection.rollback()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений на уровне процесса: close() возвращает
+    соединение в пул, новое соединение берется из пула. Настройки пула
+    задаются в DATABASES[alias]['POOL'].
+    """
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias,
+            self.settings_dict.get('POOL') or {},
+            check=check_connection,
+            reset=reset_connection,
+        )
+
+    def get_unpooled_connection(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.checkout(partial(self.get_unpooled_connection, conn_params))
+        # Уровень изоляции выставляется при создании соединения и одинаков
+        # для всех соединений пула
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.checkin(self.connection)
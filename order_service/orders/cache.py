@@ -0,0 +1,286 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.management import call_command
+from django.db import connection
+
+from . import metrics
+
+_MISSING = object()
+
+# Сколько ждать значения, которое пересчитывает другой процесс, прежде
+# чем посчитать его самостоятельно
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+
+class L1Store:
+    """
+    LRU-словарь в памяти процесса с ограничением числа записей и временем
+    жизни каждой записи. Один на процесс для каждого двухуровневого кэша:
+    django.core.cache.caches создает экземпляр бэкенда на каждый поток.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'l1_hits': 0, 'l2_hits': 0, 'misses': 0,
+            'evictions': 0, 'expirations': 0, 'sets': 0,
+        }
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.stats['expirations'] += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'entries': len(self._data), 'max_entries': self.max_entries, **self.stats}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Двухуровневый кэш: L1 в памяти процесса (LRU, OPTIONS L1_MAX_ENTRIES
+    и L1_TIMEOUT) перед общим L2 — другим кэшем из CACHES, alias которого
+    указан в LOCATION. Запись идет в оба уровня, удаление сбрасывает L1
+    только текущего процесса, поэтому другие процессы видят изменение
+    не позже чем через L1_TIMEOUT.
+
+    Внутри транзакции L1 не читается и не заполняется: значение могло
+    быть вычислено из данных, которые еще будут откачены.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location or 'default'
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        with _stores_lock:
+            self._l1 = _stores.setdefault(
+                self._l2_alias, L1Store(options.get('L1_MAX_ENTRIES', 1000))
+            )
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_enabled(self):
+        return self._l1_timeout > 0 and not connection.in_atomic_block
+
+    def _remember(self, key, value, timeout):
+        if not self._l1_enabled() or (timeout is not None and timeout <= 0):
+            self._l1.delete(key)
+            return
+        self._l1.set(key, value, self._l1_timeout if timeout is None else min(timeout, self._l1_timeout))
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        if self._l1_enabled():
+            value = self._l1.get(l1_key)
+            if value is not _MISSING:
+                self._l1.count('l1_hits')
+                return value
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._l1.count('misses')
+            return default
+        self._l1.count('l2_hits')
+        self._remember(l1_key, value, None)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self.l2.set(key, value, timeout, version=version)
+        self._l1.count('sets')
+        self._remember(self.make_and_validate_key(key, version=version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1.count('sets')
+            self._remember(self.make_and_validate_key(key, version=version), value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._l1.delete(self.make_and_validate_key(key, version=version))
+        return self.l2.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self._l1.delete(self.make_and_validate_key(key, version=version))
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        self._l1.clear()
+        self.l2.clear()
+
+    def stats(self):
+        return self._l1.snapshot()
+
+
+_single_flight = {'computes': 0, 'coalesced': 0, 'remote_waits': 0}
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _count(name):
+    with _inflight_lock:
+        _single_flight[name] += 1
+
+
+def _acquire_key_lock(key):
+    with _inflight_lock:
+        entry = _inflight.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    return entry
+
+
+def _release_key_lock(key, entry):
+    with _inflight_lock:
+        entry[1] -= 1
+        if not entry[1]:
+            _inflight.pop(key, None)
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, using='tiered',
+                   lock_timeout=SINGLE_FLIGHT_LOCK_TIMEOUT):
+    """
+    Значение из кэша или результат compute(). При промахе значение
+    вычисляет один поток процесса, а между процессами — тот, кто первым
+    занял ключ-блокировку в общем кэше; остальные ждут готового значения
+    до lock_timeout секунд, а не пересчитывают его одновременно.
+    """
+    cache = caches[using]
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    entry = _acquire_key_lock(key)
+    try:
+        with entry[0]:
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                _count('coalesced')
+                return value
+            return _compute_once(cache, key, compute, timeout, lock_timeout)
+    finally:
+        _release_key_lock(key, entry)
+
+
+def _compute_once(cache, key, compute, timeout, lock_timeout):
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, lock_timeout)
+    if not locked:
+        _count('remote_waits')
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        # Процесс, занявший ключ, не успел или упал: считаем сами
+
+    try:
+        _count('computes')
+        value = compute()
+        cache.set(key, value, timeout)
+        return value
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+class Namespace:
+    """
+    Версионированное пространство ключей: invalidate() меняет версию, и все
+    ранее записанные ключи пространства перестают читаться разом (старые
+    значения вытесняются по TTL).
+    """
+
+    def __init__(self, name, using='tiered'):
+        self.name = name
+        self.using = using
+        self._version_key = f'{name}:version'
+
+    def version(self):
+        cache = caches[self.using]
+        version = cache.get(self._version_key)
+        if version is None:
+            cache.add(self._version_key, time.time_ns(), None)
+            version = cache.get(self._version_key)
+        return version
+
+    def key(self, *parts):
+        return ':'.join([self.name, str(self.version()), *map(str, parts)])
+
+    def invalidate(self):
+        caches[self.using].set(self._version_key, time.time_ns(), None)
+
+    def get_or_compute(self, parts, compute, timeout=DEFAULT_TIMEOUT):
+        return get_or_compute(self.key(*parts), compute, timeout, using=self.using)
+
+
+def ensure_cache_table(using='default', **kwargs):
+    """Создает таблицу DatabaseCache после migrate (команда идемпотентна)"""
+    call_command('createcachetable', database=using, verbosity=0)
+
+
+def cache_stats():
+    """Метрики двухуровневых кэшей процесса и single-flight"""
+    with _stores_lock:
+        stores = dict(_stores)
+    with _inflight_lock:
+        single_flight = dict(_single_flight, inflight=len(_inflight))
+    return {
+        'tiers': {alias: store.snapshot() for alias, store in stores.items()},
+        'single_flight': single_flight,
+    }
+
+
+metrics.register('cache', cache_stats)
@@ -0,0 +1,110 @@
+from collections import Counter
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from . import inventory, outbox
+from .models import Order, OrderItem, Product
+from .watchlist import sync_watchlist
+
+# Сколько разных товаров можно передать при создании заказа
+MAX_ORDER_LINES = 100
+
+
+class OrderLineError(Exception):
+    """Позиции заказа, которые нельзя оформить; details — по товарам"""
+
+    def __init__(self, message, details):
+        super().__init__(message)
+        self.details = details
+
+
+def check_active(product_ids, products):
+    unavailable = [pk for pk in product_ids if pk not in products or not products[pk].is_active]
+    if unavailable:
+        raise OrderLineError('Products do not exist or are not active', [
+            {'product_id': pk} for pk in unavailable
+        ])
+
+
+def create_order(customer, lines, notes=''):
+    """
+    Создает заказ со всеми позициями в одной транзакции: строки обычных
+    товаров блокируются в порядке id (параллельные заказы с общими
+    товарами не взаимоблокируются), остаток списывается одним UPDATE,
+    позиции — одним bulk_create с ценой товара на момент заказа, сумма
+    заказа записывается один раз при вставке. Остаток шардированных
+    товаров резервируется по шардам (orders/inventory.py).
+
+    lines — список {'product_id', 'quantity'}; строки одного товара
+    складываются. OrderLineError, если товара нет, он неактивен или его
+    не хватает — тогда ничего не записывается.
+    """
+    demand = Counter()
+    for line in lines:
+        demand[line['product_id']] += line['quantity']
+    product_ids = sorted(demand)
+
+    with transaction.atomic():
+        products = {
+            product.id: product
+            for product in Product.objects.filter(id__in=product_ids, is_active=True).order_by('id')
+        }
+        check_active(product_ids, products)
+
+        plain_ids = [pk for pk in product_ids if not products[pk].sharded_stock]
+        if plain_ids:
+            # Повторное чтение под блокировкой: остаток мог измениться, а товар —
+            # стать неактивным или шардированным
+            locked = Product.objects.select_for_update().filter(id__in=plain_ids).order_by('id')
+            products.update({product.id: product for product in locked})
+            check_active(plain_ids, products)
+            plain_ids = [pk for pk in plain_ids if not products[pk].sharded_stock]
+
+        shortages = [
+            {'product_id': pk, 'available': products[pk].quantity, 'requested': demand[pk]}
+            for pk in plain_ids if products[pk].quantity < demand[pk]
+        ]
+        if shortages:
+            raise OrderLineError('Insufficient stock', shortages)
+
+        for pk in product_ids:
+            if products[pk].sharded_stock:
+                try:
+                    inventory.reserve(pk, demand[pk])
+                except inventory.InsufficientStock as e:
+                    raise OrderLineError('Insufficient stock', [
+                        {'product_id': pk, 'available': e.available, 'requested': e.requested}
+                    ])
+
+        if plain_ids:
+            Product.objects.filter(id__in=plain_ids).update(
+                quantity=models.Case(
+                    *[models.When(id=pk, then=models.F('quantity') - demand[pk]) for pk in plain_ids],
+                    default=models.F('quantity'),
+                ),
+                updated_at=timezone.now(),
+            )
+            # UPDATE не вызывает save(): список наблюдения пересчитывается отдельно
+            sync_watchlist(Product.objects.filter(id__in=plain_ids))
+
+        order = Order.objects.create(
+            customer=customer,
+            notes=notes,
+            total_amount=sum(products[pk].price * demand[pk] for pk in product_ids),
+        )
+        items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[pk], quantity=demand[pk], unit_price=products[pk].price)
+            for pk in product_ids
+        ])
+
+        outbox.publish(outbox.ORDER_CREATED, order, {
+            'order_id': order.id,
+            'customer_id': customer.id,
+            'items': [
+                {'product_id': item.product_id, 'quantity': item.quantity, 'unit_price': item.unit_price}
+                for item in items
+            ],
+            'order_total': order.total_amount,
+        })
+    return order, items
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+from .middleware import primary_pinned
+
+_coalescers = {}
+_registry_lock = threading.Lock()
+
+
+class _Call:
+    """Вычисление в процессе выполнения, которого ждут совпадающие запросы"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Coalescer:
+    """
+    Объединение одинаковых запросов в процессе: пока ответ по ключу
+    вычисляется, совпадающие запросы ждут его, а не выполняют те же
+    запросы к БД и сериализацию; готовый ответ переиспользуется еще
+    COALESCE_WINDOW_SECONDS. Возвращаемое значение общее для всех
+    запросов и не должно изменяться.
+
+    Внутри транзакции запросы не объединяются: ответ мог бы включить
+    данные, которые еще будут откачены.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._async_inflight = {}
+        self._recent = {}
+        self.stats = {'requests': 0, 'computes': 0, 'coalesced': 0, 'reused': 0}
+        with _registry_lock:
+            _coalescers[name] = self
+
+    def _reuse(self, key, now):
+        entry = self._recent.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            del self._recent[key]
+            return False, None
+        self.stats['reused'] += 1
+        return True, entry[1]
+
+    def _remember(self, key, value, now):
+        window = settings.COALESCE_WINDOW_SECONDS
+        if window <= 0:
+            return
+        # Истекшие записи удаляются при следующей записи, а не по таймеру
+        for stale in [k for k, (expires_at, _) in self._recent.items() if expires_at <= now]:
+            del self._recent[stale]
+        self._recent[key] = (now + window, value)
+
+    def run(self, key, compute):
+        """Результат compute() для ключа, общий для одновременных запросов"""
+        if connection.in_atomic_block:
+            return compute()
+        with self._lock:
+            self.stats['requests'] += 1
+            reused, value = self._reuse(key, time.monotonic())
+            if reused:
+                return value
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self.stats['coalesced'] += 1
+        if not leader:
+            return call.wait()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+            raise
+        with self._lock:
+            self.stats['computes'] += 1
+            del self._inflight[key]
+            self._remember(key, value, time.monotonic())
+        call.value = value
+        call.done.set()
+        return value
+
+    async def arun(self, key, compute):
+        """Асинхронный вариант run() для корутины compute()"""
+        if connection.in_atomic_block:
+            return await compute()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.stats['requests'] += 1
+        while True:
+            with self._lock:
+                reused, value = self._reuse(key, time.monotonic())
+                if reused:
+                    return value
+                future = self._async_inflight.get(key)
+                # Future привязан к циклу событий, ждать можно только в своем
+                leader = future is None or future.get_loop() is not loop
+                if leader:
+                    future = self._async_inflight[key] = loop.create_future()
+                else:
+                    self.stats['coalesced'] += 1
+            if leader:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Отменен запрос ведущего (клиент отключился), а не этот:
+                # повторяем, и один из ожидающих становится ведущим
+                if not future.cancelled():
+                    raise
+                with self._lock:
+                    self.stats['coalesced'] -= 1
+
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            with self._lock:
+                self._async_inflight.pop(key, None)
+            future.cancel()
+            raise
+        except Exception as e:
+            with self._lock:
+                self._async_inflight.pop(key, None)
+            future.set_exception(e)
+            # Исключение уже передано вызывающему; ожидающих может не быть
+            future.exception()
+            raise
+        with self._lock:
+            self.stats['computes'] += 1
+            self._async_inflight.pop(key, None)
+            self._remember(key, value, time.monotonic())
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        """Забывает готовые ответы (например, после изменения данных в тестах)"""
+        with self._lock:
+            self._recent.clear()
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats, inflight=len(self._inflight) + len(self._async_inflight))
+        shared = stats['coalesced'] + stats['reused']
+        stats['ratio'] = round(shared / stats['requests'], 4) if stats['requests'] else 0.0
+        return stats
+
+
+def request_scope(request, user):
+    """
+    Часть ключа, от которой зависят видимые данные: права пользователя и
+    закрепление за основной БД после записи (ответ с реплики может не
+    содержать его изменений).
+    """
+    return (
+        'staff' if user.is_staff else 'user',
+        'primary' if primary_pinned(request) else 'replica',
+    )
+
+
+def coalescing_stats():
+    """Доля запросов, получивших чужой ответ (ratio), по объединителям"""
+    with _registry_lock:
+        coalescers = dict(_coalescers)
+    return {name: coalescer.snapshot() for name, coalescer in sorted(coalescers.items())}
+
+
+metrics.register('coalescing', coalescing_stats)
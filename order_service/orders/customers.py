@@ -0,0 +1,92 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from .models import Customer
+
+LOOKUP_LIMIT = 20
+E164_MAX_DIGITS = 15
+
+
+def normalize_phone(value):
+    """
+    Приводит телефон к цифрам E.164 без «+»: 8 (916) 123-45-67 -> 79161234567.
+    Номер без кода страны (10 цифр) дополняется PHONE_DEFAULT_COUNTRY_CODE.
+    """
+    digits = re.sub(r'\D', '', value or '')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    country_code = settings.PHONE_DEFAULT_COUNTRY_CODE
+    if country_code == '7' and len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    elif len(digits) == 10:
+        digits = country_code + digits
+    return digits[:E164_MAX_DIGITS]
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def phone_prefixes(value):
+    """Варианты префикса для частично введенного номера"""
+    digits = re.sub(r'\D', '', value or '')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if not digits:
+        return []
+    country_code = settings.PHONE_DEFAULT_COUNTRY_CODE
+    prefixes = {digits}
+    if country_code == '7' and digits.startswith('8'):
+        prefixes.add('7' + digits[1:])
+    if not digits.startswith(country_code):
+        # Номер мог быть введен без кода страны
+        prefixes.add(country_code + digits)
+    return sorted(prefix[:E164_MAX_DIGITS] for prefix in prefixes)
+
+
+def prefix_q(field, prefix, vendor):
+    """Условие «начинается с», использующее индекс на текущей СУБД"""
+    if vendor == 'sqlite':
+        # LIKE ... ESCAPE в SQLite не использует индекс, а диапазон использует
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+    return Q(**{f'{field}__startswith': prefix})
+
+
+def is_phone_query(value):
+    return bool(re.fullmatch(r'[\d\s()+\-.]+', value or '')) and bool(re.search(r'\d', value))
+
+
+def lookup_customers(phone=None, email=None, queryset=None, limit=LOOKUP_LIMIT):
+    """
+    Ищет клиентов по нормализованному телефону или email: сначала точное
+    совпадение, при его отсутствии — по префиксу. Возвращает
+    (queryset, 'exact' | 'prefix').
+    """
+    if queryset is None:
+        queryset = Customer.objects.all()
+    vendor = connections[queryset.db].vendor
+
+    if phone:
+        field = 'phone_normalized'
+        exact = normalize_phone(phone)
+        prefixes = phone_prefixes(phone)
+    else:
+        field = 'email_normalized'
+        exact = normalize_email(email)
+        prefixes = [exact] if exact else []
+
+    if exact:
+        exact_matches = queryset.filter(**{field: exact}).order_by('id')
+        if exact_matches.exists():
+            return exact_matches[:limit], 'exact'
+
+    condition = Q()
+    for prefix in prefixes:
+        condition |= prefix_q(field, prefix, vendor)
+    if not condition:
+        return queryset.none(), 'prefix'
+    return queryset.filter(condition).order_by(field, 'id')[:limit], 'prefix'
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from collections import deque
+
+from . import metrics
+
+LATENCY_SAMPLES = 1000
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений с ограничением размера, максимальным
+    временем жизни соединения, проверкой при выдаче и закрытием простаивающих
+    соединений.
+
+    connect() создает новое соединение, check(conn) проверяет его перед
+    выдачей, reset(conn) возвращает соединение в чистое состояние при
+    возврате в пул. Исключение в check/reset приводит к закрытию соединения.
+    """
+
+    def __init__(self, connect, max_size=10, min_size=0, max_lifetime=1800,
+                 idle_timeout=300, timeout=30, check=None, check_after=0, reset=None):
+        self.connect = connect
+        self.max_size = max_size
+        self.min_size = min_size
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.check = check
+        self.check_after = check_after
+        self.reset = reset
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, created_at, last_used_at)
+        self._in_use = {}  # conn -> created_at
+        self._size = 0
+        self._waiting = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._counters = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_closed': 0,
+            'failed_checks': 0,
+        }
+
+    def checkout(self, connect=None):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            conn, created_at, last_used = self._acquire(deadline)
+            if conn is None:
+                try:
+                    conn = (connect or self.connect)()
+                except Exception:
+                    self._release_slot()
+                    raise
+                created_at = time.monotonic()
+                with self._cond:
+                    self._counters['connections_created'] += 1
+            elif self.check and time.monotonic() - last_used >= self.check_after:
+                try:
+                    self.check(conn)
+                except Exception:
+                    self._close(conn)
+                    with self._cond:
+                        self._counters['failed_checks'] += 1
+                    self._release_slot()
+                    continue
+
+            with self._cond:
+                self._in_use[conn] = created_at
+                self._counters['checkouts'] += 1
+                self._latencies.append(time.monotonic() - started)
+            return conn
+
+    def checkin(self, conn, discard=False):
+        with self._cond:
+            created_at = self._in_use.pop(conn, None)
+        if created_at is None:
+            # Соединение не из этого пула
+            self._close(conn)
+            return
+
+        expired = time.monotonic() - created_at >= self.max_lifetime
+        if not discard and not expired and self.reset:
+            try:
+                self.reset(conn)
+            except Exception:
+                discard = True
+
+        if discard or expired:
+            self._close(conn)
+            self._release_slot()
+            return
+
+        with self._cond:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+        self.reap()
+
+    def reap(self):
+        """Закрывает соединения, простаивающие дольше idle_timeout"""
+        now = time.monotonic()
+        stale = []
+        with self._cond:
+            # Самые давно использованные соединения в начале очереди
+            while (self._idle and self._size - len(stale) > self.min_size
+                   and now - self._idle[0][2] >= self.idle_timeout):
+                stale.append(self._idle.popleft()[0])
+            self._size -= len(stale)
+            self._counters['connections_closed'] += len(stale)
+            if stale:
+                self._cond.notify(len(stale))
+        for conn in stale:
+            self._close(conn, count=False)
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            latencies = sorted(self._latencies)
+            stats = {
+                'size': self._size,
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                **self._counters,
+            }
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+        stats['checkout_latency_ms'] = {
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'max': percentile(1.0),
+        }
+        return stats
+
+    def _acquire(self, deadline):
+        """Возвращает свободное соединение или (None, ...) с занятым слотом под новое"""
+        expired = []
+        try:
+            with self._cond:
+                self._waiting += 1
+                try:
+                    while True:
+                        now = time.monotonic()
+                        while self._idle:
+                            # LIFO: последнее возвращенное соединение самое «теплое»
+                            conn, created_at, last_used = self._idle.pop()
+                            if now - created_at < self.max_lifetime:
+                                return conn, created_at, last_used
+                            expired.append(conn)
+                            self._size -= 1
+
+                        if self._size < self.max_size:
+                            self._size += 1
+                            return None, None, None
+
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._counters['timeouts'] += 1
+                            raise PoolTimeout(
+                                f"No connection available within {self.timeout}s "
+                                f"(max_size={self.max_size})"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+        finally:
+            for conn in expired:
+                self._close(conn)
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _close(self, conn, count=True):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        if count:
+            with self._cond:
+                self._counters['connections_closed'] += 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options, **kwargs):
+    """
+    Пул соединений для алиаса БД в текущем процессе. После fork воркера
+    создается новый пул: соединения родителя не переиспользуются.
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = ConnectionPool(
+                connect=kwargs.pop('connect', None),
+                max_size=options.get('MAX_SIZE', 10),
+                min_size=options.get('MIN_SIZE', 0),
+                max_lifetime=options.get('MAX_LIFETIME', 1800),
+                idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                timeout=options.get('TIMEOUT', 30),
+                check_after=options.get('CHECK_AFTER', 0),
+                **kwargs
+            )
+            _pools[alias] = pool
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+metrics.register('db_pool', pool_stats)
@@ -0,0 +1,145 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Order, OrderItem
+from .pagination import keyset_q
+
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_FIELDS = [
+    'id', 'created_at', 'updated_at', 'status', 'total_amount', 'notes',
+    'customer_id', 'customer__name', 'customer__email',
+]
+
+CSV_HEADER = [
+    'order_id', 'created_at', 'status', 'customer_id', 'customer_name',
+    'customer_email', 'total_amount', 'product_id', 'product_name',
+    'quantity', 'unit_price',
+]
+
+
+def parse_period_boundary(value, end_of_day=False):
+    """
+    Разбирает границу периода: дату или дату-время в ISO 8601.
+    Для даты в качестве конца периода берется начало следующего дня.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date or datetime: {value}")
+        if end_of_day:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_checkpoint(created_at, order_id):
+    """Контрольная точка (created_at, id) для продолжения выгрузки"""
+    if not created_at and not order_id:
+        return None
+    moment = parse_datetime(created_at or '')
+    if moment is None or not str(order_id or '').isdigit():
+        raise ValueError("Checkpoint requires after_created_at (ISO datetime) and after_id")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment, int(order_id)
+
+
+def export_queryset(date_from=None, date_to=None, after=None):
+    """Заказы за период в порядке (created_at, id), начиная после контрольной точки"""
+    orders = Order.objects.order_by('created_at', 'id').values(*ORDER_FIELDS)
+    if date_from:
+        orders = orders.filter(created_at__gte=date_from)
+    if date_to:
+        orders = orders.filter(created_at__lt=date_to)
+    if after:
+        orders = orders.filter(keyset_q(*after))
+    # Генератор выгрузки выполняется после выхода из middleware,
+    # поэтому БД (реплика или основная) выбирается сейчас
+    return orders.using(orders.db)
+
+
+def iter_orders_with_items(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Читает заказы через iterator() (server-side cursor на PostgreSQL) и
+    подгружает позиции одним запросом на каждую пачку из chunk_size заказов.
+    """
+    rows = orders.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        items_by_order = {}
+        items = (
+            OrderItem.objects.using(orders.db)
+            .filter(order_id__in=[row['id'] for row in chunk])
+            .order_by('order_id', 'id')
+            .values('order_id', 'product_id', 'product__name', 'quantity', 'unit_price')
+        )
+        for item in items:
+            items_by_order.setdefault(item['order_id'], []).append(item)
+
+        for row in chunk:
+            yield row, items_by_order.get(row['id'], [])
+
+
+def ndjson_lines(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    for row, items in iter_orders_with_items(orders, chunk_size):
+        record = {
+            'id': row['id'],
+            'created_at': row['created_at'].isoformat(),
+            'updated_at': row['updated_at'].isoformat(),
+            'status': row['status'],
+            'customer_id': row['customer_id'],
+            'customer_name': row['customer__name'],
+            'customer_email': row['customer__email'],
+            'total_amount': row['total_amount'],
+            'notes': row['notes'],
+            'items': [
+                {
+                    'product_id': item['product_id'],
+                    'product_name': item['product__name'],
+                    'quantity': item['quantity'],
+                    'unit_price': item['unit_price'],
+                }
+                for item in items
+            ],
+        }
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row, items in iter_orders_with_items(orders, chunk_size):
+        order_columns = [
+            row['id'], row['created_at'].isoformat(), row['status'],
+            row['customer_id'], row['customer__name'], row['customer__email'],
+            row['total_amount'],
+        ]
+        if not items:
+            yield writer.writerow(order_columns + [''] * 4)
+        for item in items:
+            yield writer.writerow(order_columns + [
+                item['product_id'], item['product__name'],
+                item['quantity'], item['unit_price'],
+            ])
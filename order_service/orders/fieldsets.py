@@ -0,0 +1,129 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+
+# Колонки, которые нужны каждому полю ответа: по ним строятся only(),
+# select_related() и prefetch, поэтому лишние колонки и JOIN не читаются
+ORDER_COLUMNS = {
+    'id': [],
+    'customer_name': ['customer__name'],
+    'customer_email': ['customer__email'],
+    'status': ['status'],
+    'status_display': ['status'],
+    'total_amount': ['total_amount'],
+    'notes': ['notes'],
+    'created_at': ['created_at'],
+    'updated_at': ['updated_at'],
+    'archived_at': ['archived_at'],
+    'items': [],
+}
+
+ORDER_ITEM_COLUMNS = {
+    'id': [],
+    'product_id': ['product_id'],
+    'product_name': ['product__name'],
+    'quantity': ['quantity'],
+    'unit_price': ['unit_price'],
+    'total_price': ['quantity', 'unit_price'],
+}
+
+PRODUCT_COLUMNS = {
+    'id': [],
+    'name': ['name'],
+    'quantity': ['quantity'],
+    'price': ['price'],
+    'in_stock': ['quantity'],
+    'low_stock': ['stock_alert__level'],
+    'category_name': ['category__name'],
+    'is_active': ['is_active'],
+}
+
+
+class SparseFieldsMixin:
+    """
+    Сериализатор с выбором полей: fields — список полей ответа,
+    nested_fields — списки полей вложенных сериализаторов, например
+    {'items': ['product_id', 'quantity']}. None — все поля.
+    """
+
+    def __init__(self, *args, fields=None, nested_fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name, subfields in (nested_fields or {}).items():
+            if name in self.fields and subfields is not None:
+                nested = self.fields[name]
+                nested = getattr(nested, 'child', nested)
+                for subname in set(nested.fields) - set(subfields):
+                    nested.fields.pop(subname)
+
+
+def parse_fields(value, allowed):
+    """
+    Список полей из параметра вида "id,status,items". None, если параметр
+    не передан; ValueError для пустого списка или неизвестных полей.
+    """
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names:
+        raise ValueError("fields must not be empty")
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return names
+
+
+def parse_order_fieldsets(params, archived=False):
+    """
+    Поля заказа (fields) и позиций (fields[items]). archived_at допустимо
+    только там, где заказ может быть прочитан из архива.
+    """
+    allowed = [name for name in ORDER_COLUMNS if archived or name != 'archived_at']
+    return (
+        parse_fields(params.get('fields'), allowed),
+        parse_fields(params.get('fields[items]'), list(ORDER_ITEM_COLUMNS)),
+    )
+
+
+def _columns(mapping, fields):
+    columns = set()
+    for name in mapping if fields is None else fields:
+        columns.update(mapping.get(name, []))
+    return columns
+
+
+def _shape(queryset, mapping, fields, *extra):
+    model = queryset.model
+    columns = set(extra)
+    for column in _columns(mapping, fields):
+        try:
+            model._meta.get_field(column.split('__')[0])
+        except FieldDoesNotExist:
+            # Например, archived_at есть только у архивных заказов
+            continue
+        columns.add(column)
+    related = sorted({column.split('__')[0] for column in columns if '__' in column})
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only('pk', *related, *columns)
+
+
+def shape_order_queryset(queryset, fields=None, item_fields=None):
+    """
+    Ограничивает запрос заказов колонками запрошенных полей. Клиент
+    присоединяется только для customer_*, позиции подгружаются только для
+    items, товар — только для product_name (JOIN в запросе позиций вместо
+    отдельного prefetch).
+    """
+    queryset = _shape(queryset, ORDER_COLUMNS, fields)
+    if fields is None or 'items' in fields:
+        item_model = queryset.model._meta.get_field('items').related_model
+        items = _shape(item_model.objects.all(), ORDER_ITEM_COLUMNS, item_fields, 'order')
+        queryset = queryset.prefetch_related(Prefetch('items', queryset=items))
+    return queryset
+
+
+def shape_product_queryset(queryset, fields=None):
+    """Ограничивает запрос товаров колонками запрошенных полей"""
+    return _shape(queryset, PRODUCT_COLUMNS, fields)
@@ -0,0 +1,131 @@
+from decimal import Decimal, InvalidOperation
+
+from .exports import parse_period_boundary
+from .models import Order
+
+# Допустимые значения ordering: каждое обслуживается своим индексом
+ORDERINGS = ['created_at', '-created_at', 'total_amount', '-total_amount', 'status', '-status']
+DEFAULT_ORDERING = '-created_at'
+MAX_PAGE_SIZE = 100
+# Сколько заказов можно запросить одним запросом /orders/batch/
+MAX_BATCH_IDS = 200
+
+# Фильтры, при которых сортировка идет по тому же индексу, что и отбор:
+# created_at — индексы (created_at, id) и (customer, created_at, id, ...),
+# total_amount — (total_amount, id), status — (status, id)
+ORDERING_FILTERS = {
+    'created_at': {'created_after', 'created_before', 'customer'},
+    'total_amount': {'min_total', 'max_total'},
+    'status': {'status'},
+}
+
+
+def _parse_amount(name, value):
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"{name} must be a number")
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    return amount
+
+
+def parse_order_ids(value):
+    """
+    Идентификаторы заказов из строки "1,2,3" или списка (тело POST) без
+    повторов, в порядке запроса; ValueError, если их нет, они не целые
+    положительные или их больше MAX_BATCH_IDS.
+    """
+    if isinstance(value, str):
+        value = [part.strip() for part in value.split(',') if part.strip()]
+    if not isinstance(value, list) or not value:
+        raise ValueError("ids must be a non-empty list of order ids")
+    ids = []
+    for item in value:
+        if isinstance(item, bool) or not (
+            isinstance(item, int) or (isinstance(item, str) and item.isdigit())
+        ) or int(item) < 1:
+            raise ValueError(f"Invalid order id: {item}")
+        ids.append(int(item))
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} ids per request, got {len(ids)}")
+    return ids
+
+
+def parse_order_filters(params):
+    """
+    Проверяет параметры списка заказов. Возвращает (filters, ordering);
+    ValueError с описанием первой ошибки.
+    """
+    filters = {}
+
+    status = params.get('status')
+    if status:
+        if status not in Order.Status.values:
+            raise ValueError(f"Unknown status: {status}")
+        filters['status'] = status
+
+    created_after = parse_period_boundary(params.get('created_after'))
+    if created_after:
+        filters['created_after'] = created_after
+    created_before = parse_period_boundary(params.get('created_before'), end_of_day=True)
+    if created_before:
+        filters['created_before'] = created_before
+
+    customer = params.get('customer')
+    if customer:
+        if not customer.isdigit():
+            raise ValueError("customer must be an integer")
+        filters['customer'] = int(customer)
+
+    for name in ('min_total', 'max_total'):
+        if params.get(name):
+            filters[name] = _parse_amount(name, params[name])
+
+    if created_after and created_before and created_after >= created_before:
+        raise ValueError("created_after must be earlier than created_before")
+    if 'min_total' in filters and 'max_total' in filters and filters['min_total'] > filters['max_total']:
+        raise ValueError("min_total must not exceed max_total")
+
+    ordering = params.get('ordering') or DEFAULT_ORDERING
+    if ordering not in ORDERINGS:
+        raise ValueError(f"ordering must be one of: {', '.join(ORDERINGS)}")
+
+    return filters, ordering
+
+
+def filter_orders(queryset, filters, ordering=DEFAULT_ORDERING):
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    if 'created_after' in filters:
+        queryset = queryset.filter(created_at__gte=filters['created_after'])
+    if 'created_before' in filters:
+        queryset = queryset.filter(created_at__lt=filters['created_before'])
+    if 'customer' in filters:
+        queryset = queryset.filter(customer_id=filters['customer'])
+    if 'min_total' in filters:
+        queryset = queryset.filter(total_amount__gte=filters['min_total'])
+    if 'max_total' in filters:
+        queryset = queryset.filter(total_amount__lte=filters['max_total'])
+    # id в конце делает порядок однозначным: иначе при равных status или
+    # total_amount страницы OFFSET-пагинации повторяют и теряют заказы
+    return queryset.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
+
+
+def ordering_warnings(filters, ordering):
+    """
+    Предупреждения о сочетаниях, которые не обслуживаются одним индексом:
+    отобранные по одному индексу строки приходится сортировать целиком
+    перед выдачей страницы.
+    """
+    if not filters:
+        return []
+    column = ordering.lstrip('-')
+    if set(filters) & ORDERING_FILTERS[column]:
+        return []
+    return [
+        f"Ordering by {column} with filters {', '.join(sorted(filters))} "
+        f"sorts all matching orders; filter by "
+        f"{' or '.join(sorted(ORDERING_FILTERS[column]))} or change ordering"
+    ]
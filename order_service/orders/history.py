@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ArchivedOrder, Order
+from .pagination import keyset_q
+from .routers import primary_reads
+
+SUMMARY_FIELDS = ['id', 'status', 'total_amount', 'created_at', 'updated_at']
+
+
+def order_count_key(customer_id):
+    return f'customer_order_count:{customer_id}'
+
+
+def forget_order_count(customer_id):
+    # После фиксации, как forget_stock_summary(): до нее счетчик пересчитали
+    # бы без нового заказа
+    key = order_count_key(customer_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def customer_order_count(customer_id):
+    """
+    Число заказов клиента вместе с архивом. Хранится в кэше
+    CUSTOMER_ORDER_COUNT_TTL секунд и сбрасывается при создании заказа;
+    перенос в архив общее число не меняет.
+    """
+    key = order_count_key(customer_id)
+    count = cache.get(key)
+    if count is None:
+        # С основной БД: ключ сбрасывается сразу после фиксации заказа, и
+        # отстающая реплика сохранила бы старое число на весь TTL
+        with primary_reads():
+            count = (
+                Order.objects.filter(customer_id=customer_id).count()
+                + ArchivedOrder.objects.filter(customer_id=customer_id).count()
+            )
+        cache.set(key, count, settings.CUSTOMER_ORDER_COUNT_TTL)
+    return count
+
+
+def _page_keys(model, customer_id, after, limit, status, date_from, date_to):
+    """
+    Ключи (created_at, id) следующей страницы. Читаются только колонки
+    индекса (customer, created_at, id, status), поэтому на PostgreSQL это
+    Index Only Scan по диапазону.
+    """
+    keys = model.objects.filter(customer_id=customer_id)
+    if status:
+        keys = keys.filter(status=status)
+    if date_from:
+        keys = keys.filter(created_at__gte=date_from)
+    if date_to:
+        keys = keys.filter(created_at__lt=date_to)
+    if after:
+        keys = keys.filter(keyset_q(*after, descending=True))
+    return list(keys.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit])
+
+
+def customer_order_page(customer_id, after=None, page_size=20, status=None, date_from=None, date_to=None):
+    """
+    Страница истории заказов клиента, от новых к старым, начиная после
+    курсора after = (created_at, id). Действующие и архивные заказы читаются
+    одинаковым диапазоном по индексу и сливаются по ключу. Возвращает
+    (заказы, ключ последнего заказа или None, если страница последняя).
+    """
+    filters = (customer_id, after, page_size + 1, status, date_from, date_to)
+    keys = [(created_at, pk, False) for created_at, pk in _page_keys(Order, *filters)]
+    keys += [(created_at, pk, True) for created_at, pk in _page_keys(ArchivedOrder, *filters)]
+    keys.sort(key=lambda key: (key[0], key[1]), reverse=True)
+
+    has_next = len(keys) > page_size
+    keys = keys[:page_size]
+
+    # Строки страницы дочитываются по первичному ключу
+    rows = {}
+    for model, archived in ((Order, False), (ArchivedOrder, True)):
+        ids = [pk for _, pk, is_archived in keys if is_archived == archived]
+        if ids:
+            for row in model.objects.filter(id__in=ids).values(*SUMMARY_FIELDS):
+                rows[row['id'], archived] = dict(row, archived=archived)
+
+    orders = [rows[pk, archived] for _, pk, archived in keys if (pk, archived) in rows]
+    last = (keys[-1][0], keys[-1][1]) if has_next else None
+    return orders, last
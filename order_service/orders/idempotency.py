@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+
+def request_fingerprint(request):
+    """Хэш метода, пути и тела запроса: ключ нельзя переиспользовать для другого запроса"""
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{payload}'.encode()).hexdigest()
+
+
+def claim(user, key, fingerprint):
+    """
+    Пытается занять ключ. Возвращает (record, True), если запрос нужно
+    выполнить, или (record, False) с уже существующей записью.
+    """
+    now = timezone.now()
+    while True:
+        # Сначала чтение: повтор обслуживается одним запросом к БД
+        record = IdempotencyRecord.objects.filter(user=user, key=key).first()
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyRecord.objects.create(
+                        user=user,
+                        key=key,
+                        fingerprint=fingerprint,
+                        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                    )
+                return record, True
+            except IntegrityError:
+                # Параллельный запрос занял ключ первым
+                continue
+
+        stale = (
+            record.status == IdempotencyRecord.Status.IN_PROGRESS
+            and record.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+        )
+        if record.expires_at > now and not (stale and abandoned(record)):
+            return record, False
+        # Истекшая или брошенная запись освобождается; при гонке ключ
+        # достанется одному из запросов
+        IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+
+
+def abandoned(record):
+    """
+    Давно незавершенная запись брошена, если ее строку никто не блокирует.
+
+    Владелец ключа держит блокировку записи до коммита вместе с изменениями
+    обработчика, поэтому после падения воркера от запроса ничего не осталось
+    в БД и его можно выполнить заново. Медленный, но живой запрос держит
+    блокировку, и его запись не трогаем.
+    """
+    try:
+        with transaction.atomic():
+            IdempotencyRecord.objects.select_for_update(nowait=True).filter(pk=record.pk).first()
+    except DatabaseError:
+        return False
+    return True
+
+
+def wait_for_result(record):
+    """Ожидает завершения запроса с тем же ключом, выполняющегося параллельно"""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while record is not None and record.status == IdempotencyRecord.Status.IN_PROGRESS:
+        if time.monotonic() >= deadline:
+            return record
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyRecord.objects.filter(pk=record.pk).first()
+    return record
+
+
+def replay(record):
+    return Response(
+        record.response_body,
+        status=record.response_status,
+        headers={REPLAYED_HEADER: 'true'}
+    )
+
+
+def idempotent(view_method):
+    """
+    Поддержка заголовка Idempotency-Key для изменяющих методов APIView.
+
+    Первый ответ (кроме 5xx) сохраняется в IdempotencyRecord в одной
+    транзакции с изменениями обработчика, повторы с тем же ключом получают
+    его без выполнения обработчика. Повтор, пришедший во время выполнения
+    первого запроса, ждет его результата.
+    """
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = claim(request.user, key, fingerprint)
+
+        if not claimed:
+            if record.fingerprint != fingerprint:
+                return Response({
+                    'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'
+                }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+            record = wait_for_result(record)
+            if record is None:
+                # Первый запрос завершился ошибкой, ключ освобожден
+                return wrapper(view, request, *args, **kwargs)
+            if record.status == IdempotencyRecord.Status.IN_PROGRESS:
+                return Response({
+                    'error': 'A request with this Idempotency-Key is still in progress'
+                }, status=status.HTTP_409_CONFLICT)
+
+            logger.info(f"Replayed response for {IDEMPOTENCY_HEADER} {key} by user {request.user.username}")
+            return replay(record)
+
+        try:
+            with transaction.atomic():
+                # Запись заблокирована до коммита: сохраненный ответ фиксируется
+                # вместе с изменениями обработчика или откатывается с ними
+                IdempotencyRecord.objects.select_for_update().filter(pk=record.pk).first()
+                response = view_method(view, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                else:
+                    record.status = IdempotencyRecord.Status.COMPLETED
+                    record.response_status = response.status_code
+                    record.response_body = response.data
+                    record.save(update_fields=['status', 'response_status', 'response_body'])
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            # Ошибку сервера можно повторить с тем же ключом
+            record.delete()
+        return response
+
+    return wrapper
+
+
+def purge_expired():
+    """Удаляет истекшие записи, возвращает их количество"""
+    deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
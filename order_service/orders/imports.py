@@ -0,0 +1,231 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+
+from .models import Category, Product
+from .watchlist import forget_stock_summary, sync_watchlist
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+PRODUCT_UPDATE_FIELDS = [
+    'name', 'description', 'quantity', 'price', 'category', 'is_active', 'updated_at'
+]
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+
+class RowError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class CategoryIndex:
+    """
+    Индекс категорий в памяти: по полному пути («Родитель > Дочерняя»)
+    и по имени. Загружается одним запросом на весь импорт.
+    """
+
+    PATH_SEPARATOR = ' > '
+
+    def __init__(self):
+        rows = {
+            category_id: (name, parent_id)
+            for category_id, name, parent_id in Category.objects.values_list('id', 'name', 'parent_id')
+        }
+        self.by_path = {}
+        self.by_name = {}
+        for category_id, (name, _) in rows.items():
+            self.by_path[self._path(category_id, rows).lower()] = category_id
+            key = name.lower()
+            # Одинаковые имена в разных ветках разрешаются только по пути
+            self.by_name[key] = None if key in self.by_name else category_id
+
+    def _path(self, category_id, rows):
+        names = []
+        seen = set()
+        while category_id is not None and category_id not in seen:
+            seen.add(category_id)
+            name, category_id = rows[category_id]
+            names.append(name)
+        return self.PATH_SEPARATOR.join(reversed(names))
+
+    def resolve(self, value):
+        key = self.PATH_SEPARATOR.join(part.strip() for part in value.split('>')).lower()
+        if key in self.by_path:
+            return self.by_path[key]
+        if key not in self.by_name:
+            raise ValueError(f"Unknown category: {value}")
+        if self.by_name[key] is None:
+            raise ValueError(f"Ambiguous category name, use full path: {value}")
+        return self.by_name[key]
+
+
+def read_csv_rows(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson_rows(lines):
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = e
+        yield line_num, row
+
+
+READERS = {
+    'csv': read_csv_rows,
+    'ndjson': read_ndjson_rows,
+}
+
+
+class ProductImporter:
+    """
+    Потоковый импорт каталога: строки проверяются по правилам
+    check_quantity_positive/check_price_positive до обращения к БД и
+    записываются пачками через bulk_create(update_conflicts=True) по SKU.
+    Ошибочные строки попадают в отчет и не прерывают импорт.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.categories = CategoryIndex()
+        self.pending = {}
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def run(self, lines, input_format):
+        for line_num, row in READERS[input_format](lines):
+            try:
+                product = self.build_product(row)
+            except RowError as e:
+                self.add_error(line_num, row, e.errors)
+                continue
+            self.pending[product.sku] = (line_num, product)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        self.flush()
+        return self.report()
+
+    def add_error(self, line_num, row, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            sku = row.get('sku') if isinstance(row, dict) else None
+            self.errors.append({'line': line_num, 'sku': sku, 'errors': errors})
+
+    def build_product(self, row):
+        if not isinstance(row, dict):
+            raise RowError({'row': f"Invalid JSON: {row}"})
+
+        errors = {}
+        values = {}
+
+        def text(field, max_length, required=True):
+            value = str(row.get(field) or '').strip()
+            if required and not value:
+                errors[field] = 'This field is required'
+            elif len(value) > max_length:
+                errors[field] = f'Ensure this field has no more than {max_length} characters'
+            return value
+
+        values['sku'] = text('sku', 64)
+        values['name'] = text('name', 255)
+        values['description'] = text('description', 10000, required=False)
+
+        try:
+            values['quantity'] = int(str(row.get('quantity', '')).strip())
+            if values['quantity'] < 0:
+                errors['quantity'] = 'check_quantity_positive: quantity must be >= 0'
+        except ValueError:
+            errors['quantity'] = 'A valid integer is required'
+
+        try:
+            price = Decimal(str(row.get('price', '')).strip())
+            if not price.is_finite():
+                raise InvalidOperation
+            if price < 0:
+                errors['price'] = 'check_price_positive: price must be >= 0'
+            elif price != price.quantize(Decimal('0.01')) or price >= Decimal('100000000'):
+                errors['price'] = 'Ensure there are no more than 8 digits before and 2 after the decimal point'
+            values['price'] = price
+        except InvalidOperation:
+            errors['price'] = 'A valid number is required'
+
+        category = str(row.get('category') or '').strip()
+        if not category:
+            errors['category'] = 'This field is required'
+        else:
+            try:
+                values['category_id'] = self.categories.resolve(category)
+            except ValueError as e:
+                errors['category'] = str(e)
+
+        is_active = row.get('is_active')
+        if is_active is None:
+            is_active = True
+        elif isinstance(is_active, str):
+            flag = is_active.strip().lower()
+            if flag in TRUE_VALUES or flag == '':
+                is_active = True
+            elif flag in FALSE_VALUES:
+                is_active = False
+        if not isinstance(is_active, bool):
+            errors['is_active'] = 'Must be a valid boolean'
+        values['is_active'] = is_active
+
+        if errors:
+            raise RowError(errors)
+        return Product(**values)
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+
+        existing = dict(
+            Product.objects.filter(sku__in=list(batch)).values_list('sku', 'is_active')
+        )
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create(
+                    [product for _, product in batch.values()],
+                    update_conflicts=True,
+                    unique_fields=['sku'],
+                    update_fields=PRODUCT_UPDATE_FIELDS,
+                )
+                # bulk_create не вызывает save(): список наблюдения
+                # пересчитывается для пачки одним проходом
+                sync_watchlist(Product.objects.filter(sku__in=list(batch)))
+                # Счетчики остатков считают только активные товары: смена
+                # is_active меняет их и без изменения строк списка
+                if any(
+                    sku in existing and existing[sku] != product.is_active
+                    for sku, (_, product) in batch.items()
+                ):
+                    forget_stock_summary()
+        except DatabaseError as e:
+            for line_num, product in batch.values():
+                self.add_error(line_num, {'sku': product.sku}, {'row': str(e)})
+            return
+
+        self.updated += len(existing)
+        self.created += len(batch) - len(existing)
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
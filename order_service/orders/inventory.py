@@ -0,0 +1,138 @@
+import random
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+
+from .models import Product, ProductStockShard
+from .watchlist import sync_watchlist
+
+
+class InsufficientStock(Exception):
+    def __init__(self, available, requested):
+        super().__init__(f"Available: {available}, requested: {requested}")
+        self.available = available
+        self.requested = requested
+
+
+def split_quantity(quantity, shards):
+    """Равномерно делит остаток на shards частей"""
+    base, extra = divmod(quantity, shards)
+    return [base + (1 if n < extra else 0) for n in range(shards)]
+
+
+def enable_sharding(product, shards=None):
+    """Переводит товар в режим шардированного остатка"""
+    shards = shards or settings.STOCK_SHARDS
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        if product.sharded_stock:
+            return product
+        ProductStockShard.objects.bulk_create([
+            ProductStockShard(product=product, shard=n, quantity=quantity)
+            for n, quantity in enumerate(split_quantity(product.quantity, shards))
+        ])
+        product.sharded_stock = True
+        product.save(update_fields=['sharded_stock', 'updated_at'])
+    return product
+
+
+def disable_sharding(product):
+    """Собирает остаток обратно в Product.quantity и удаляет шарды"""
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        if not product.sharded_stock:
+            return product
+        shards = ProductStockShard.objects.select_for_update().filter(product=product)
+        product.quantity = sum(shard.quantity for shard in shards)
+        shards.delete()
+        product.sharded_stock = False
+        product.save(update_fields=['quantity', 'sharded_stock', 'updated_at'])
+    return product
+
+
+def available_quantity(product_id):
+    """Точный остаток шардированного товара (сумма по шардам)"""
+    return ProductStockShard.objects.filter(product_id=product_id).aggregate(
+        total=Coalesce(models.Sum('quantity'), 0)
+    )['total']
+
+
+def reserve(product_id, quantity):
+    """
+    Списывает quantity с остатка шардированного товара. Выполняется внутри
+    транзакции вызывающего кода.
+
+    Сначала списание идет одним условным UPDATE со случайного шарда, где
+    хватает остатка: параллельные покупатели одного товара блокируют разные
+    строки. Если ни в одном шарде не хватает остатка целиком, шарды
+    блокируются по порядку и списание распределяется по ним.
+    """
+    candidates = [
+        shard for shard, shard_quantity in
+        ProductStockShard.objects.filter(product_id=product_id).values_list('shard', 'quantity')
+        if shard_quantity >= quantity
+    ]
+    random.shuffle(candidates)
+    shards = ProductStockShard.objects.filter(product_id=product_id)
+    for shard in candidates:
+        updated = shards.filter(shard=shard, quantity__gte=quantity).update(
+            quantity=models.F('quantity') - quantity
+        )
+        if updated:
+            return
+
+    # Блокировка в порядке номеров шардов исключает взаимоблокировки
+    locked = list(shards.select_for_update().filter(quantity__gt=0).order_by('shard'))
+    available = sum(shard.quantity for shard in locked)
+    if available < quantity:
+        raise InsufficientStock(available, quantity)
+
+    remaining = quantity
+    for shard in locked:
+        taken = min(shard.quantity, remaining)
+        shard.quantity -= taken
+        shard.save(update_fields=['quantity'])
+        remaining -= taken
+        if not remaining:
+            break
+
+
+def reconcile(products=None):
+    """
+    Пересчитывает Product.quantity шардированных товаров как сумму шардов
+    одним UPDATE и обновляет для них список наблюдения. Возвращает число
+    обновленных товаров.
+    """
+    if products is None:
+        products = Product.objects.all()
+    shards_total = (
+        ProductStockShard.objects.filter(product=models.OuterRef('pk'))
+        .values('product')
+        .annotate(total=models.Sum('quantity'))
+        .values('total')
+    )
+    sharded = products.filter(sharded_stock=True)
+    updated = sharded.update(
+        quantity=Coalesce(models.Subquery(shards_total), models.Value(0))
+    )
+    sync_watchlist(sharded)
+    return updated
+
+
+def rebalance(product):
+    """Выравнивает остаток между шардами, чтобы реже срабатывал медленный путь"""
+    with transaction.atomic():
+        shards = list(
+            ProductStockShard.objects.select_for_update().filter(product=product).order_by('shard')
+        )
+        if not shards:
+            return 0
+        quantities = split_quantity(sum(shard.quantity for shard in shards), len(shards))
+        changed = []
+        for shard, quantity in zip(shards, quantities):
+            if shard.quantity != quantity:
+                shard.quantity = quantity
+                changed.append(shard)
+        ProductStockShard.objects.bulk_update(changed, ['quantity'])
+    return len(changed)
@@ -0,0 +1,220 @@
+import inspect
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Min
+from django.utils import timezone
+
+from . import metrics
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Сколько первых задач очереди воркер пробует забрать за один проход,
+# прежде чем уступить их другим воркерам
+CLAIM_CANDIDATES = 5
+
+_tasks = {}
+
+
+def task(name=None):
+    """Регистрирует функцию как задачу; аргументы задачи передаются именованными"""
+    def decorator(func):
+        _tasks[name or func.__name__] = func
+        return func
+    return decorator
+
+
+def registered_tasks():
+    return sorted(_tasks)
+
+
+def validate_args(name, args):
+    """ValueError, если задача не зарегистрирована или аргументы ей не подходят"""
+    func = _tasks.get(name)
+    if func is None:
+        raise ValueError(f"Unknown task: {name}. Available: {', '.join(registered_tasks())}")
+    if not isinstance(args, dict):
+        raise ValueError("args must be an object")
+    try:
+        inspect.signature(func).bind(**args)
+    except TypeError as e:
+        raise ValueError(f"Invalid arguments for {name}: {e}")
+
+
+def enqueue(name, args=None, priority=0, user=None, delay=0, max_attempts=None):
+    """
+    Ставит задачу в очередь. Внутри транзакции задача появится в очереди
+    только после ее фиксации, вместе с остальными изменениями.
+    """
+    args = args or {}
+    validate_args(name, args)
+    return Job.objects.create(
+        task=name,
+        args=args,
+        priority=priority,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        available_at=timezone.now() + timedelta(seconds=delay),
+        created_by=user,
+    )
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'[:64]
+
+
+def retry_delay(attempts):
+    """Экспоненциальная пауза перед повтором: 2, 4, 8... с, не больше предела"""
+    return min(2 ** attempts, settings.JOBS_MAX_BACKOFF_SECONDS)
+
+
+def claim(worker, visibility_timeout=None):
+    """
+    Забирает задачу с наибольшим приоритетом в аренду на visibility_timeout
+    секунд. Захват — условный UPDATE по статусу и номеру попытки: из
+    нескольких воркеров задачу получает один, в том числе на SQLite, где
+    нет SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    timeout = visibility_timeout or settings.JOBS_VISIBILITY_TIMEOUT
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.Status.QUEUED, available_at__lte=now)
+        .order_by('-priority', 'available_at', 'id')
+        .values_list('id', 'attempts')[:CLAIM_CANDIDATES]
+    )
+    for job_id, attempts in candidates:
+        claimed = Job.objects.filter(
+            id=job_id, status=Job.Status.QUEUED, attempts=attempts
+        ).update(
+            status=Job.Status.RUNNING,
+            attempts=attempts + 1,
+            locked_until=now + timedelta(seconds=timeout),
+            locked_by=worker,
+            started_at=now,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def requeue_expired():
+    """
+    Возвращает в очередь задачи, аренда которых истекла (воркер упал или
+    задача не уложилась во время видимости). Задачи, исчерпавшие попытки,
+    отмечаются неудачными. Возвращает (возвращено, отмечено неудачными).
+    """
+    now = timezone.now()
+    expired = Job.objects.filter(status=Job.Status.RUNNING, locked_until__lt=now)
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.Status.FAILED, finished_at=now, locked_until=None,
+        last_error='Visibility timeout expired',
+    )
+    requeued = expired.update(
+        status=Job.Status.QUEUED, available_at=now, locked_until=None, locked_by='',
+        last_error='Visibility timeout expired',
+    )
+    if failed or requeued:
+        logger.warning(f"Jobs with expired lease: {requeued} requeued, {failed} failed")
+    return requeued, failed
+
+
+def execute(job, worker):
+    """
+    Выполняет задачу и сохраняет результат. Запись выполняется, только если
+    задача все еще в аренде у этого воркера и этой попытки.
+    """
+    owned = Job.objects.filter(
+        id=job.id, status=Job.Status.RUNNING, locked_by=worker, attempts=job.attempts
+    )
+    started = time.monotonic()
+    try:
+        func = _tasks.get(job.task)
+        if func is None:
+            raise LookupError(f"Unknown task: {job.task}")
+        result = func(**job.args)
+    except Exception as e:
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            outcome = {'status': Job.Status.FAILED, 'finished_at': now}
+        else:
+            outcome = {
+                'status': Job.Status.QUEUED,
+                'available_at': now + timedelta(seconds=retry_delay(job.attempts)),
+                'locked_by': '',
+            }
+        owned.update(locked_until=None, last_error=str(e)[:1000], **outcome)
+        logger.error(
+            f"Job {job.task} #{job.id} attempt {job.attempts}/{job.max_attempts} failed: {e}",
+            exc_info=True
+        )
+        return False
+
+    owned.update(
+        status=Job.Status.SUCCEEDED, result=result, finished_at=timezone.now(),
+        locked_until=None, last_error='',
+    )
+    logger.info(f"Job {job.task} #{job.id} succeeded in {time.monotonic() - started:.2f}s")
+    return True
+
+
+def work(worker=None, visibility_timeout=None, poll_interval=None, burst=False, stop=None):
+    """
+    Цикл воркера: выполняет задачи по одной, пока не установлен stop
+    (threading.Event). В режиме burst выходит, когда очередь пуста.
+    Возвращает число выполненных задач.
+    """
+    worker = worker or worker_id()
+    poll_interval = settings.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+    processed = 0
+    last_requeue = None
+    while not (stop and stop.is_set()):
+        if last_requeue is None or time.monotonic() - last_requeue >= poll_interval:
+            requeue_expired()
+            last_requeue = time.monotonic()
+
+        job = claim(worker, visibility_timeout)
+        if job is None:
+            if burst:
+                break
+            if stop:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+
+        execute(job, worker)
+        processed += 1
+        close_old_connections()
+    return processed
+
+
+def jobs_stats():
+    """
+    Метрики очереди: ожидающие и выполняемые задачи (по частичным индексам,
+    без чтения истории) и возраст самой старой готовой к запуску задачи.
+    """
+    now = timezone.now()
+    queued = Job.objects.filter(status=Job.Status.QUEUED)
+    oldest = queued.filter(available_at__lte=now).aggregate(oldest=Min('available_at'))['oldest']
+    return {
+        'queued': queued.count(),
+        'running': Job.objects.filter(status=Job.Status.RUNNING).count(),
+        'queue_lag_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+    }
+
+
+def purge_finished(days):
+    """Удаляет завершенные задачи старше N дней"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.Status.SUCCEEDED, Job.Status.FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+metrics.register('jobs', jobs_stats)
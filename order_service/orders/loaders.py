@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.http import Http404
+
+_identity_map = ContextVar('identity_map', default=None)
+
+
+class IdentityMap:
+    """
+    Загруженные за время запроса объекты по (модель, pk): повторная загрузка
+    возвращает тот же экземпляр без запроса к БД, недостающие объекты
+    загружаются одним запросом на модель.
+
+    Блокирующее чтение (lock) всегда выполняет SELECT ... FOR UPDATE
+    и обновляет уже выданный экземпляр значениями заблокированной строки.
+    """
+
+    def __init__(self):
+        self._instances = {}
+
+    @staticmethod
+    def _key(model, pk):
+        return model._meta.concrete_model, pk
+
+    def get(self, model, pk):
+        return self._instances.get(self._key(model, pk))
+
+    def add(self, instance):
+        key = self._key(type(instance), instance.pk)
+        existing = self._instances.get(key)
+        if existing is None:
+            self._instances[key] = instance
+            return instance
+        if existing is not instance:
+            # Свежие значения переносятся в уже выданный экземпляр вместе с
+            # состоянием на момент загрузки (Product._loaded_stock и т.п.):
+            # save() сравнивает новые значения с ним
+            for field in instance._meta.concrete_fields:
+                setattr(existing, field.attname, getattr(instance, field.attname))
+            for name, value in vars(instance).items():
+                if name.startswith('_loaded_'):
+                    setattr(existing, name, value)
+        return existing
+
+    def discard(self, instance):
+        self._instances.pop(self._key(type(instance), instance.pk), None)
+
+    def load_many(self, model, pks):
+        """Словарь pk -> объект; отсутствующие в БД pk в словарь не попадают"""
+        pks = list(dict.fromkeys(pks))
+        missing = [pk for pk in pks if self.get(model, pk) is None]
+        if missing:
+            for instance in model._default_manager.filter(pk__in=missing):
+                self.add(instance)
+        return {pk: self.get(model, pk) for pk in pks if self.get(model, pk) is not None}
+
+    def load(self, model, pk):
+        return self.load_many(model, [pk]).get(pk)
+
+    def lock(self, queryset, pk):
+        """
+        Блокирует строку до конца транзакции (select_for_update) и возвращает
+        экземпляр из карты. Http404, если строка не найдена.
+        """
+        try:
+            instance = queryset.select_for_update().get(pk=pk)
+        except queryset.model.DoesNotExist:
+            raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+        return self.add(instance)
+
+
+def identity_map():
+    """
+    Карта текущего запроса. Вне запроса возвращается новая пустая карта,
+    поэтому объекты между вызовами не кэшируются.
+    """
+    return _identity_map.get() or IdentityMap()
+
+
+@contextmanager
+def identity_map_scope():
+    token = _identity_map.set(IdentityMap())
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.archive import ARCHIVE_BATCH_SIZE, archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит доставленные и отмененные заказы старше N дней вместе с '
+        'позициями в архивные таблицы пачками. С --every команда работает '
+        'постоянно и запускает архивацию по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Архивировать заказы, не менявшиеся дольше N дней'
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help='Ограничение числа пачек за запуск')
+        parser.add_argument('--pause', type=float, default=0, help='Пауза между пачками, с')
+        parser.add_argument('--every', type=int, help='Повторять архивацию каждые N секунд')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be >= 0 and --batch-size must be positive')
+
+        while True:
+            started = time.monotonic()
+            archived = archive_orders(
+                days=options['days'],
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                pause=options['pause'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {archived} orders in {time.monotonic() - started:.2f}s'
+            ))
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+
+BENCH_USERNAME = 'bench_asgi'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает синхронные (WSGI, поток на соединение) и асинхронные '
+        '(ASGI, корутина на соединение) эндпоинты чтения: пропускную способность '
+        'и память на одно одновременное соединение. Запросы выполняются '
+        'внутри процесса через тестовые клиенты Django на текущей БД '
+        '(данные можно подготовить командой seed_data).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+        parser.add_argument('--requests', type=int, default=5, help='Запросов на одного клиента')
+        parser.add_argument(
+            '--endpoint', default='products/stock/?low_stock=true',
+            help='Путь относительно /api/v1/ и /api/v1/async/'
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        login_client = Client()
+        login_client.force_login(user)
+        self.cookies = login_client.cookies
+
+        endpoint = options['endpoint'].lstrip('/')
+        sync_path = f'/api/v1/{endpoint}'
+        async_path = f'/api/v1/async/{endpoint}'
+        requests = options['requests']
+
+        self.stdout.write(f'WSGI: {sync_path}\nASGI: {async_path}')
+        self.stdout.write(f"{'mode':<6}{'clients':>9}{'req/s':>10}{'p50 ms':>9}{'KiB/conn':>10}{'errors':>8}")
+        for concurrency in options['concurrency']:
+            for mode, runner in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+                tracemalloc.start()
+                started = time.perf_counter()
+                latencies, errors = runner(sync_path if mode == 'wsgi' else async_path, concurrency, requests)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                latencies.sort()
+                p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+                self.stdout.write(
+                    f'{mode:<6}{concurrency:>9}{len(latencies) / elapsed:>10.0f}{p50:>9.1f}'
+                    f'{peak / concurrency / 1024:>10.1f}{errors:>8}'
+                )
+
+        stack_size = threading.stack_size() or 8 * 1024 * 1024
+        self.stdout.write(
+            f'KiB/conn is the Python heap peak per concurrent client; each WSGI thread also '
+            f'reserves a native stack (~{stack_size // 1024} KiB virtual) and its own DB connection.'
+        )
+
+    def run_wsgi(self, path, concurrency, requests):
+        def client_loop():
+            client = Client()
+            client.cookies = self.cookies
+            timings, failed = [], 0
+            try:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    timings.append(time.perf_counter() - started)
+                    failed += response.status_code != 200
+            finally:
+                connection.close()
+            return timings, failed
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: client_loop(), range(concurrency)))
+        return [t for timings, _ in results for t in timings], sum(failed for _, failed in results)
+
+    def run_asgi(self, path, concurrency, requests):
+        async def client_loop():
+            client = AsyncClient()
+            client.cookies = self.cookies
+            timings, failed = [], 0
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = await client.get(path)
+                timings.append(time.perf_counter() - started)
+                failed += response.status_code != 200
+            return timings, failed
+
+        async def main():
+            return await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+        results = asyncio.run(main())
+        return [t for timings, _ in results for t in timings], sum(failed for _, failed in results)
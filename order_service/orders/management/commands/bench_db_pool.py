@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from orders.db_pool import ConnectionPool
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает новое соединение на каждый запрос с пулом соединений '
+        'под конкурентной нагрузкой: каждый «запрос» берет соединение, '
+        'выполняет короткий запрос и отдает соединение.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на один поток')
+        parser.add_argument('--pool-size', type=int, default=8)
+        parser.add_argument('--query', default='SELECT 1')
+
+    def handle(self, *args, **options):
+        wrapper = connections[options['database']]
+        conn_params = wrapper.get_connection_params()
+        # У бэкенда с пулом get_new_connection сам берет соединение из пула
+        connect_unpooled = getattr(wrapper, 'get_unpooled_connection', wrapper.get_new_connection)
+        self.query = options['query']
+        requests = options['requests']
+
+        self.stdout.write(f"{'mode':<8}{'threads':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'connects':>10}")
+        for threads in options['threads']:
+            def fresh():
+                conn = connect_unpooled(conn_params)
+                try:
+                    self.run_query(conn)
+                finally:
+                    conn.close()
+
+            rate, p50, p95 = self.run(fresh, threads, requests)
+            self.stdout.write(
+                f"{'fresh':<8}{threads:>8}{rate:>10.0f}{p50:>9.2f}{p95:>9.2f}{threads * requests:>10}"
+            )
+
+            pool = ConnectionPool(lambda: connect_unpooled(conn_params), max_size=options['pool_size'])
+
+            def pooled():
+                conn = pool.checkout()
+                try:
+                    self.run_query(conn)
+                finally:
+                    pool.checkin(conn)
+
+            try:
+                rate, p50, p95 = self.run(pooled, threads, requests)
+                stats = pool.stats()
+            finally:
+                pool.close_all()
+            self.stdout.write(
+                f"{'pooled':<8}{threads:>8}{rate:>10.0f}{p50:>9.2f}{p95:>9.2f}"
+                f"{stats['connections_created']:>10}"
+                f"  checkout p95 {stats['checkout_latency_ms']['p95']} ms"
+            )
+
+    def run_query(self, conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self.query)
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def run(self, request, threads, requests):
+        def worker():
+            timings = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                request()
+                timings.append(time.perf_counter() - started)
+            return timings
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(lambda _: worker(), range(threads)))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(t for worker_timings in results for t in worker_timings)
+        p50 = timings[len(timings) // 2] * 1000
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000
+        return len(timings) / elapsed, p50, p95
@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from orders import inventory
+from orders.models import Category, Product
+
+BENCH_SKU = 'BENCH-HOT-SKU'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает списание остатка одного товара конкурентными покупателями: '
+        'блокировка строки products (select_for_update + save, как в '
+        'AddOrderItemView) и шардированный остаток. Имеет смысл на PostgreSQL: '
+        'SQLite блокирует всю базу на запись.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, nargs='+', default=[1, 4, 16, 64])
+        parser.add_argument('--purchases', type=int, default=50, help='Покупок на одного покупателя')
+        parser.add_argument('--shards', type=int, default=16)
+
+    def handle(self, *args, **options):
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        product, _ = Product.objects.get_or_create(
+            sku=BENCH_SKU,
+            defaults={'name': 'Benchmark hot product', 'quantity': 0, 'price': 1, 'category': category}
+        )
+        purchases = options['purchases']
+
+        self.stdout.write(f"{'mode':<9}{'buyers':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+        for buyers in options['buyers']:
+            stock = buyers * purchases
+            for mode in ('row', 'sharded'):
+                self.reset(product, stock, options['shards'] if mode == 'sharded' else None)
+                buy = self.buy_row if mode == 'row' else self.buy_sharded
+                rate, p50, p95, errors = self.run(buy, product.id, buyers, purchases)
+                self.stdout.write(f'{mode:<9}{buyers:>8}{rate:>10.0f}{p50:>9.2f}{p95:>9.2f}{errors:>8}')
+
+        inventory.disable_sharding(product)
+        product.delete()
+
+    def reset(self, product, stock, shards):
+        inventory.disable_sharding(product)
+        Product.objects.filter(id=product.id).update(quantity=stock)
+        if shards:
+            inventory.enable_sharding(product, shards)
+
+    def buy_row(self, product_id):
+        with transaction.atomic():
+            product = Product.objects.select_for_update().get(id=product_id)
+            if product.quantity < 1:
+                raise inventory.InsufficientStock(product.quantity, 1)
+            product.quantity -= 1
+            product.save(update_fields=['quantity', 'updated_at'])
+
+    def buy_sharded(self, product_id):
+        with transaction.atomic():
+            inventory.reserve(product_id, 1)
+
+    def run(self, buy, product_id, buyers, purchases):
+        def buyer():
+            timings, errors = [], 0
+            try:
+                for _ in range(purchases):
+                    started = time.perf_counter()
+                    try:
+                        buy(product_id)
+                    except Exception:
+                        errors += 1
+                        continue
+                    timings.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            return timings, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=buyers) as executor:
+            results = list(executor.map(lambda _: buyer(), range(buyers)))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(t for buyer_timings, _ in results for t in buyer_timings)
+        errors = sum(buyer_errors for _, buyer_errors in results)
+        if not timings:
+            return 0, 0, 0, errors
+        p50 = timings[len(timings) // 2] * 1000
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000
+        return len(timings) / elapsed, p50, p95, errors
@@ -0,0 +1,91 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from rest_framework.throttling import UserRateThrottle
+
+from orders.throttling import UserSlidingWindowThrottle
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет накладные расходы ограничения частоты на проверку: список '
+        'отметок времени (UserRateThrottle) против скользящего окна из двух '
+        'счетчиков при заданной целевой нагрузке, по умолчанию 10k req/s.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cache', default='default', help='Alias кэша из CACHES')
+        parser.add_argument('--target-rate', type=int, default=10000, help='Целевая нагрузка, req/s')
+        parser.add_argument('--duration', type=float, default=3, help='Длительность прогона, с')
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--rate', default='100000/hour', help='Лимит на пользователя')
+        parser.add_argument('--modes', nargs='+', default=['list', 'window'], choices=['list', 'window'])
+
+    def handle(self, *args, **options):
+        attrs = {'cache': caches[options['cache']], 'rate': options['rate'], 'scope': 'bench'}
+        throttles = {
+            'list': type('BenchListThrottle', (UserRateThrottle,), attrs),
+            'window': type('BenchWindowThrottle', (UserSlidingWindowThrottle,), attrs),
+        }
+        users = [
+            SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=f'bench-{n}'), META={})
+            for n in range(options['users'])
+        ]
+
+        self.stdout.write(
+            f"{'mode':<8}{'threads':>8}{'req/s':>10}{'p50 us':>9}{'p99 us':>9}"
+            f"{'rejected':>10}{'state/user':>12}"
+        )
+        for mode in options['modes']:
+            throttle_class = throttles[mode]
+            for threads in options['threads']:
+                attrs['cache'].clear()
+                rate, p50, p99, rejected = self.run(
+                    throttle_class, users, threads, options['target_rate'], options['duration']
+                )
+                self.stdout.write(
+                    f"{mode:<8}{threads:>8}{rate:>10.0f}{p50:>9.1f}{p99:>9.1f}"
+                    f"{rejected:>10}{self.state_size(mode, throttle_class, users[0]):>12}"
+                )
+
+    def state_size(self, mode, throttle_class, request):
+        """Сколько значений хранится на пользователя"""
+        if mode == 'window':
+            return 2
+        throttle = throttle_class()
+        return len(throttle.cache.get(throttle.get_cache_key(request, None), []))
+
+    def run(self, throttle_class, users, threads, target_rate, duration):
+        interval = threads / target_rate
+
+        def worker(seed):
+            generator = random.Random(seed)
+            timings = []
+            rejected = 0
+            started = time.perf_counter()
+            next_at = started
+            while next_at - started < duration:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                check_started = time.perf_counter()
+                if not throttle_class().allow_request(generator.choice(users), None):
+                    rejected += 1
+                timings.append(time.perf_counter() - check_started)
+                next_at += interval
+            return timings, rejected
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(worker, range(threads)))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(t for worker_timings, _ in results for t in worker_timings)
+        p50 = timings[len(timings) // 2] * 1e6
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6
+        return len(timings) / elapsed, p50, p99, sum(rejected for _, rejected in results)
@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.outbox import drain, get_sink, outbox_stats, purge_dispatched
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет события outbox в приемник пачками (доставка не менее '
+        'одного раза). Несколько экземпляров команды разбирают очередь '
+        'параллельно. С --every команда работает постоянно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sink', default=settings.OUTBOX_SINK,
+            help='file:<путь>, http(s)://<url> или путь к классу приемника'
+        )
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            '--lease', type=int, default=settings.OUTBOX_LEASE_SECONDS,
+            help='Аренда пачки, с: после нее пачку может забрать другой диспетчер'
+        )
+        parser.add_argument('--max-batches', type=int, help='Ограничение числа пачек за запуск')
+        parser.add_argument('--every', type=float, help='Повторять отправку каждые N секунд')
+        parser.add_argument(
+            '--purge-days', type=int,
+            help='Удалять отправленные события старше N дней'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['lease'] < 1:
+            raise CommandError('--batch-size and --lease must be positive')
+        sink = get_sink(options['sink'])
+
+        while True:
+            started = time.monotonic()
+            dispatched, failed = drain(
+                sink,
+                batch_size=options['batch_size'],
+                lease_seconds=options['lease'],
+                max_batches=options['max_batches'],
+            )
+            stats = outbox_stats()
+            self.stdout.write(self.style.SUCCESS(
+                f'Dispatched {dispatched} events ({failed} failed) in '
+                f'{time.monotonic() - started:.2f}s, pending {stats["pending"]}, '
+                f'lag {stats["lag_seconds"]:.1f}s'
+            ))
+            if options['purge_days'] is not None:
+                purged = purge_dispatched(options['purge_days'])
+                self.stdout.write(self.style.SUCCESS(f'Purged {purged} dispatched events'))
+            if not options['every']:
+                break
+            time.sleep(options['every'])
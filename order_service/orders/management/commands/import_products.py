@@ -0,0 +1,46 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.imports import IMPORT_BATCH_SIZE, READERS, ProductImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый импорт каталога товаров из CSV или NDJSON с upsert по SKU. '
+        'Строки с ошибками выводятся в отчет и не прерывают импорт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу выгрузки поставщика')
+        parser.add_argument(
+            '--format', choices=sorted(READERS), dest='input_format',
+            help='Формат файла (по умолчанию определяется по расширению)'
+        )
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['input_format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if input_format == 'jsonl':
+            input_format = 'ndjson'
+        if input_format not in READERS:
+            raise CommandError('Cannot detect file format, use --format csv|ndjson')
+
+        started = time.monotonic()
+        try:
+            with open(path, encoding='utf-8', newline='') as lines:
+                report = ProductImporter(batch_size=options['batch_size']).run(lines, input_format)
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']} (sku={error['sku']}): {error['errors']}")
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f"... and {report['error_count'] - len(report['errors'])} more errors")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported in {time.monotonic() - started:.2f}s: {report['created']} created, "
+            f"{report['updated']} updated, {report['error_count']} errors"
+        ))
@@ -0,0 +1,55 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Локальный HTTP-приемник событий outbox для разработки: принимает '
+        'POST {"events": [...]} и дописывает события в NDJSON-файл, '
+        'пропуская уже полученные id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--output', default='-', help='Файл для событий, "-" — stdout')
+
+    def handle(self, *args, **options):
+        command = self
+        seen = set()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    events = json.loads(self.rfile.read(length))['events']
+                except (ValueError, KeyError, TypeError):
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                fresh = [event for event in events if event.get('id') not in seen]
+                seen.update(event.get('id') for event in fresh)
+                lines = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in fresh)
+                if options['output'] == '-':
+                    command.stdout.write(lines, ending='')
+                else:
+                    with open(options['output'], 'a', encoding='utf-8') as f:
+                        f.write(lines)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(self.style.SUCCESS(
+            f'Listening on http://{options["host"]}:{options["port"]}/'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders import inventory
+from orders.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает Product.quantity шардированных товаров как сумму '
+        'шардов. С --rebalance также выравнивает остаток между шардами, '
+        'с --every работает постоянно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebalance', action='store_true')
+        parser.add_argument('--every', type=float, help='Повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            if options['rebalance']:
+                for product in Product.objects.filter(sharded_stock=True):
+                    inventory.rebalance(product)
+            reconciled = inventory.reconcile()
+            self.stdout.write(self.style.SUCCESS(
+                f'Reconciled {reconciled} sharded products in {time.monotonic() - started:.2f}s'
+            ))
+            if not options['every']:
+                break
+            time.sleep(options['every'])
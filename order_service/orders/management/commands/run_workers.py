@@ -0,0 +1,81 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from orders.jobs import purge_finished, work, worker_id
+
+
+def run_worker(options):
+    """Процесс воркера: SIGTERM/SIGINT завершают его после текущей задачи"""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    return work(
+        visibility_timeout=options['visibility_timeout'],
+        poll_interval=options['poll_interval'],
+        burst=options['burst'],
+        stop=stop,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает воркеры фоновых задач из таблицы jobs. Каждый воркер — '
+        'отдельный процесс; задачи выполняются по приоритету, упавшие '
+        'повторяются с экспоненциальной паузой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOBS_WORKERS)
+        parser.add_argument(
+            '--visibility-timeout', type=int, default=settings.JOBS_VISIBILITY_TIMEOUT,
+            help='Аренда задачи, с: после нее задача упавшего воркера возвращается в очередь'
+        )
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL)
+        parser.add_argument('--burst', action='store_true', help='Выйти, когда очередь опустеет')
+        parser.add_argument('--purge-days', type=int, help='Удалить завершенные задачи старше N дней')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['visibility_timeout'] < 1:
+            raise CommandError('--workers and --visibility-timeout must be positive')
+
+        if options['purge_days'] is not None:
+            purged = purge_finished(options['purge_days'])
+            self.stdout.write(self.style.SUCCESS(f'Purged {purged} finished jobs'))
+
+        if options['workers'] == 1:
+            processed = run_worker(options)
+            self.stdout.write(self.style.SUCCESS(f'Worker {worker_id()} processed {processed} jobs'))
+            return
+
+        # Дочерние процессы не должны наследовать открытые соединения с БД
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=run_worker, args=(options,), name=f'worker-{number}')
+            for number in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {len(processes)} workers'))
+
+        def shutdown(*args):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # SIGINT получила вся группа процессов: воркеры доделывают текущие задачи
+            for process in processes:
+                process.join()
+        failed = [process.name for process in processes if process.exitcode]
+        if failed:
+            raise CommandError(f'Workers exited with errors: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS('All workers stopped'))
@@ -0,0 +1,184 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from orders.customers import normalize_email, normalize_phone
+from orders.models import Category, Customer, Product, Order, OrderItem
+from orders.watchlist import sync_watchlist
+
+
+@contextmanager
+def auto_now_add_disabled(model, field_name):
+    """Позволяет явно задать значение для поля с auto_now_add"""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует детерминированный набор данных для нагрузочного тестирования: '
+        'дерево категорий, клиентов, товары, заказы и позиции. Строки вставляются '
+        'через bulk_create пачками, без save()/full_clean() на каждую строку, '
+        'суммы заказов пересчитываются одним UPDATE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора случайных чисел')
+        parser.add_argument('--root-categories', type=int, default=20)
+        parser.add_argument('--category-depth', type=int, default=3, help='Количество уровней дерева категорий')
+        parser.add_argument('--category-children', type=int, default=4, help='Дочерних категорий у каждого узла')
+        parser.add_argument('--customers', type=int, default=10000)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--max-items', type=int, default=5, help='Максимум позиций в заказе')
+        parser.add_argument('--days', type=int, default=365, help='Заказы распределяются по последним N дням')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError('Database backend must return primary keys from bulk_create')
+        if options['category_depth'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--category-depth and --batch-size must be positive')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+
+        leaf_ids = self.seed_categories(
+            options['root_categories'], options['category_depth'], options['category_children']
+        )
+        customer_ids = self.seed_customers(options['customers'])
+        products = self.seed_products(options['products'], leaf_ids)
+        self.seed_orders(options['orders'], options['max_items'], options['days'], customer_ids, products)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeding finished in {time.monotonic() - started:.2f}s'
+        ))
+
+    def report(self, label, rows, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(f'{label}: {rows} rows in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s)')
+
+    def bulk_insert(self, model, objs):
+        created = []
+        for start in range(0, len(objs), self.batch_size):
+            created.extend(model.objects.bulk_create(objs[start:start + self.batch_size]))
+        return created
+
+    def seed_categories(self, roots, depth, children):
+        started = time.monotonic()
+        level = self.bulk_insert(Category, [
+            Category(name=f'Category {n}') for n in range(1, roots + 1)
+        ])
+        total = len(level)
+        for _ in range(depth - 1):
+            level = self.bulk_insert(Category, [
+                Category(name=f'{parent.name}.{n}', parent_id=parent.id)
+                for parent in level
+                for n in range(1, children + 1)
+            ])
+            total += len(level)
+        self.report('Categories', total, started)
+        return [category.id for category in level]
+
+    def seed_customers(self, count):
+        started = time.monotonic()
+        rng = self.rng
+        ids = []
+        for start in range(0, count, self.batch_size):
+            batch = [
+                Customer(
+                    name=f'Customer {n}',
+                    email=f'customer_{n}@example.com',
+                    phone=f'+7{rng.randint(9000000000, 9999999999)}',
+                    address=f'Test street {rng.randint(1, 500)}, apt. {rng.randint(1, 300)}',
+                )
+                for n in range(start + 1, min(start + self.batch_size, count) + 1)
+            ]
+            # bulk_create не вызывает save(), нормализованные поля заполняются здесь
+            for customer in batch:
+                customer.phone_normalized = normalize_phone(customer.phone)
+                customer.email_normalized = normalize_email(customer.email)
+            ids.extend(customer.id for customer in Customer.objects.bulk_create(batch))
+        self.report('Customers', len(ids), started)
+        return ids
+
+    def seed_products(self, count, category_ids):
+        started = time.monotonic()
+        rng = self.rng
+        products = []
+        for start in range(0, count, self.batch_size):
+            batch = [
+                Product(
+                    name=f'Product {n}',
+                    description=f'Seeded product {n}',
+                    quantity=rng.randint(0, 1000),
+                    price=Decimal(rng.randint(100, 1000000)) / 100,
+                    category_id=rng.choice(category_ids),
+                )
+                for n in range(start + 1, min(start + self.batch_size, count) + 1)
+            ]
+            created = Product.objects.bulk_create(batch)
+            # bulk_create не вызывает save(), список наблюдения заполняется здесь
+            sync_watchlist(Product.objects.filter(pk__in=[product.id for product in created]))
+            products.extend((product.id, product.price) for product in created)
+        self.report('Products', len(products), started)
+        return products
+
+    def seed_orders(self, count, max_items, days, customer_ids, products):
+        if not count:
+            return
+        if not customer_ids or not products:
+            raise CommandError('Orders require at least one customer and one product')
+
+        started = time.monotonic()
+        rng = self.rng
+        statuses = [choice for choice, _ in Order.Status.choices]
+        anchor = timezone.now()
+        max_items = min(max_items, len(products))
+        first_id = last_id = None
+        items_total = 0
+
+        with auto_now_add_disabled(Order, 'created_at'):
+            for start in range(0, count, self.batch_size):
+                batch = [
+                    Order(
+                        customer_id=rng.choice(customer_ids),
+                        status=rng.choice(statuses),
+                        created_at=anchor - timedelta(seconds=rng.randint(0, days * 86400)),
+                    )
+                    for _ in range(min(self.batch_size, count - start))
+                ]
+                orders = Order.objects.bulk_create(batch)
+                first_id = first_id or orders[0].id
+                last_id = orders[-1].id
+
+                items = []
+                for order in orders:
+                    for index in rng.sample(range(len(products)), rng.randint(1, max_items)):
+                        product_id, price = products[index]
+                        items.append(OrderItem(
+                            order_id=order.id,
+                            product_id=product_id,
+                            quantity=rng.randint(1, 5),
+                            unit_price=price,
+                        ))
+                self.bulk_insert(OrderItem, items)
+                items_total += len(items)
+
+        self.report('Orders', count, started)
+        self.report('Order items', items_total, started)
+
+        started = time.monotonic()
+        updated = Order.objects.filter(id__range=(first_id, last_id)).recalculate_totals()
+        self.report('Order totals', updated, started)
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.models import Product
+from orders.watchlist import SYNC_BATCH_SIZE, sync_watchlist
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает список наблюдения за остатками (мало/нет в наличии) '
+        'по всему каталогу или по категории. Нужен после изменения '
+        'LOW_STOCK_THRESHOLD и прямых UPDATE остатка в обход save().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, help='Только товары категории с этим ID')
+        parser.add_argument('--batch-size', type=int, default=SYNC_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products = Product.objects.all()
+        if options['category']:
+            products = products.filter(category_id=options['category'])
+        changed = sync_watchlist(products, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stock watchlist synced: {changed} rows changed in {time.monotonic() - started:.2f}s'
+        ))
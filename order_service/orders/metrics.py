@@ -0,0 +1,21 @@
+import os
+import threading
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def register(name, provider):
+    """Регистрирует функцию, возвращающую метрики подсистемы"""
+    with _lock:
+        _providers[name] = provider
+
+
+def snapshot():
+    """Метрики текущего процесса (воркера) по всем подсистемам"""
+    with _lock:
+        providers = dict(_providers)
+    return {
+        'pid': os.getpid(),
+        **{name: provider() for name, provider in sorted(providers.items())},
+    }
@@ -0,0 +1,227 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+
+from .loaders import identity_map_scope
+from .routers import replica_reads
+from .shedding import measuring, priority_for, tracker
+
+PRIMARY_PIN_COOKIE = 'primary_pin'
+PRIMARY_PIN_KEY = 'primary_pin:{}'
+
+
+def primary_pinned(request):
+    """
+    Читает ли запрос с основной БД после недавней записи клиента: для
+    пользователя — по отметке primary_pin:<id> в общем кэше, для анонимных
+    клиентов — по cookie. Пользователь JWT/Token известен только после
+    аутентификации DRF во view, поэтому проверка выполняется при чтении,
+    а ее результат запоминается на запросе.
+    """
+    if request.COOKIES.get(PRIMARY_PIN_COOKIE):
+        return True
+    user = getattr(request, 'user', None)
+    # Ленивого пользователя сессии не вычисляем: это само чтение из БД
+    if user is None or isinstance(user, SimpleLazyObject) or not user.is_authenticated:
+        return False
+    if getattr(request, '_primary_pin_user', None) != user.pk:
+        request._primary_pin_user = user.pk
+        request._primary_pinned = bool(caches['default'].get(PRIMARY_PIN_KEY.format(user.pk)))
+    return request._primary_pinned
+
+
+class DualModeMiddleware:
+    """
+    Основа middleware для WSGI и ASGI, как MiddlewareMixin Django: при
+    асинхронной цепочке вызывается acall(), и Django не переводит запрос
+    в отдельный поток через sync_to_async. Подклассы реализуют call() и acall().
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.acall(request)
+        return self.call(request)
+
+
+class ReplicaRoutingMiddleware(DualModeMiddleware):
+    """
+    Безопасные запросы читают с реплик. После успешной записи пользователь
+    на REPLICA_PIN_SECONDS закрепляется за основной БД (primary_pinned),
+    чтобы видеть собственные изменения несмотря на задержку репликации.
+    POST-запросы только на чтение (view с replica_pin_exempt = True) не
+    закрепляют.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def call(self, request):
+        if request.method not in self.SAFE_METHODS:
+            return self.pin(request, self.get_response(request))
+
+        with replica_reads(unless=lambda: primary_pinned(request)):
+            return self.get_response(request)
+
+    async def acall(self, request):
+        if request.method not in self.SAFE_METHODS:
+            response = await self.get_response(request)
+            # Запись в кэш и ленивый пользователь сессии — синхронные обращения к БД
+            return await sync_to_async(self.pin)(request, response)
+
+        with replica_reads(unless=lambda: primary_pinned(request)):
+            return await self.get_response(request)
+
+    def pin(self, request, response):
+        pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 0)
+        # Без реплик все и так читается с основной БД
+        if not getattr(settings, 'REPLICA_DATABASES', []) or not pin_seconds or response.status_code >= 400:
+            return response
+        match = getattr(request, 'resolver_match', None)
+        if match and getattr(getattr(match.func, 'view_class', None), 'replica_pin_exempt', False):
+            return response
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            caches['default'].set(PRIMARY_PIN_KEY.format(user.pk), True, pin_seconds)
+        else:
+            # Клиенты без учетной записи закрепляются cookie
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE, '1', max_age=pin_seconds,
+                httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class IdentityMapMiddleware(DualModeMiddleware):
+    """Своя карта загруженных объектов (orders.loaders) на каждый запрос"""
+
+    def call(self, request):
+        with identity_map_scope():
+            return self.get_response(request)
+
+    async def acall(self, request):
+        with identity_map_scope():
+            return await self.get_response(request)
+
+
+class LoadSheddingMiddleware(DualModeMiddleware):
+    """
+    Сброс нагрузки: считает запросы в обработке по имени URL и задержку
+    запросов к БД, и при перегрузке сразу отвечает 503 с Retry-After
+    низкоприоритетным запросам, вместо того чтобы копить их в ожидании
+    БД. Правила приема — orders.shedding.LoadTracker.
+
+    Потоковый ответ (выгрузка заказов) числится в обработке, пока тело не
+    отдано и ответ не закрыт: его запросы к БД выполняются уже после
+    возврата из view.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.async_mode:
+            # Иначе Django вызывал бы синхронный process_view через sync_to_async
+            self.process_view = self.aprocess_view
+
+    def call(self, request):
+        if not settings.LOAD_SHEDDING_ENABLED:
+            return self.get_response(request)
+
+        request.load_shedding_name = None
+        try:
+            with measuring(request):
+                response = self.get_response(request)
+        except BaseException:
+            self.release(request)
+            raise
+        return self.finish(request, response)
+
+    async def acall(self, request):
+        if not settings.LOAD_SHEDDING_ENABLED:
+            return await self.get_response(request)
+
+        request.load_shedding_name = None
+        try:
+            with measuring(request):
+                response = await self.get_response(request)
+        except BaseException:
+            self.release(request)
+            raise
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        if request.load_shedding_name is None:
+            return response
+        if response.streaming:
+            stream = AsyncStreamSlot if response.is_async else StreamSlot
+            response.streaming_content = stream(response.streaming_content, request)
+        else:
+            self.release(request)
+        return response
+
+    @staticmethod
+    def release(request):
+        if request.load_shedding_name is not None:
+            tracker.release(request.load_shedding_name)
+            request.load_shedding_name = None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        return self.admit(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return self.admit(request)
+
+    def admit(self, request):
+        """Ответ 503, если запрос не принят; иначе занимает под него место"""
+        if not settings.LOAD_SHEDDING_ENABLED:
+            return None
+        name = request.resolver_match.url_name
+        if name is None:
+            return None
+        if tracker.admit(name, priority_for(name, request.method)):
+            response = JsonResponse(
+                {'error': 'Service is overloaded, retry later'}, status=503
+            )
+            response['Retry-After'] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+            return response
+        request.load_shedding_name = name
+        return None
+
+
+class StreamSlotBase:
+    """
+    Тело потокового ответа, которое замеряет запросы к БД при генерации
+    частей и освобождает место запроса при закрытии ответа (close()
+    вызывают WSGI/ASGI-сервер и тестовый клиент, в том числе при обрыве).
+    """
+
+    def __init__(self, content, request):
+        self.content = content
+        self.request = request
+
+    def close(self):
+        LoadSheddingMiddleware.release(self.request)
+
+
+class StreamSlot(StreamSlotBase):
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with measuring(self.request):
+            return next(self.content)
+
+
+class AsyncStreamSlot(StreamSlotBase):
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        with measuring(self.request):
+            return await self.content.__anext__()
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:16
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+E164_MAX_DIGITS = 15
+
+
+# Копии orders.customers.normalize_phone/normalize_email на момент миграции:
+# изменения кода приложения не должны менять уже примененную миграцию
+def normalize_phone(value):
+    digits = re.sub(r'\D', '', value or '')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    country_code = getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '7')
+    if country_code == '7' and len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    elif len(digits) == 10:
+        digits = country_code + digits
+    return digits[:E164_MAX_DIGITS]
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def fill_normalized_contacts(apps, schema_editor):
+    Customer = apps.get_model('orders', 'Customer')
+    manager = Customer.objects.using(schema_editor.connection.alias)
+    customers = manager.only('id', 'phone', 'email').order_by('id')
+    batch = []
+    for customer in customers.iterator(chunk_size=BATCH_SIZE):
+        customer.phone_normalized = normalize_phone(customer.phone)
+        customer.email_normalized = normalize_email(customer.email)
+        batch.append(customer)
+        if len(batch) >= BATCH_SIZE:
+            manager.bulk_update(batch, ['phone_normalized', 'email_normalized'])
+            batch = []
+    if batch:
+        manager.bulk_update(batch, ['phone_normalized', 'email_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_idempotency_records'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='email_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=254, verbose_name='normalized email'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=15, verbose_name='normalized phone'),
+        ),
+        migrations.RunPython(fill_normalized_contacts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_normalized'], name='customers_phone_norm_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['email_normalized'], name='customers_email_norm_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_customer_normalized_contacts'),
+    ]
+
+    operations = [
+        # Новые индексы создаются раньше, чем удаляются старые (customer, created_at),
+        # чьим префиксом они являются
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'created_at', 'id', 'status'], name='orders_customer_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['customer', 'created_at', 'id', 'status'], name='orders_arch_cust_history_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_custome_18fe5d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedorder',
+            name='orders_arch_custome_e62314_idx',
+        ),
+    ]
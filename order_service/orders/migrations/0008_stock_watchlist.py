@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 2000
+
+
+def fill_watchlist(apps, schema_editor):
+    # Пороги товаров и категорий еще не заданы: действует LOW_STOCK_THRESHOLD
+    Product = apps.get_model('orders', 'Product')
+    StockAlert = apps.get_model('orders', 'StockAlert')
+    alias = schema_editor.connection.alias
+    threshold = settings.LOW_STOCK_THRESHOLD
+    products = (
+        Product.objects.using(alias)
+        .filter(quantity__lte=threshold)
+        .values_list('id', 'quantity')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for product_id, quantity in products:
+        level = 'out' if quantity <= 0 else 'low'
+        batch.append(StockAlert(product_id=product_id, level=level, threshold=threshold))
+        if len(batch) >= BATCH_SIZE:
+            StockAlert.objects.using(alias).bulk_create(batch)
+            batch = []
+    StockAlert.objects.using(alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_customer_order_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='low stock threshold'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='low stock threshold'),
+        ),
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_alert', serialize=False, to='orders.product', verbose_name='product')),
+                ('level', models.CharField(choices=[('low', 'Low stock'), ('out', 'Out of stock')], max_length=3, verbose_name='level')),
+                ('threshold', models.PositiveIntegerField(verbose_name='threshold')),
+                ('changed_at', models.DateTimeField(auto_now=True, verbose_name='changed at')),
+            ],
+            options={
+                'verbose_name': 'stock alert',
+                'verbose_name_plural': 'stock alerts',
+                'db_table': 'stock_watchlist',
+                'indexes': [models.Index(fields=['level', 'changed_at'], name='stock_watch_level_9770b9_idx')],
+            },
+        ),
+        migrations.RunPython(fill_watchlist, migrations.RunPython.noop),
+    ]
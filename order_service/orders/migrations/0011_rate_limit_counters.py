@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitCounter',
+            fields=[
+                ('key', models.CharField(max_length=200, primary_key=True, serialize=False, verbose_name='key')),
+                ('window', models.BigIntegerField(verbose_name='window')),
+                ('current', models.PositiveIntegerField(default=0, verbose_name='current window count')),
+                ('previous', models.PositiveIntegerField(default=0, verbose_name='previous window count')),
+            ],
+            options={
+                'verbose_name': 'rate limit counter',
+                'verbose_name_plural': 'rate limit counters',
+                'db_table': 'rate_limit_counters',
+            },
+        ),
+    ]
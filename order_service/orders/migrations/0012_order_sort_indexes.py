@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_rate_limit_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_status_762191_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_created_77e2b9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_total_a_f97982_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'id'], name='orders_status_bc843f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='orders_created_f67d2c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['total_amount', 'id'], name='orders_total_a_aa1ee3_idx'),
+        ),
+    ]
@@ -1,11 +1,19 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from django.utils.translation import gettext_lazy
 
+from .loaders import identity_map
+
 
 class Category(models.Model):
     name = models.CharField(gettext_lazy('name'), max_length=255)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    # Порог «мало на складе» для товаров категории без собственного порога
+    low_stock_threshold = models.PositiveIntegerField(gettext_lazy('low stock threshold'), null=True, blank=True)
     created_at = models.DateTimeField(gettext_lazy('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(gettext_lazy('updated at'), auto_now=True)
 
@@ -26,6 +34,22 @@ class Category(models.Model):
             return f"{self.parent.get_full_path()} > {self.name}"
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_threshold = instance.__dict__.get('low_stock_threshold')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        threshold = self.__dict__.get('low_stock_threshold')
+        if hasattr(self, '_loaded_threshold') and threshold != self._loaded_threshold:
+            from .watchlist import sync_watchlist
+
+            # Порог категории меняет уровень всех ее товаров без своего порога
+            sync_watchlist(self.product_set.filter(low_stock_threshold__isnull=True))
+        self._loaded_threshold = threshold
+
     def clean(self):
         if self.parent and self.parent.id == self.id:
             raise ValidationError(gettext_lazy("Категория не может быть родительской для самой себя"))
@@ -42,6 +66,10 @@ class Customer(models.Model):
     name = models.CharField(gettext_lazy('name'), max_length=255)
     email = models.EmailField(gettext_lazy('email'), blank=True)
     phone = models.CharField(gettext_lazy('phone'), max_length=20, blank=True)
+    # Нормализованные копии для поиска по индексу (orders/customers.py):
+    # телефон — цифры в формате E.164 без «+», email — в нижнем регистре
+    phone_normalized = models.CharField(gettext_lazy('normalized phone'), max_length=15, blank=True, editable=False)
+    email_normalized = models.CharField(gettext_lazy('normalized email'), max_length=254, blank=True, editable=False)
     address = models.TextField(gettext_lazy('address'))
     created_at = models.DateTimeField(gettext_lazy('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(gettext_lazy('updated at'), auto_now=True)
@@ -53,13 +81,39 @@ class Customer(models.Model):
         indexes = [
             models.Index(fields=['email']),
             models.Index(fields=['created_at']),
+            # varchar_pattern_ops (PostgreSQL) обслуживает и равенство,
+            # и LIKE 'префикс%'; на других СУБД это обычный индекс
+            models.Index(
+                fields=['phone_normalized'], name='customers_phone_norm_idx',
+                opclasses=['varchar_pattern_ops']
+            ),
+            models.Index(
+                fields=['email_normalized'], name='customers_email_norm_idx',
+                opclasses=['varchar_pattern_ops']
+            ),
         ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from .customers import normalize_email, normalize_phone
+
+        self.phone_normalized = normalize_phone(self.phone)
+        self.email_normalized = normalize_email(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'phone' in update_fields:
+                update_fields.add('phone_normalized')
+            if 'email' in update_fields:
+                update_fields.add('email_normalized')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
 
 class Product(models.Model):
+    sku = models.CharField(gettext_lazy('SKU'), max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(gettext_lazy('name'), max_length=255)
     description = models.TextField(gettext_lazy('description'), blank=True)
     quantity = models.IntegerField(gettext_lazy('quantity'))
@@ -67,6 +121,12 @@ class Product(models.Model):
     cost_price = models.DecimalField(gettext_lazy('cost price'), max_digits=10, decimal_places=2, blank=True, null=True)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, verbose_name=gettext_lazy('category'))
     is_active = models.BooleanField(gettext_lazy('is active'), default=True)
+    # Остаток разбит на строки ProductStockShard, quantity — их сумма,
+    # пересчитываемая с задержкой (см. orders/inventory.py)
+    sharded_stock = models.BooleanField(gettext_lazy('sharded stock'), default=False)
+    # Собственный порог «мало на складе»; если не задан — порог категории
+    # или LOW_STOCK_THRESHOLD
+    low_stock_threshold = models.PositiveIntegerField(gettext_lazy('low stock threshold'), null=True, blank=True)
     created_at = models.DateTimeField(gettext_lazy('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(gettext_lazy('updated at'), auto_now=True)
 
@@ -91,13 +151,129 @@ class Product(models.Model):
             models.Index(fields=['quantity']),
         ]
 
+    def clean(self):
+        # Пустой SKU хранится как NULL, чтобы не нарушать уникальность
+        if not self.sku:
+            self.sku = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Остаток и порог на момент загрузки: save() обращается к списку
+        # наблюдения, только если уровень остатка мог измениться
+        instance._loaded_stock = (
+            instance.__dict__.get('quantity'), instance.__dict__.get('low_stock_threshold')
+        )
+        instance._loaded_active = instance.__dict__.get('is_active')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if not self.sku:
+            self.sku = None
+        created = self._state.adding
+        super().save(*args, **kwargs)
+
+        if 'quantity' in self.__dict__:
+            from .watchlist import record_stock_change
+
+            record_stock_change(self, getattr(self, '_loaded_stock', None), created=created)
+            self._loaded_stock = (self.quantity, self.__dict__.get('low_stock_threshold'))
+
+        # Счетчики остатков считают только активные товары
+        if not created and 'is_active' in self.__dict__:
+            if self.is_active != getattr(self, '_loaded_active', None):
+                from .watchlist import forget_stock_summary
+
+                forget_stock_summary()
+            self._loaded_active = self.is_active
+
     @property
     def in_stock(self):
         return self.quantity > 0
 
     @property
     def low_stock(self):
-        return 0 < self.quantity <= 10
+        # Уровень берется из списка наблюдения (orders/watchlist.py), где
+        # учтены пороги товара и категории; для списков нужен
+        # select_related('stock_alert')
+        try:
+            return self.stock_alert.level == StockAlert.Level.LOW
+        except StockAlert.DoesNotExist:
+            return False
+
+
+class ProductStockShard(models.Model):
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='stock_shards', verbose_name=gettext_lazy('product')
+    )
+    shard = models.PositiveSmallIntegerField(gettext_lazy('shard'))
+    quantity = models.IntegerField(gettext_lazy('quantity'))
+
+    class Meta:
+        db_table = 'product_stock_shards'
+        verbose_name = gettext_lazy('product stock shard')
+        verbose_name_plural = gettext_lazy('product stock shards')
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(quantity__gte=0),
+                name='check_shard_quantity_positive'
+            ),
+            models.UniqueConstraint(
+                fields=['product', 'shard'],
+                name='unique_product_shard'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}#{self.shard}: {self.quantity}"
+
+
+class StockAlert(models.Model):
+    """
+    Строка списка наблюдения: товар, остаток которого опустился до порога
+    или до нуля. Строка появляется и удаляется только при пересечении
+    порога, поэтому списки «мало»/«нет в наличии» не сканируют каталог.
+    """
+    class Level(models.TextChoices):
+        LOW = 'low', gettext_lazy('Low stock')
+        OUT = 'out', gettext_lazy('Out of stock')
+
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True,
+        related_name='stock_alert', verbose_name=gettext_lazy('product')
+    )
+    level = models.CharField(gettext_lazy('level'), max_length=3, choices=Level.choices)
+    threshold = models.PositiveIntegerField(gettext_lazy('threshold'))
+    changed_at = models.DateTimeField(gettext_lazy('changed at'), auto_now=True)
+
+    class Meta:
+        db_table = 'stock_watchlist'
+        verbose_name = gettext_lazy('stock alert')
+        verbose_name_plural = gettext_lazy('stock alerts')
+        indexes = [
+            models.Index(fields=['level', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.level}"
+
+
+class OrderQuerySet(models.QuerySet):
+    def recalculate_totals(self):
+        """Пересчитывает total_amount одним UPDATE по всем заказам выборки"""
+        items_total = (
+            OrderItem.objects.filter(order=models.OuterRef('pk'))
+            .values('order')
+            .annotate(total=models.Sum(models.F('quantity') * models.F('unit_price')))
+            .values('total')
+        )
+        return self.update(
+            total_amount=Coalesce(
+                models.Subquery(items_total),
+                models.Value(0),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
 
 
 class Order(models.Model):
@@ -126,15 +302,23 @@ class Order(models.Model):
     created_at = models.DateTimeField(gettext_lazy('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(gettext_lazy('updated at'), auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         db_table = 'orders'
         verbose_name = gettext_lazy('order')
         verbose_name_plural = gettext_lazy('orders')
         indexes = [
-            models.Index(fields=['status']),
-            models.Index(fields=['created_at']),
-            models.Index(fields=['customer', 'created_at']),
-            models.Index(fields=['total_amount']),
+            # id в конце — под сортировку списка заказов (orders/filters.py):
+            # порядок (поле, id) читается обходом индекса без досортировки
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['created_at', 'id']),
+            # История заказов клиента (orders/history.py): keyset-страницы
+            # читаются только из индекса
+            models.Index(fields=['customer', 'created_at', 'id', 'status'], name='orders_customer_history_idx'),
+            models.Index(fields=['total_amount', 'id']),
+            # Отбор завершенных заказов для архивации
+            models.Index(fields=['status', 'updated_at']),
         ]
         ordering = ['-created_at']
 
@@ -146,9 +330,14 @@ class Order(models.Model):
         return sum(item.total_price for item in self.items.all())
 
     def save(self, *args, **kwargs):
+        is_new = self.pk is None
         if self.pk:  # Если заказ уже существует
             self.total_amount = self.calculate_total()
         super().save(*args, **kwargs)
+        if is_new:
+            from .history import forget_order_count
+
+            forget_order_count(self.customer_id)
 
 
 class OrderItem(models.Model):
@@ -180,25 +369,50 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Количество на момент загрузки, чтобы clean() не читал позицию заново
+        if 'quantity' in field_names:
+            instance._loaded_quantity = instance.quantity
+        return instance
+
     @property
     def total_price(self):
         return self.unit_price * self.quantity
 
+    def clean_fields(self, exclude=None):
+        # Существование уже загруженных заказа и товара не проверяется запросом
+        exclude = set(exclude or ())
+        exclude.update(
+            field.name for field in self._meta.concrete_fields
+            if field.is_relation and field.is_cached(self)
+        )
+        super().clean_fields(exclude=exclude)
+
     def clean(self):
         if self.quantity <= 0:
             raise ValidationError(gettext_lazy("Quantity must be positive"))
 
+        if not OrderItem.product.is_cached(self):
+            product = identity_map().load(Product, self.product_id)
+            if product is not None:
+                self.product = product
+
         if not self.unit_price:
             self.unit_price = self.product.price
 
         # Проверяем наличие товара при создании/изменении
         if self.pk:
-            original = OrderItem.objects.get(pk=self.pk)
-            quantity_change = self.quantity - original.quantity
+            original_quantity = getattr(self, '_loaded_quantity', None)
+            if original_quantity is None:
+                original_quantity = OrderItem.objects.get(pk=self.pk).quantity
+            quantity_change = self.quantity - original_quantity
         else:
             quantity_change = self.quantity
 
-        if self.product.quantity < quantity_change:
+        # Остаток шардированных товаров проверяется при резервировании
+        if not self.product.sharded_stock and self.product.quantity < quantity_change:
             raise ValidationError(
                 gettext_lazy("Insufficient stock. Available: %(available)s, requested: %(requested)s") % {
                     'available': self.product.quantity,
@@ -209,6 +423,211 @@ class OrderItem(models.Model):
     def save(self, *args, **kwargs):
         self.full_clean()
         super().save(*args, **kwargs)
+        self._loaded_quantity = self.quantity
+        if not OrderItem.order.is_cached(self):
+            order = identity_map().load(Order, self.order_id)
+            if order is not None:
+                self.order = order
         # Обновляем общую сумму заказа
         if self.order:
-            self.order.save()
\ No newline at end of file
+            self.order.save()
+
+
+class ArchivedOrder(models.Model):
+    """
+    Завершенный заказ, перенесенный из orders в архив. Идентификатор и даты
+    сохраняются, поэтому заказ доступен по тому же id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.PROTECT, verbose_name=gettext_lazy('customer'))
+    status = models.CharField(gettext_lazy('status'), max_length=20, choices=Order.Status.choices)
+    total_amount = models.DecimalField(gettext_lazy('total amount'), max_digits=12, decimal_places=2)
+    notes = models.TextField(gettext_lazy('notes'), blank=True)
+    created_at = models.DateTimeField(gettext_lazy('created at'))
+    updated_at = models.DateTimeField(gettext_lazy('updated at'))
+    archived_at = models.DateTimeField(gettext_lazy('archived at'), auto_now_add=True)
+
+    class Meta:
+        db_table = 'orders_archive'
+        verbose_name = gettext_lazy('archived order')
+        verbose_name_plural = gettext_lazy('archived orders')
+        indexes = [
+            models.Index(fields=['customer', 'created_at', 'id', 'status'], name='orders_arch_cust_history_idx'),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Archived order {self.id} ({self.status})"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder, on_delete=models.CASCADE, related_name='items', verbose_name=gettext_lazy('order')
+    )
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, verbose_name=gettext_lazy('product'))
+    quantity = models.IntegerField(gettext_lazy('quantity'))
+    unit_price = models.DecimalField(gettext_lazy('unit price'), max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(gettext_lazy('created at'))
+
+    class Meta:
+        db_table = 'order_items_archive'
+        verbose_name = gettext_lazy('archived order item')
+        verbose_name_plural = gettext_lazy('archived order items')
+        indexes = [
+            models.Index(fields=['order']),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} x {self.quantity}"
+
+    @property
+    def total_price(self):
+        return self.unit_price * self.quantity
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Результат запроса с заголовком Idempotency-Key. Повтор с тем же ключом
+    получает сохраненный ответ, пока запись не истекла (expires_at).
+    """
+    class Status(models.TextChoices):
+        IN_PROGRESS = 'in_progress', gettext_lazy('In progress')
+        COMPLETED = 'completed', gettext_lazy('Completed')
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=gettext_lazy('user'))
+    key = models.CharField(gettext_lazy('key'), max_length=255)
+    fingerprint = models.CharField(gettext_lazy('request fingerprint'), max_length=64)
+    status = models.CharField(gettext_lazy('status'), max_length=20, choices=Status.choices, default=Status.IN_PROGRESS)
+    response_status = models.PositiveSmallIntegerField(gettext_lazy('response status'), null=True, blank=True)
+    response_body = models.JSONField(gettext_lazy('response body'), null=True, blank=True)
+    created_at = models.DateTimeField(gettext_lazy('created at'), auto_now_add=True)
+    expires_at = models.DateTimeField(gettext_lazy('expires at'))
+
+    class Meta:
+        db_table = 'idempotency_records'
+        verbose_name = gettext_lazy('idempotency record')
+        verbose_name_plural = gettext_lazy('idempotency records')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                name='unique_user_idempotency_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status})"
+
+
+class OutboxEvent(models.Model):
+    """
+    Событие для внешних систем, записанное в той же транзакции, что и
+    изменение заказа. Доставляется командой dispatch_outbox не менее
+    одного раза; получатели отбрасывают повторы по id.
+    """
+    event_type = models.CharField(gettext_lazy('event type'), max_length=64)
+    aggregate_type = models.CharField(gettext_lazy('aggregate type'), max_length=32)
+    aggregate_id = models.BigIntegerField(gettext_lazy('aggregate id'))
+    payload = models.JSONField(gettext_lazy('payload'), encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(gettext_lazy('created at'), auto_now_add=True)
+    # Когда событие можно отправлять (сдвигается при ошибке доставки)
+    available_at = models.DateTimeField(gettext_lazy('available at'), default=timezone.now)
+    # Аренда: до locked_until событие обрабатывает диспетчер locked_by
+    locked_until = models.DateTimeField(gettext_lazy('locked until'), null=True, blank=True)
+    locked_by = models.CharField(gettext_lazy('locked by'), max_length=64, blank=True)
+    attempts = models.PositiveIntegerField(gettext_lazy('attempts'), default=0)
+    last_error = models.TextField(gettext_lazy('last error'), blank=True)
+    dispatched_at = models.DateTimeField(gettext_lazy('dispatched at'), null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        verbose_name = gettext_lazy('outbox event')
+        verbose_name_plural = gettext_lazy('outbox events')
+        indexes = [
+            # Частичный индекс: диспетчер читает только неотправленные события
+            models.Index(
+                fields=['id'], name='outbox_pending_idx',
+                condition=models.Q(dispatched_at__isnull=True)
+            ),
+            models.Index(fields=['dispatched_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
+
+
+class Job(models.Model):
+    """
+    Фоновая задача, выполняемая командой run_workers. Воркер забирает
+    задачу в аренду на время видимости (locked_until): если воркер упал,
+    по истечении аренды задача возвращается в очередь.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'queued', gettext_lazy('Queued')
+        RUNNING = 'running', gettext_lazy('Running')
+        SUCCEEDED = 'succeeded', gettext_lazy('Succeeded')
+        FAILED = 'failed', gettext_lazy('Failed')
+
+    task = models.CharField(gettext_lazy('task'), max_length=100)
+    args = models.JSONField(gettext_lazy('arguments'), default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(gettext_lazy('status'), max_length=20, choices=Status.choices, default=Status.QUEUED)
+    # Большее значение выполняется раньше
+    priority = models.SmallIntegerField(gettext_lazy('priority'), default=0)
+    attempts = models.PositiveIntegerField(gettext_lazy('attempts'), default=0)
+    max_attempts = models.PositiveIntegerField(gettext_lazy('max attempts'), default=3)
+    available_at = models.DateTimeField(gettext_lazy('available at'), default=timezone.now)
+    locked_until = models.DateTimeField(gettext_lazy('locked until'), null=True, blank=True)
+    locked_by = models.CharField(gettext_lazy('locked by'), max_length=64, blank=True)
+    result = models.JSONField(gettext_lazy('result'), null=True, blank=True, encoder=DjangoJSONEncoder)
+    last_error = models.TextField(gettext_lazy('last error'), blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        verbose_name=gettext_lazy('created by')
+    )
+    created_at = models.DateTimeField(gettext_lazy('created at'), auto_now_add=True)
+    started_at = models.DateTimeField(gettext_lazy('started at'), null=True, blank=True)
+    finished_at = models.DateTimeField(gettext_lazy('finished at'), null=True, blank=True)
+
+    class Meta:
+        db_table = 'jobs'
+        verbose_name = gettext_lazy('job')
+        verbose_name_plural = gettext_lazy('jobs')
+        indexes = [
+            # Очередь: воркер читает только ожидающие задачи в порядке выполнения
+            models.Index(
+                fields=['-priority', 'available_at', 'id'], name='jobs_queue_idx',
+                condition=models.Q(status='queued')
+            ),
+            # Поиск задач с истекшей арендой
+            models.Index(
+                fields=['locked_until'], name='jobs_running_idx',
+                condition=models.Q(status='running')
+            ),
+            models.Index(fields=['finished_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+class RateLimitCounter(models.Model):
+    """
+    Счетчики скользящего окна ограничения частоты для общего кэша в БД:
+    одна строка на ключ (пользователь или эндпоинт) хранит номер текущего
+    окна и число запросов в текущем и предыдущем окне.
+    """
+    key = models.CharField(gettext_lazy('key'), max_length=200, primary_key=True)
+    window = models.BigIntegerField(gettext_lazy('window'))
+    current = models.PositiveIntegerField(gettext_lazy('current window count'), default=0)
+    previous = models.PositiveIntegerField(gettext_lazy('previous window count'), default=0)
+
+    class Meta:
+        db_table = 'rate_limit_counters'
+        verbose_name = gettext_lazy('rate limit counter')
+        verbose_name_plural = gettext_lazy('rate limit counters')
+
+    def __str__(self):
+        return f"{self.key}: {self.current}"
@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import socket
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = 'order.created'
+ORDER_ITEM_ADDED = 'order.item_added'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+
+
+def publish(event_type, aggregate, payload):
+    """
+    Записывает событие в outbox. Вызывается внутри транзакции изменения:
+    событие фиксируется вместе с изменением или откатывается вместе с ним.
+    """
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        aggregate_type=aggregate._meta.model_name,
+        aggregate_id=aggregate.pk,
+        payload=payload,
+    )
+
+
+def publish_many(event_type, aggregate_type, payloads):
+    """Записывает события одним INSERT; payloads — пары (id агрегата, payload)"""
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(
+            event_type=event_type, aggregate_type=aggregate_type,
+            aggregate_id=aggregate_id, payload=payload,
+        )
+        for aggregate_id, payload in payloads
+    ])
+
+
+def change_order_status(queryset, new_status):
+    """
+    Массовая смена статуса заказов (действия админки) с событием
+    order.status_changed для каждого заказа, статус которого изменился.
+    Возвращает число обновленных заказов.
+    """
+    with transaction.atomic():
+        changed = list(
+            queryset.select_for_update().exclude(status=new_status).values_list('id', 'status')
+        )
+        updated = queryset.model.objects.filter(
+            id__in=[order_id for order_id, _ in changed]
+        ).update(status=new_status)
+        publish_many(ORDER_STATUS_CHANGED, queryset.model._meta.model_name, [
+            (order_id, {'order_id': order_id, 'old_status': old_status, 'new_status': new_status})
+            for order_id, old_status in changed
+        ])
+    return updated
+
+
+def event_message(event):
+    """Сообщение для приемника; id события — ключ дедупликации у получателя"""
+    return {
+        'id': event.id,
+        'type': event.event_type,
+        'aggregate_type': event.aggregate_type,
+        'aggregate_id': event.aggregate_id,
+        'created_at': event.created_at.isoformat(),
+        'payload': event.payload,
+    }
+
+
+class FileSink:
+    """Дописывает события в NDJSON-файл, пачка сбрасывается на диск fsync"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class HttpSink:
+    """Отправляет пачку событий POST-запросом {"events": [...]}; не 2xx — ошибка"""
+
+    def __init__(self, url, timeout=None):
+        self.url = url
+        self.timeout = settings.OUTBOX_HTTP_TIMEOUT if timeout is None else timeout
+
+    def send(self, messages):
+        body = json.dumps({'events': messages}, cls=DjangoJSONEncoder).encode()
+        request = urllib.request.Request(
+            self.url, data=body, method='POST',
+            headers={'Content-Type': 'application/json'},
+        )
+        # urlopen сам поднимает HTTPError для ответов 4xx/5xx
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if not 200 <= response.status < 300:
+                raise OSError(f'Unexpected response status {response.status}')
+
+
+def get_sink(spec=None):
+    """
+    Приемник по строке: file:<путь>, http(s)://<url> или путь к классу
+    с методом send(messages), например myproject.sinks.KafkaSink.
+    """
+    spec = spec or settings.OUTBOX_SINK
+    if spec.startswith('file:'):
+        return FileSink(spec[len('file:'):])
+    if spec.startswith(('http://', 'https://')):
+        return HttpSink(spec)
+    return import_string(spec)()
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'[:64]
+
+
+def claim_batch(batch_size, lease_seconds, worker):
+    """
+    Забирает пачку готовых к отправке событий в аренду. Строки, заблокированные
+    другим диспетчером, пропускаются (SKIP LOCKED), поэтому несколько
+    диспетчеров разбирают очередь параллельно без ожидания друг друга.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects
+            .filter(dispatched_at__isnull=True, available_at__lte=now)
+            .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+                locked_until=now + timedelta(seconds=lease_seconds), locked_by=worker
+            )
+    return events
+
+
+def retry_delay(attempts):
+    """Экспоненциальная пауза перед повтором: 2, 4, 8... с, не больше предела"""
+    return min(2 ** attempts, settings.OUTBOX_MAX_BACKOFF_SECONDS)
+
+
+def dispatch_batch(sink, batch_size=None, lease_seconds=None, worker=None):
+    """
+    Отправляет одну пачку событий. Возвращает (отправлено, с ошибкой).
+    Отметка об отправке ставится после успешного send(): при падении
+    диспетчера между ними пачка уйдет повторно после истечения аренды.
+    """
+    events = claim_batch(
+        batch_size or settings.OUTBOX_BATCH_SIZE,
+        lease_seconds or settings.OUTBOX_LEASE_SECONDS,
+        worker or worker_id(),
+    )
+    if not events:
+        return 0, 0
+
+    try:
+        sink.send([event_message(event) for event in events])
+    except Exception as e:
+        now = timezone.now()
+        for event in events:
+            event.attempts += 1
+            event.available_at = now + timedelta(seconds=retry_delay(event.attempts))
+            event.locked_until = None
+            event.locked_by = ''
+            event.last_error = str(e)[:1000]
+        OutboxEvent.objects.bulk_update(
+            events, ['attempts', 'available_at', 'locked_until', 'locked_by', 'last_error']
+        )
+        logger.warning(f"Outbox dispatch of {len(events)} events failed: {e}")
+        return 0, len(events)
+
+    OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+        dispatched_at=timezone.now(), locked_until=None, locked_by='',
+        attempts=F('attempts') + 1, last_error='',
+    )
+    return len(events), 0
+
+
+def drain(sink, batch_size=None, lease_seconds=None, max_batches=None):
+    """
+    Отправляет пачки, пока есть готовые события или не исчерпан max_batches.
+    Остановка на первой неудачной пачке: приемник, скорее всего, недоступен.
+    """
+    worker = worker_id()
+    dispatched = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        sent, errors = dispatch_batch(sink, batch_size, lease_seconds, worker)
+        dispatched += sent
+        failed += errors
+        batches += 1
+        if not sent:
+            break
+    return dispatched, failed
+
+
+def purge_dispatched(days):
+    """Удаляет отправленные события старше N дней"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEvent.objects.filter(dispatched_at__lt=cutoff).delete()
+    return deleted
+
+
+def outbox_stats():
+    """
+    Метрики outbox: число неотправленных событий, задержка отправки
+    (возраст самого старого из них) и задержка последнего отправленного.
+    """
+    now = timezone.now()
+    pending = OutboxEvent.objects.filter(dispatched_at__isnull=True)
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    last = (
+        OutboxEvent.objects.filter(dispatched_at__isnull=False)
+        .order_by('-dispatched_at').values('created_at', 'dispatched_at').first()
+    )
+    return {
+        'pending': pending.count(),
+        'retrying': pending.filter(attempts__gt=0).count(),
+        'lag_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+        'last_dispatch_lag_seconds': (
+            round((last['dispatched_at'] - last['created_at']).total_seconds(), 3) if last else None
+        ),
+    }
+
+
+metrics.register('outbox', outbox_stats)
@@ -0,0 +1,34 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def keyset_q(created_at, pk, descending=False):
+    """Условие keyset-пагинации по паре (created_at, id)"""
+    if descending:
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+
+
+def encode_cursor(created_at, pk):
+    """Непрозрачный курсор следующей страницы из пары (created_at, id)"""
+    payload = json.dumps([created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """Пара (created_at, id) из курсора; ValueError, если курсор поврежден"""
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        moment = parse_datetime(created_at)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if moment is None or not isinstance(pk, int):
+        raise ValueError("Invalid cursor")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment, pk
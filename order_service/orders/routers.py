@@ -0,0 +1,69 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+# Модели, которые читаются там же, куда пишутся: сразу после записи
+# реплика может вернуть старое значение (счетчики лимитов запросов)
+PRIMARY_ONLY_MODELS = {'orders.ratelimitcounter'}
+
+
+@contextmanager
+def replica_reads(unless=None):
+    """
+    Разрешает чтение с реплик внутри блока (безопасные GET и отчеты).
+    unless — проверка перед каждым чтением: пока она истинна, чтение идет
+    в основную БД (закрепление клиента после записи).
+    """
+    token = _replica_reads.set(unless or True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Принудительно читает с основной БД внутри блока"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Направляет чтение на реплики из settings.REPLICA_DATABASES, только если
+    оно явно разрешено (replica_reads) и не идет внутри транзакции основной
+    БД: select_for_update и чтения рядом с записью остаются на основной.
+    Запись всегда выполняется в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'REPLICA_DATABASES', [])
+        allowed = _replica_reads.get()
+        if not replicas or not allowed:
+            return DEFAULT_DB_ALIAS
+        # Кэш в БД (DatabaseCache) читается там же, куда пишется
+        if model._meta.app_label == 'django_cache' or model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if allowed is not True and allowed():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in getattr(settings, 'REPLICA_DATABASES', [])
@@ -0,0 +1,128 @@
+import logging
+import re
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMS = 10
+
+# SQLite: внешняя FTS5-таблица по products, синхронизируемая триггерами,
+# поэтому индекс обновляется и при save(), и при bulk_create/update()
+SQLITE_TABLE = 'products_fts'
+SQLITE_TRIGGERS = {
+    'products_fts_ai': """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, sku, description)
+            VALUES (new.id, new.name, new.sku, new.description);
+        END
+    """,
+    'products_fts_ad': """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, sku, description)
+            VALUES ('delete', old.id, old.name, old.sku, old.description);
+        END
+    """,
+    # Изменение остатка и цены не переиндексирует товар
+    'products_fts_au': """
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, sku, description ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, sku, description)
+            VALUES ('delete', old.id, old.name, old.sku, old.description);
+            INSERT INTO products_fts(rowid, name, sku, description)
+            VALUES (new.id, new.name, new.sku, new.description);
+        END
+    """,
+}
+
+# PostgreSQL: индексы по выражению поддерживаются самой СУБД
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(products.name, '') || ' ' || "
+    "coalesce(products.sku, '') || ' ' || coalesce(products.description, ''))"
+)
+PG_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS products_search_idx ON products USING GIN ({PG_DOCUMENT})",
+    "CREATE INDEX IF NOT EXISTS products_name_trgm_idx ON products USING GIN (name gin_trgm_ops)",
+]
+
+
+def search_terms(query):
+    """Слова запроса в нижнем регистре; каждое ищется как префикс"""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def ensure_search_index(using='default', **kwargs):
+    """
+    Создает полнотекстовый индекс, если его нет. Вызывается после migrate:
+    SQLite при изменении схемы пересоздает таблицу products вместе с
+    триггерами, поэтому они проверяются после каждой миграции.
+    """
+    connection = connections[using]
+    if 'products' not in connection.introspection.table_names():
+        return
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = %s OR name IN (%s, %s, %s)",
+                [SQLITE_TABLE, *SQLITE_TRIGGERS]
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            if existing >= {SQLITE_TABLE, *SQLITE_TRIGGERS}:
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5("
+                "name, sku, description, content='products', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            for statement in SQLITE_TRIGGERS.values():
+                cursor.execute(statement)
+            # Без триггеров индекс мог отстать от таблицы
+            cursor.execute(f"INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}) VALUES ('rebuild')")
+        logger.info("SQLite full-text index for products rebuilt")
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for statement in PG_STATEMENTS:
+                cursor.execute(statement)
+
+
+def search_products(queryset, query):
+    """
+    Фильтрует товары по полнотекстовому индексу и добавляет аннотацию
+    search_rank (чем больше, тем релевантнее). Каждое слово запроса
+    ищется по префиксу, все слова должны совпасть.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # bm25 возвращает отрицательные значения: меньше — релевантнее
+        return queryset.extra(
+            tables=[SQLITE_TABLE],
+            where=[f'{SQLITE_TABLE}.rowid = products.id', f'{SQLITE_TABLE} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'-bm25({SQLITE_TABLE}, 10.0, 5.0, 1.0)'},
+        )
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        # Триграммы (оператор %, порог pg_trgm.similarity_threshold)
+        # находят названия с опечатками, которых нет в tsvector
+        return queryset.extra(
+            where=[
+                f"({PG_DOCUMENT} @@ to_tsquery('simple', %s) "
+                "OR products.name %% %s)"
+            ],
+            params=[tsquery, query],
+            select={
+                'search_rank': f"ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s)) "
+                               "+ similarity(products.name, %s)"
+            },
+            select_params=[tsquery, query],
+        )
+
+    # Прочие СУБД: поиск без индекса
+    for term in terms:
+        queryset = queryset.filter(name__icontains=term)
+    return queryset.extra(select={'search_rank': '0'})
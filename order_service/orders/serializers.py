@@ -1,6 +1,12 @@
 from rest_framework import serializers
 
-from .models import OrderItem, Order, Product
+from .availability import MAX_QUOTE_LINES
+from .checkout import MAX_ORDER_LINES
+from .fieldsets import SparseFieldsMixin
+from .loaders import identity_map
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, Customer, Job, OrderItem, Order, Product, StockAlert
+)
 
 
 class OrderItemSerializer(serializers.Serializer):
@@ -8,16 +14,59 @@ class OrderItemSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1)
 
     def validate_product_id(self, value):
-        if not Product.objects.filter(id=value, is_active=True).exists():
+        # Товар остается в карте запроса и не загружается повторно во view
+        product = identity_map().load(Product, value)
+        if product is None or not product.is_active:
             raise serializers.ValidationError("Product does not exist or is not active")
         return value
 
 
+class OrderLineSerializer(serializers.Serializer):
+    """Позиция корзины или создаваемого заказа"""
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class OrderCreateSerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField(min_value=1)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+    items = OrderLineSerializer(many=True, allow_empty=False, max_length=MAX_ORDER_LINES)
+
+    def validate_customer_id(self, value):
+        customer = identity_map().load(Customer, value)
+        if customer is None:
+            raise serializers.ValidationError("Customer does not exist")
+        return value
+
+
+class AvailabilityRequestSerializer(serializers.Serializer):
+    lines = OrderLineSerializer(many=True, allow_empty=False, max_length=MAX_QUOTE_LINES)
+
+
+class AvailabilityQuoteLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    available = serializers.BooleanField()
+    # not_found, inactive, insufficient_stock или null
+    reason = serializers.CharField(allow_null=True)
+    is_active = serializers.BooleanField(allow_null=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    available_quantity = serializers.IntegerField(allow_null=True)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2, allow_null=True)
+
+
+class AvailabilityQuoteSerializer(serializers.Serializer):
+    lines = AvailabilityQuoteLineSerializer(many=True)
+    available = serializers.BooleanField()
+    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
 class OrderItemDetailSerializer(serializers.ModelSerializer):
-    product_id = serializers.IntegerField(source='product.id')
+    # product_id читается из колонки позиции, без загрузки товара
+    product_id = serializers.IntegerField()
     product_name = serializers.CharField(source='product.name')
     unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
-    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, source='total_price')
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2)
 
     class Meta:
         model = OrderItem
@@ -27,7 +76,7 @@ class OrderItemDetailSerializer(serializers.ModelSerializer):
         ]
 
 
-class OrderDetailSerializer(serializers.ModelSerializer):
+class OrderDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemDetailSerializer(many=True, read_only=True)
     customer_name = serializers.CharField(source='customer.name')
     customer_email = serializers.CharField(source='customer.email')
@@ -42,6 +91,19 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         ]
 
 
+class ArchivedOrderItemDetailSerializer(OrderItemDetailSerializer):
+    class Meta(OrderItemDetailSerializer.Meta):
+        model = ArchivedOrderItem
+
+
+class ArchivedOrderDetailSerializer(OrderDetailSerializer):
+    items = ArchivedOrderItemDetailSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = OrderDetailSerializer.Meta.fields + ['archived_at']
+
+
 class OrderStatusSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=Order.Status.choices)
 
@@ -51,7 +113,7 @@ class OrderStatusSerializer(serializers.Serializer):
         return value
 
 
-class ProductStockSerializer(serializers.ModelSerializer):
+class ProductStockSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     in_stock = serializers.BooleanField(read_only=True)
     low_stock = serializers.BooleanField(read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -61,4 +123,56 @@ class ProductStockSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'quantity', 'price', 
             'in_stock', 'low_stock', 'category_name', 'is_active'
-        ]
\ No newline at end of file
+        ]
+
+
+class ProductSearchSerializer(ProductStockSerializer):
+    search_rank = serializers.FloatField(read_only=True)
+
+    class Meta(ProductStockSerializer.Meta):
+        fields = ['id', 'sku', 'name', 'description'] + ProductStockSerializer.Meta.fields[2:] + ['search_rank']
+
+
+class CustomerLookupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Customer
+        fields = ['id', 'name', 'email', 'phone', 'address', 'created_at']
+
+
+class CustomerOrderHistorySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.CharField()
+    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
+    archived = serializers.BooleanField()
+
+
+class StockAlertSerializer(serializers.ModelSerializer):
+    product_id = serializers.IntegerField()
+    sku = serializers.CharField(source='product.sku')
+    name = serializers.CharField(source='product.name')
+    category_name = serializers.CharField(source='product.category.name')
+    quantity = serializers.IntegerField(source='product.quantity')
+
+    class Meta:
+        model = StockAlert
+        fields = [
+            'product_id', 'sku', 'name', 'category_name',
+            'quantity', 'threshold', 'level', 'changed_at'
+        ]
+
+
+class JobCreateSerializer(serializers.Serializer):
+    task = serializers.CharField(max_length=100)
+    args = serializers.DictField(required=False, default=dict)
+    priority = serializers.IntegerField(min_value=-100, max_value=100, required=False, default=0)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'task', 'status', 'priority', 'attempts', 'max_attempts',
+            'result', 'last_error', 'created_at', 'started_at', 'finished_at'
+        ]
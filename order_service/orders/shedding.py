@@ -0,0 +1,178 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+HIGH = 'high'
+NORMAL = 'normal'
+LOW = 'low'
+
+
+class LatencyEwma:
+    """
+    Экспоненциальное скользящее среднее длительности запросов к БД. Без новых
+    замеров значение затухает с полупериодом half_life секунд, чтобы
+    эндпоинты, которые перестали обслуживаться из-за высокой задержки, не
+    оставались отключенными навсегда.
+    """
+
+    def __init__(self, alpha=0.1, half_life=5.0):
+        self.alpha = alpha
+        self.half_life = half_life
+        self._value = 0.0
+        self._updated_at = None
+
+    def _decayed(self, now):
+        if self._updated_at is None:
+            return 0.0
+        return self._value * math.pow(0.5, (now - self._updated_at) / self.half_life)
+
+    def observe(self, seconds, now):
+        current = self._decayed(now)
+        self._value = current + self.alpha * (seconds - current)
+        self._updated_at = now
+
+    def value(self, now):
+        return self._decayed(now)
+
+
+class LoadTracker:
+    """
+    Состояние нагрузки процесса: запросы в обработке по имени URL и
+    задержка БД (общая и по эндпоинтам). Решение о приеме запроса:
+
+    - лимит одновременных запросов эндпоинта (LOAD_SHEDDING_CONCURRENCY)
+      действует для любого приоритета;
+    - high (запись заказов) ограничивается только им;
+    - normal отклоняется, когда в обработке LOAD_SHEDDING_MAX_INFLIGHT запросов;
+    - low отклоняется уже при половине этого числа или когда задержка БД
+      выше LOAD_SHEDDING_DB_LATENCY_MS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.inflight = {}
+            self.total = 0
+            self.db_latency = LatencyEwma()
+            self.endpoint_latency = {}
+            self.admitted = 0
+            self.shed = {}
+
+    def admit(self, name, priority, now=None):
+        """Занимает место под запрос; возвращает причину отказа или None"""
+        now = time.monotonic() if now is None else now
+        limit = settings.LOAD_SHEDDING_CONCURRENCY.get(name)
+        max_inflight = settings.LOAD_SHEDDING_MAX_INFLIGHT
+        with self._lock:
+            reason = None
+            if limit is not None and self.inflight.get(name, 0) >= limit:
+                reason = 'concurrency'
+            elif priority == LOW and self.total >= max_inflight // 2:
+                reason = 'inflight'
+            elif priority == LOW and (
+                self.db_latency.value(now) * 1000 > settings.LOAD_SHEDDING_DB_LATENCY_MS
+            ):
+                reason = 'db_latency'
+            elif priority == NORMAL and self.total >= max_inflight:
+                reason = 'inflight'
+
+            if reason:
+                shed = self.shed.setdefault(name, {})
+                shed[reason] = shed.get(reason, 0) + 1
+                return reason
+            self.inflight[name] = self.inflight.get(name, 0) + 1
+            self.total += 1
+            self.admitted += 1
+            return None
+
+    def release(self, name):
+        with self._lock:
+            self.inflight[name] -= 1
+            self.total -= 1
+
+    def observe_query(self, name, seconds, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.db_latency.observe(seconds, now)
+            if name is not None:
+                self.endpoint_latency.setdefault(name, LatencyEwma()).observe(seconds, now)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'inflight': self.total,
+                'admitted': self.admitted,
+                'db_latency_ms': round(self.db_latency.value(now) * 1000, 2),
+                'endpoints': {
+                    name: {
+                        'inflight': self.inflight.get(name, 0),
+                        'db_latency_ms': round(
+                            self.endpoint_latency[name].value(now) * 1000, 2
+                        ) if name in self.endpoint_latency else 0.0,
+                        'shed': dict(self.shed.get(name, {})),
+                    }
+                    for name in sorted(set(self.inflight) | set(self.endpoint_latency) | set(self.shed))
+                },
+            }
+
+
+tracker = LoadTracker()
+
+# Запрос, чьи обращения к БД сейчас замеряются; переменная контекста
+# видна и в потоках sync_to_async, и при отдаче потокового ответа
+_measured_request = ContextVar('load_shedding_request', default=None)
+
+
+@contextmanager
+def measuring(request):
+    """Замеряет запросы к БД внутри блока для эндпоинта request.load_shedding_name"""
+    token = _measured_request.set(request)
+    try:
+        yield
+    finally:
+        _measured_request.reset(token)
+
+
+def timed_query(execute, sql, params, many, context):
+    request = _measured_request.get()
+    if request is None:
+        return execute(sql, params, many, context)
+    started = time.monotonic()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tracker.observe_query(request.load_shedding_name, time.monotonic() - started)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Обертка ставится на соединение один раз: соединения живут в своих
+    # потоках, и обертка на время запроса не видит потоков sync_to_async
+    if timed_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_query)
+
+
+def priority_for(name, method=None):
+    """Приоритет по "МЕТОД имя" (например, "POST order-list"), иначе по имени URL"""
+    priorities = settings.LOAD_SHEDDING_PRIORITIES
+    return priorities.get(f'{method} {name}', priorities.get(name, NORMAL))
+
+
+def shedding_stats():
+    """Метрики сброса нагрузки текущего процесса"""
+    return tracker.snapshot()
+
+
+metrics.register('load_shedding', shedding_stats)
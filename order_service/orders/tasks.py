@@ -0,0 +1,72 @@
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+from .archive import archive_orders as archive_completed_orders
+from .exports import csv_lines, export_queryset, ndjson_lines, parse_period_boundary
+from .idempotency import purge_expired
+from .inventory import reconcile
+from .jobs import task
+from .models import Order
+from .watchlist import sync_watchlist
+
+RECALCULATE_BATCH_SIZE = 1000
+
+
+@task()
+def recalculate_order_totals(order_ids=None, batch_size=RECALCULATE_BATCH_SIZE):
+    """Пересчитывает total_amount заказов (по умолчанию всех) пачками по id"""
+    orders = Order.objects.all()
+    if order_ids is not None:
+        orders = orders.filter(id__in=order_ids)
+    updated = 0
+    last_id = 0
+    while True:
+        ids = list(orders.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return {'updated': updated}
+        last_id = ids[-1]
+        updated += Order.objects.filter(id__in=ids).recalculate_totals()
+
+
+@task()
+def archive_orders(days=None, max_batches=None):
+    """Архивация завершенных заказов (см. команду archive_orders)"""
+    return {'archived': archive_completed_orders(days=days, max_batches=max_batches)}
+
+
+@task()
+def export_orders(format='ndjson', date_from=None, date_to=None):
+    """Выгрузка заказов за период в файл в JOBS_EXPORT_DIR"""
+    if format not in ('ndjson', 'csv'):
+        raise ValueError(f"Unsupported export format: {format}")
+    orders = export_queryset(
+        parse_period_boundary(date_from), parse_period_boundary(date_to, end_of_day=True)
+    )
+    lines = csv_lines(orders) if format == 'csv' else ndjson_lines(orders)
+
+    os.makedirs(settings.JOBS_EXPORT_DIR, exist_ok=True)
+    path = os.path.join(
+        settings.JOBS_EXPORT_DIR, f"orders-{timezone.now():%Y%m%d-%H%M%S-%f}.{format}"
+    )
+    size = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for line in lines:
+            size += f.write(line)
+    return {'path': path, 'size': size}
+
+
+@task()
+def sync_stock_watchlist():
+    return {'changed': sync_watchlist()}
+
+
+@task()
+def reconcile_stock():
+    return {'updated': reconcile()}
+
+
+@task()
+def purge_idempotency_keys():
+    return {'deleted': purge_expired()}
@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import IntegrityError, router, transaction
+from django.db.models import Case, F, Value, When
+from rest_framework.throttling import SimpleRateThrottle, UserRateThrottle
+
+from .models import RateLimitCounter
+
+
+class CacheWindowCounters:
+    """
+    Счетчики окон в общем кэше: по ключу на окно, add() + incr() атомарны
+    в Redis (INCR) и в locmem. Ключ живет два окна, поэтому на каждого
+    пользователя хранится не больше двух чисел.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def hit(self, key, window, duration):
+        current_key = f'{key}:{window}'
+        self.cache.add(current_key, 0, duration * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # Ключ истек между add() и incr()
+            self.cache.add(current_key, 0, duration * 2)
+            current = self.cache.incr(current_key)
+        return self.cache.get(f'{key}:{window - 1}', 0), current
+
+    def undo(self, key, window):
+        try:
+            self.cache.decr(f'{key}:{window}')
+        except ValueError:
+            pass
+
+
+class DatabaseWindowCounters:
+    """
+    Счетчики окон в таблице rate_limit_counters для DatabaseCache, где
+    incr() не атомарен: сдвиг окна и увеличение выполняются одним
+    условным UPDATE одной строки на ключ.
+    """
+
+    def hit(self, key, window, duration):
+        counters = RateLimitCounter.objects.filter(key=key)
+        updated = counters.update(
+            previous=Case(
+                When(window=window, then=F('previous')),
+                When(window=window - 1, then=F('current')),
+                default=Value(0),
+            ),
+            current=Case(When(window=window, then=F('current') + 1), default=Value(1)),
+            window=Value(window),
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    RateLimitCounter.objects.create(key=key, window=window, current=1)
+                return 0, 1
+            except IntegrityError:
+                # Строку одновременно создал другой запрос
+                return self.hit(key, window, duration)
+        # Чтение сразу после UPDATE — из той же БД, а не с реплики
+        return counters.using(router.db_for_write(RateLimitCounter)).values_list('previous', 'current').get()
+
+    def undo(self, key, window):
+        RateLimitCounter.objects.filter(key=key, window=window, current__gt=0).update(
+            current=F('current') - 1
+        )
+
+
+def window_counters(cache):
+    if isinstance(cache, DatabaseCache):
+        return DatabaseWindowCounters()
+    return CacheWindowCounters(cache)
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Скользящее окно по двум счетчикам: число запросов за последние duration
+    секунд оценивается как current + previous * (доля предыдущего окна,
+    попадающая в скользящее). Состояние — два числа на ключ вместо списка
+    отметок времени, обновление — атомарное увеличение в общем кэше.
+    Отклоненный запрос не учитывается.
+    """
+    cache = caches['default']
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        return self.check(self.key, self.num_requests, self.duration)
+
+    def check(self, key, num_requests, duration):
+        now = self.timer()
+        window = int(now // duration)
+        self.elapsed = (now - window * duration) / duration
+        counters = window_counters(self.cache)
+        previous, current = counters.hit(key, window, duration)
+        self.previous, self.current = previous, current
+        if current + previous * (1 - self.elapsed) <= num_requests:
+            return True
+        counters.undo(key, window)
+        return False
+
+    def wait(self):
+        """Через сколько секунд оценка опустится ниже лимита"""
+        remaining = (1 - self.elapsed) * self.duration
+        if self.current > self.num_requests or not self.previous:
+            return remaining
+        # Вклад предыдущего окна убывает на previous / duration в секунду
+        excess = self.current + self.previous * (1 - self.elapsed) - self.num_requests
+        return min(remaining, excess * self.duration / self.previous)
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottle, UserRateThrottle):
+    """Лимит на пользователя (на IP для анонимных), как UserRateThrottle"""
+
+
+class EndpointThrottle(SlidingWindowThrottle):
+    """
+    Общий для всех клиентов лимит эндпоинта из THROTTLE_ENDPOINT_RATES
+    по "МЕТОД имя" (например, "POST order-list") или по имени URL;
+    эндпоинты без лимита не ограничиваются.
+    """
+    scope = 'endpoint'
+
+    def __init__(self):
+        # Лимит зависит от эндпоинта и выбирается в allow_request
+        pass
+
+    def allow_request(self, request, view):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        rates = settings.THROTTLE_ENDPOINT_RATES
+        name = f'{request.method} {url_name}'
+        if name not in rates:
+            name = url_name
+        rate = rates.get(name)
+        if rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(rate)
+        self.key = f'throttle_endpoint_{name.replace(" ", "_")}'
+        return self.check(self.key, self.num_requests, self.duration)
@@ -1,7 +1,9 @@
 from django.urls import path
+from .async_views import AsyncOrderDetailView, AsyncOrderListView, AsyncProductStockView
 from .views import (
-    AddOrderItemView, OrderDetailView, OrderListView,
-    OrderStatusUpdateView, ProductStockView
+    AddOrderItemView, CustomerLookupView, CustomerOrderHistoryView, JobCreateView, JobStatusView,
+    MetricsView, OrderBatchView, OrderDetailView, OrderExportView, OrderListView, OrderStatusUpdateView,
+    ProductAvailabilityView, ProductImportView, ProductSearchView, ProductStockView, StockWatchlistView
 )
 
 urlpatterns = [
@@ -9,5 +11,19 @@ urlpatterns = [
     path('v1/orders/<int:order_id>/', OrderDetailView.as_view(), name='order-detail'),
     path('v1/orders/<int:order_id>/status/', OrderStatusUpdateView.as_view(), name='order-status-update'),
     path('v1/orders/', OrderListView.as_view(), name='order-list'),
+    path('v1/orders/batch/', OrderBatchView.as_view(), name='order-batch'),
+    path('v1/orders/export/', OrderExportView.as_view(), name='order-export'),
     path('v1/products/stock/', ProductStockView.as_view(), name='product-stock'),
+    path('v1/products/availability/', ProductAvailabilityView.as_view(), name='product-availability'),
+    path('v1/products/import/', ProductImportView.as_view(), name='product-import'),
+    path('v1/products/search/', ProductSearchView.as_view(), name='product-search'),
+    path('v1/products/watchlist/', StockWatchlistView.as_view(), name='product-watchlist'),
+    path('v1/customers/lookup/', CustomerLookupView.as_view(), name='customer-lookup'),
+    path('v1/customers/<int:customer_id>/orders/', CustomerOrderHistoryView.as_view(), name='customer-orders'),
+    path('v1/async/orders/<int:order_id>/', AsyncOrderDetailView.as_view(), name='async-order-detail'),
+    path('v1/async/orders/', AsyncOrderListView.as_view(), name='async-order-list'),
+    path('v1/async/products/stock/', AsyncProductStockView.as_view(), name='async-product-stock'),
+    path('v1/jobs/', JobCreateView.as_view(), name='job-create'),
+    path('v1/jobs/<int:job_id>/', JobStatusView.as_view(), name='job-status'),
+    path('v1/metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
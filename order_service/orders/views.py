@@ -1,33 +1,88 @@
 import logging
+from decimal import Decimal
 
 from django.forms import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.throttling import UserRateThrottle
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from django.db import transaction
+from django.db.models import Count
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 
-from .models import Order, Product, OrderItem
+from . import availability, checkout, inventory, jobs, metrics, outbox
+from .customers import is_phone_query, lookup_customers
+from .exports import (
+    csv_lines, export_queryset, ndjson_lines,
+    parse_checkpoint, parse_period_boundary
+)
+from .fieldsets import (
+    ORDER_COLUMNS, PRODUCT_COLUMNS, parse_fields, parse_order_fieldsets,
+    shape_order_queryset, shape_product_queryset
+)
+from .filters import (
+    MAX_PAGE_SIZE, filter_orders, ordering_warnings, parse_order_filters, parse_order_ids
+)
+from .history import customer_order_count, customer_order_page
+from .idempotency import idempotent
+from .imports import ProductImporter
+from .loaders import identity_map
+from .pagination import decode_cursor, encode_cursor
+from .search import search_products, search_terms
+from .throttling import EndpointThrottle, UserSlidingWindowThrottle
+from .coalescing import request_scope
+from .watchlist import STOCK_LISTING, stock_levels, stock_listing_key, stock_summary
+from .models import ArchivedOrder, Customer, Job, Order, Product, OrderItem, StockAlert
 from .serializers import (
+    ArchivedOrderDetailSerializer,
+    AvailabilityQuoteSerializer,
+    AvailabilityRequestSerializer,
+    CustomerLookupSerializer,
+    CustomerOrderHistorySerializer,
+    JobCreateSerializer,
+    JobSerializer,
+    OrderCreateSerializer,
+    OrderItemDetailSerializer,
     OrderItemSerializer,
     OrderDetailSerializer,
     OrderStatusSerializer,
-    ProductStockSerializer
+    ProductSearchSerializer,
+    ProductStockSerializer,
+    StockAlertSerializer
 )
 
 logger = logging.getLogger(__name__)
 
 
-class OrderItemThrottle(UserRateThrottle):
+def invalid_fields(error):
+    return Response({
+        'error': 'Invalid fields parameter',
+        'details': str(error)
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def job_accepted(request, job):
+    """Ответ 202 на поставленную в очередь задачу со ссылкой на ее статус"""
+    status_url = request.build_absolute_uri(reverse('job-status', args=[job.id]))
+    return Response({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': status_url
+    }, status=status.HTTP_202_ACCEPTED, headers={'Location': status_url})
+
+
+class OrderItemThrottle(UserSlidingWindowThrottle):
     rate = '100/hour'
 
 
 class AddOrderItemView(APIView):
     permission_classes = [IsAuthenticated]
-    throttle_classes = [OrderItemThrottle]
+    throttle_classes = [OrderItemThrottle, EndpointThrottle]
 
+    @idempotent
     def post(self, request, order_id):
         serializer = OrderItemSerializer(data=request.data)
         if not serializer.is_valid():
@@ -39,26 +94,17 @@ class AddOrderItemView(APIView):
 
         try:
             with transaction.atomic():
-                order = get_object_or_404(
-                    Order.objects.select_for_update(), 
-                    id=order_id
-                )
-                product = get_object_or_404(
-                    Product.objects.select_for_update(),
-                    id=product_id,
-                    is_active=True
-                )
-
-                if product.quantity < quantity:
-                    logger.warning(
-                        f"Insufficient stock for product {product_id}. "
-                        f"Requested: {quantity}, Available: {product.quantity}"
-                    )
-                    return Response({
-                        'error': 'Insufficient stock',
-                        'available': product.quantity,
-                        'product_name': product.name
-                    }, status=status.HTTP_400_BAD_REQUEST)
+                loader = identity_map()
+                order = loader.lock(Order.objects.all(), order_id)
+                product = self.get_product(loader, product_id)
+
+                if product.sharded_stock:
+                    try:
+                        inventory.reserve(product.id, quantity)
+                    except inventory.InsufficientStock as e:
+                        return self.insufficient_stock(product, quantity, e.available)
+                elif product.quantity < quantity:
+                    return self.insufficient_stock(product, quantity, product.quantity)
 
                 existing_item = OrderItem.objects.filter(
                     order=order,
@@ -66,8 +112,11 @@ class AddOrderItemView(APIView):
                 ).first()
 
                 if existing_item:
+                    # Уже загруженные заказ и товар не читаются повторно
+                    # при валидации и пересчете суммы
+                    existing_item.order = order
+                    existing_item.product = product
                     existing_item.quantity += quantity
-                    existing_item.full_clean()
                     existing_item.save()
                     action = 'updated'
                 else:
@@ -79,16 +128,24 @@ class AddOrderItemView(APIView):
                     )
                     action = 'created'
 
-                product.quantity -= quantity
-                product.save()
+                if not product.sharded_stock:
+                    product.quantity -= quantity
+                    product.save(update_fields=['quantity', 'updated_at'])
+
+                outbox.publish(outbox.ORDER_ITEM_ADDED, order, {
+                    'order_id': order.id,
+                    'product_id': product.id,
+                    'quantity': quantity,
+                    'action': action,
+                    'order_total': order.total_amount,
+                })
 
                 logger.info(
                     f"Order item {action} for order {order_id}, "
                     f"product {product_id}, quantity {quantity} by user {request.user.username}"
                 )
 
-                order.refresh_from_db()
-
+                # total_amount уже пересчитан в order.save() из OrderItem.save()
                 return Response({
                     'success': True,
                     'message': 'Product added to order successfully',
@@ -109,18 +166,56 @@ class AddOrderItemView(APIView):
                 'error': 'Internal server error'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def get_product(loader, product_id):
+        """
+        Строка обычного товара блокируется до конца транзакции. Строка
+        шардированного товара не блокируется: остаток списывается
+        с одного из шардов (orders/inventory.py).
+        """
+        product = loader.load(Product, product_id)
+        if product is None or not product.is_active:
+            raise Http404("No Product matches the given query.")
+        if not product.sharded_stock:
+            product = loader.lock(Product.objects.filter(is_active=True), product_id)
+        return product
+
+    @staticmethod
+    def insufficient_stock(product, requested, available):
+        logger.warning(
+            f"Insufficient stock for product {product.id}. "
+            f"Requested: {requested}, Available: {available}"
+        )
+        return Response({
+            'error': 'Insufficient stock',
+            'available': available,
+            'product_name': product.name
+        }, status=status.HTTP_400_BAD_REQUEST)
+
 
 class OrderDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, order_id):
         try:
-            order = get_object_or_404(
-                Order.objects.select_related('customer')
-                           .prefetch_related('items__product'),
-                id=order_id
-            )
-            serializer = OrderDetailSerializer(order)
+            fields, item_fields = parse_order_fieldsets(request.query_params, archived=True)
+        except ValueError as e:
+            return invalid_fields(e)
+
+        try:
+            nested_fields = {'items': item_fields}
+            order = shape_order_queryset(Order.objects.all(), fields, item_fields).filter(id=order_id).first()
+            if order is not None:
+                serializer = OrderDetailSerializer(order, fields=fields, nested_fields=nested_fields)
+            else:
+                # Завершенные заказы могли быть перенесены в архив
+                archived_order = get_object_or_404(
+                    shape_order_queryset(ArchivedOrder.objects.all(), fields, item_fields),
+                    id=order_id
+                )
+                serializer = ArchivedOrderDetailSerializer(
+                    archived_order, fields=fields, nested_fields=nested_fields
+                )
             return Response(serializer.data)
 
         except Exception as e:
@@ -130,32 +225,115 @@ class OrderDetailView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
-class OrderListView(APIView):
+class OrderBatchView(APIView):
+    """
+    Несколько заказов за один запрос: GET ?ids=1,2,3 или POST {"ids": [...]}
+    для длинных списков. Заказы читаются одним запросом с клиентом и одним
+    запросом позиций с товарами, не найденные — из архива; ответ — заказы
+    по id и список отсутствующих id.
+    """
     permission_classes = [IsAuthenticated]
+    # POST только читает: не закрепляет клиента за основной БД
+    replica_pin_exempt = True
 
     def get(self, request):
+        return self.batch(request, request.query_params.get('ids'))
+
+    def post(self, request):
+        # Тело — объект {"ids": [...]}; массив или строка в теле — ошибка 400
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        return self.batch(request, ids)
+
+    def batch(self, request, ids):
+        try:
+            ids = parse_order_ids(ids)
+        except ValueError as e:
+            return Response({
+                'error': 'Invalid ids parameter',
+                'details': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         try:
-            orders = Order.objects.select_related('customer').order_by('-created_at')
+            fields, item_fields = parse_order_fieldsets(request.query_params, archived=True)
+        except ValueError as e:
+            return invalid_fields(e)
 
-            status_filter = request.query_params.get('status')
-            if status_filter:
-                orders = orders.filter(status=status_filter)
+        try:
+            nested_fields = {'items': item_fields}
+            orders = list(shape_order_queryset(Order.objects.filter(id__in=ids).order_by(), fields, item_fields))
+            data = self.keyed(orders, OrderDetailSerializer, fields, nested_fields)
+
+            missing = [order_id for order_id in ids if order_id not in data]
+            if missing:
+                # Завершенные заказы могли быть перенесены в архив
+                archived = list(shape_order_queryset(
+                    ArchivedOrder.objects.filter(id__in=missing).order_by(), fields, item_fields
+                ))
+                data.update(self.keyed(archived, ArchivedOrderDetailSerializer, fields, nested_fields))
+
+            return Response({
+                'orders': {str(order_id): data[order_id] for order_id in ids if order_id in data},
+                'missing': [order_id for order_id in ids if order_id not in data]
+            })
+
+        except Exception as e:
+            logger.error(f"Error retrieving order batch: {str(e)}")
+            return Response({
+                'error': 'Error retrieving orders'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def keyed(self, orders, serializer_class, fields, nested_fields):
+        serializer = serializer_class(orders, many=True, fields=fields, nested_fields=nested_fields)
+        return {order.id: item for order, item in zip(orders, serializer.data)}
+
+
+class OrderListView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_throttles(self):
+        # Создание заказа расходует тот же лимит пользователя, что и
+        # добавление позиции: иначе позиции записывались бы в обход него
+        if self.request.method == 'POST':
+            return [OrderItemThrottle(), EndpointThrottle()]
+        return super().get_throttles()
 
+    def get(self, request):
+        try:
+            filters, ordering = parse_order_filters(request.query_params)
+            fields, item_fields = parse_order_fieldsets(request.query_params)
             page = int(request.query_params.get('page', 1))
-            page_size = int(request.query_params.get('page_size', 20))
+            page_size = min(int(request.query_params.get('page_size', 20)), MAX_PAGE_SIZE)
+            if page < 1 or page_size < 1:
+                raise ValueError("page and page_size must be positive")
+        except ValueError as e:
+            return Response({
+                'error': 'Invalid list parameters',
+                'details': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            orders = filter_orders(Order.objects.all(), filters, ordering)
+
             start = (page - 1) * page_size
             end = start + page_size
 
-            paginated_orders = orders[start:end]
-            serializer = OrderDetailSerializer(paginated_orders, many=True)
+            paginated_orders = shape_order_queryset(orders[start:end], fields, item_fields)
+            serializer = OrderDetailSerializer(
+                paginated_orders, many=True, fields=fields, nested_fields={'items': item_fields}
+            )
+            total_orders = orders.count()
 
-            return Response({
+            data = {
                 'orders': serializer.data,
                 'page': page,
                 'page_size': page_size,
-                'total_orders': orders.count(),
-                'has_next': end < orders.count()
-            })
+                'total_orders': total_orders,
+                'has_next': end < total_orders
+            }
+            warnings = ordering_warnings(filters, ordering)
+            if warnings:
+                logger.warning(f"Unindexed order list request: {'; '.join(warnings)}")
+                data['warnings'] = warnings
+            return Response(data)
 
         except Exception as e:
             logger.error(f"Error listing orders: {str(e)}")
@@ -163,10 +341,90 @@ class OrderListView(APIView):
                 'error': 'Error retrieving orders list'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @idempotent
+    def post(self, request):
+        """Создание заказа со всеми позициями одним запросом (orders/checkout.py)"""
+        serializer = OrderCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.warning(f"Validation error creating order: {serializer.errors}")
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        try:
+            order, items = checkout.create_order(
+                identity_map().load(Customer, data['customer_id']), data['items'], data['notes']
+            )
+        except checkout.OrderLineError as e:
+            logger.warning(f"Order not created: {e}: {e.details}")
+            return Response({
+                'error': str(e),
+                'details': e.details
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error creating order: {str(e)}", exc_info=True)
+            return Response({
+                'error': 'Internal server error'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info(f"Order {order.id} created with {len(items)} items by user {request.user.username}")
+        # Ответ собирается из уже загруженных объектов, без повторного чтения заказа
+        response = OrderDetailSerializer(
+            order, fields=[name for name in ORDER_COLUMNS if name not in ('items', 'archived_at')]
+        ).data
+        response['items'] = OrderItemDetailSerializer(items, many=True).data
+        return Response(response, status=status.HTTP_201_CREATED, headers={
+            'Location': request.build_absolute_uri(reverse('order-detail', args=[order.id]))
+        })
+
+
+class OrderExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Параметр format выбирает формат выгрузки, а не рендерер DRF;
+        # ошибки всегда возвращаются в JSON
+        renderer = JSONRenderer()
+        return renderer, renderer.media_type
+
+    def get(self, request):
+        export_format = request.query_params.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return Response({
+                'error': 'Unsupported export format',
+                'supported': ['ndjson', 'csv']
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            date_from = parse_period_boundary(request.query_params.get('from'))
+            date_to = parse_period_boundary(request.query_params.get('to'), end_of_day=True)
+            after = parse_checkpoint(
+                request.query_params.get('after_created_at'),
+                request.query_params.get('after_id')
+            )
+        except ValueError as e:
+            return Response({
+                'error': 'Invalid export parameters',
+                'details': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        orders = export_queryset(date_from, date_to, after)
+        if export_format == 'csv':
+            response = StreamingHttpResponse(csv_lines(orders), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(ndjson_lines(orders), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+
+        logger.info(
+            f"Orders export ({export_format}) from {date_from} to {date_to}, "
+            f"after {after} by user {request.user.username}"
+        )
+        return response
+
 
 class OrderStatusUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def patch(self, request, order_id):
         serializer = OrderStatusSerializer(data=request.data)
         if not serializer.is_valid():
@@ -180,6 +438,12 @@ class OrderStatusUpdateView(APIView):
 
                 order.status = new_status
                 order.save()
+                if new_status != old_status:
+                    outbox.publish(outbox.ORDER_STATUS_CHANGED, order, {
+                        'order_id': order.id,
+                        'old_status': old_status,
+                        'new_status': new_status,
+                    })
 
                 logger.info(
                     f"Order {order_id} status changed from {old_status} to {new_status} "
@@ -206,26 +470,347 @@ class ProductStockView(APIView):
 
     def get(self, request):
         try:
-            products = Product.objects.select_related('category').filter(is_active=True)
+            fields = parse_fields(request.query_params.get('fields'), list(PRODUCT_COLUMNS))
+        except ValueError as e:
+            return invalid_fields(e)
+
+        try:
+            levels = stock_levels(request.query_params)
+            key = stock_listing_key(levels, fields, request_scope(request, request.user))
+            # Одновременные одинаковые запросы (начало распродажи) ждут один ответ
+            return Response(STOCK_LISTING.run(key, lambda: self.listing(levels, fields)))
+
+        except Exception as e:
+            logger.error(f"Error retrieving product stock: {str(e)}")
+            return Response({
+                'error': 'Error retrieving product stock'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def listing(self, levels, fields):
+        products = Product.objects.filter(is_active=True)
+        for level in levels:
+            products = products.filter(stock_alert__level=level)
+
+        data = ProductStockSerializer(
+            shape_product_queryset(products, fields), many=True, fields=fields
+        ).data
+        return {
+            'products': data,
+            'total_count': len(data),
+            # Счетчики читают список наблюдения (через кэш), а не весь каталог
+            **stock_summary(*levels)
+        }
+
+
+class ProductAvailabilityView(APIView):
+    """
+    Проверка корзины перед оформлением: доступность, цена и активность
+    каждой позиции одним запросом к товарам (горячие товары — из снимка
+    в памяти, см. orders/availability.py). Остаток не резервируется.
+    """
+    permission_classes = [IsAuthenticated]
+    # POST только читает: не закрепляет клиента за основной БД
+    replica_pin_exempt = True
+
+    def post(self, request):
+        serializer = AvailabilityRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            lines = availability.quote(serializer.validated_data['lines'])
+            return Response(AvailabilityQuoteSerializer({
+                'lines': lines,
+                'available': all(line['available'] for line in lines),
+                'total_amount': sum(
+                    (line['line_total'] for line in lines if line['line_total'] is not None), Decimal(0)
+                )
+            }).data)
+
+        except Exception as e:
+            logger.error(f"Error checking product availability: {str(e)}")
+            return Response({
+                'error': 'Error checking product availability'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class StockWatchlistView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        level = request.query_params.get('level')
+        if level and level not in StockAlert.Level.values:
+            return Response({
+                'error': 'Invalid level',
+                'supported': StockAlert.Level.values
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Читается только список наблюдения и товары из него
+            alerts = (
+                StockAlert.objects.select_related('product__category')
+                .filter(product__is_active=True)
+                .order_by('-changed_at')
+            )
+            category_id = request.query_params.get('category')
+            if category_id:
+                alerts = alerts.filter(product__category_id=int(category_id))
+
+            counts = dict(alerts.order_by().values_list('level').annotate(count=Count('pk')))
+            if level:
+                alerts = alerts.filter(level=level)
+
+            return Response({
+                'products': StockAlertSerializer(alerts, many=True).data,
+                'low_stock_count': counts.get(StockAlert.Level.LOW, 0),
+                'out_of_stock_count': counts.get(StockAlert.Level.OUT, 0)
+            })
+
+        except ValueError:
+            return Response({
+                'error': 'category must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            logger.error(f"Error retrieving stock watchlist: {str(e)}")
+            return Response({
+                'error': 'Error retrieving stock watchlist'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ProductSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        if not search_terms(query):
+            return Response({
+                'error': 'Query parameter q is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = min(int(request.query_params.get('page_size', 20)), self.MAX_PAGE_SIZE)
+            category_id = request.query_params.get('category')
+            category_id = int(category_id) if category_id else None
+        except ValueError:
+            return Response({
+                'error': 'page, page_size and category must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if page < 1 or page_size < 1:
+            return Response({
+                'error': 'page and page_size must be positive'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            products = Product.objects.select_related('category', 'stock_alert')
+
+            is_active = request.query_params.get('is_active', 'true')
+            if is_active.lower() != 'all':
+                products = products.filter(is_active=is_active.lower() == 'true')
+
+            if category_id is not None:
+                products = products.filter(category_id=category_id)
 
-            low_stock_only = request.query_params.get('low_stock')
-            if low_stock_only and low_stock_only.lower() == 'true':
-                products = products.filter(quantity__lte=10, quantity__gt=0)
+            in_stock = request.query_params.get('in_stock')
+            if in_stock and in_stock.lower() == 'true':
+                products = products.filter(quantity__gt=0)
 
-            out_of_stock = request.query_params.get('out_of_stock')
-            if out_of_stock and out_of_stock.lower() == 'true':
-                products = products.filter(quantity=0)
+            products = search_products(products, query).order_by('-search_rank', 'id')
+
+            start = (page - 1) * page_size
+            end = start + page_size
+            total_count = products.count()
 
-            serializer = ProductStockSerializer(products, many=True)
             return Response({
-                'products': serializer.data,
-                'total_count': products.count(),
-                'low_stock_count': products.filter(quantity__lte=10, quantity__gt=0).count(),
-                'out_of_stock_count': products.filter(quantity=0).count()
+                'products': ProductSearchSerializer(products[start:end], many=True).data,
+                'page': page,
+                'page_size': page_size,
+                'total_count': total_count,
+                'has_next': end < total_count
             })
 
         except Exception as e:
-            logger.error(f"Error retrieving product stock: {str(e)}")
+            logger.error(f"Error searching products for '{query}': {str(e)}")
             return Response({
-                'error': 'Error retrieving product stock'
+                'error': 'Error searching products'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CustomerLookupView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        phone = request.query_params.get('phone', '').strip()
+        email = request.query_params.get('email', '').strip()
+        query = request.query_params.get('q', '').strip()
+        if query:
+            if is_phone_query(query):
+                phone = query
+            else:
+                email = query
+
+        if bool(phone) == bool(email):
+            return Response({
+                'error': 'Provide exactly one of phone, email or q'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            customers, match = lookup_customers(phone=phone, email=email)
+            return Response({
+                'customers': CustomerLookupSerializer(customers, many=True).data,
+                'match': match
+            })
+
+        except Exception as e:
+            logger.error(f"Error looking up customers: {str(e)}")
+            return Response({
+                'error': 'Error looking up customers'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CustomerOrderHistoryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request, customer_id):
+        status_filter = request.query_params.get('status')
+        if status_filter and status_filter not in Order.Status.values:
+            return Response({
+                'error': 'Invalid status',
+                'supported': Order.Status.values
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page_size = min(int(request.query_params.get('page_size', 20)), self.MAX_PAGE_SIZE)
+            if page_size < 1:
+                raise ValueError("page_size must be positive")
+            cursor = request.query_params.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            date_from = parse_period_boundary(request.query_params.get('from'))
+            date_to = parse_period_boundary(request.query_params.get('to'), end_of_day=True)
+        except ValueError as e:
+            return Response({
+                'error': 'Invalid history parameters',
+                'details': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not Customer.objects.filter(id=customer_id).exists():
+            return Response({
+                'error': 'Customer not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            orders, last = customer_order_page(
+                customer_id, after=after, page_size=page_size,
+                status=status_filter, date_from=date_from, date_to=date_to
+            )
+            return Response({
+                'orders': CustomerOrderHistorySerializer(orders, many=True).data,
+                'page_size': page_size,
+                'next_cursor': encode_cursor(*last) if last else None,
+                'has_next': last is not None,
+                'total_orders': customer_order_count(customer_id)
+            })
+
+        except Exception as e:
+            logger.error(f"Error retrieving order history for customer {customer_id}: {str(e)}")
+            return Response({
+                'error': 'Error retrieving order history'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ProductImportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    CONTENT_TYPES = {
+        'text/csv': 'csv',
+        'application/x-ndjson': 'ndjson',
+        'application/jsonl': 'ndjson',
+    }
+
+    def post(self, request):
+        input_format = self.CONTENT_TYPES.get(request.content_type.split(';')[0].strip())
+        if input_format is None:
+            return Response({
+                'error': 'Unsupported content type',
+                'supported': sorted(self.CONTENT_TYPES)
+            }, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        # Тело читается построчно, без загрузки всего файла в память
+        stream = request.stream or []
+        lines = (line.decode('utf-8') for line in stream)
+
+        try:
+            report = ProductImporter().run(lines, input_format)
+        except UnicodeDecodeError as e:
+            return Response({
+                'error': 'Invalid encoding, UTF-8 expected',
+                'details': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error importing products: {str(e)}", exc_info=True)
+            return Response({
+                'error': 'Internal server error'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info(
+            f"Products import ({input_format}): {report['created']} created, "
+            f"{report['updated']} updated, {report['error_count']} errors "
+            f"by user {request.user.username}"
+        )
+        return Response({'success': report['error_count'] == 0, **report})
+
+
+class MetricsView(APIView):
+    """Метрики процесса, обработавшего запрос (пул соединений и т.д.)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
+class JobCreateView(APIView):
+    """Постановка фоновой задачи в очередь (выполняется командой run_workers)"""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = JobCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            job = jobs.enqueue(
+                serializer.validated_data['task'],
+                args=serializer.validated_data['args'],
+                priority=serializer.validated_data['priority'],
+                user=request.user
+            )
+        except ValueError as e:
+            return Response({
+                'error': 'Invalid job',
+                'details': str(e),
+                'tasks': jobs.registered_tasks()
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error enqueuing job: {str(e)}")
+            return Response({
+                'error': 'Error enqueuing job'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info(f"Job {job.task} #{job.id} enqueued by user {request.user.username}")
+        return job_accepted(request, job)
+
+
+class JobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        jobs_visible = Job.objects.all()
+        if not request.user.is_staff:
+            jobs_visible = jobs_visible.filter(created_by=request.user)
+        job = get_object_or_404(jobs_visible, id=job_id)
+        return Response(JobSerializer(job).data)
@@ -0,0 +1,176 @@
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import Namespace
+from .coalescing import Coalescer
+from .loaders import identity_map
+from .models import Category, Product, StockAlert
+from .routers import primary_reads
+
+SYNC_BATCH_SIZE = 2000
+
+# Счетчики остатков для /products/stock/; версия пространства меняется
+# при каждом изменении списка наблюдения
+STOCK_SUMMARY = Namespace('stock-summary')
+
+# Одинаковые одновременные запросы /products/stock/ получают один ответ
+STOCK_LISTING = Coalescer('product-stock')
+
+
+def stock_level(quantity, threshold):
+    """Уровень остатка: StockAlert.Level или None, если товара достаточно"""
+    if quantity <= 0:
+        return StockAlert.Level.OUT
+    if quantity <= threshold:
+        return StockAlert.Level.LOW
+    return None
+
+
+def product_threshold(product, own_threshold):
+    """Порог товара: собственный, иначе порог категории, иначе LOW_STOCK_THRESHOLD"""
+    if own_threshold is not None:
+        return own_threshold
+    if Product.category.is_cached(product):
+        category = product.category
+    else:
+        category = identity_map().load(Category, product.category_id)
+    if category is not None and category.low_stock_threshold is not None:
+        return category.low_stock_threshold
+    return settings.LOW_STOCK_THRESHOLD
+
+
+def record_stock_change(product, previous, created=False):
+    """
+    Обновляет список наблюдения после Product.save(). previous — остаток и
+    собственный порог на момент загрузки (None, если товар не загружался
+    из БД). Строка списка меняется только при смене уровня остатка.
+    """
+    own_threshold = product.__dict__.get('low_stock_threshold')
+    if previous is not None and previous == (product.quantity, own_threshold):
+        return
+
+    threshold = product_threshold(product, own_threshold)
+    level = stock_level(product.quantity, threshold)
+    if created:
+        previous_level = previous_threshold = None
+    elif previous is None or previous[0] is None:
+        # Прежний уровень неизвестен: сверяемся с таблицей
+        alert = StockAlert.objects.filter(product_id=product.pk).first()
+        previous_level = alert.level if alert else None
+        previous_threshold = alert.threshold if alert else None
+    else:
+        previous_threshold = product_threshold(product, previous[1])
+        previous_level = stock_level(previous[0], previous_threshold)
+
+    if level == previous_level and (level is None or threshold == previous_threshold):
+        return
+    if level != previous_level:
+        forget_stock_summary()
+    if level is None:
+        StockAlert.objects.filter(product_id=product.pk).delete()
+    else:
+        StockAlert.objects.update_or_create(
+            product_id=product.pk, defaults={'level': level, 'threshold': threshold}
+        )
+
+
+def sync_watchlist(products=None, batch_size=SYNC_BATCH_SIZE):
+    """
+    Пересчитывает список наблюдения для выборки товаров (по умолчанию всего
+    каталога) пачками по первичному ключу. Используется после массовых
+    записей остатка (импорт, reconcile, bulk_create), которые не вызывают
+    save(). Возвращает число добавленных, измененных и удаленных строк.
+    """
+    if products is None:
+        products = Product.objects.all()
+    rows = products.annotate(
+        effective_threshold=Coalesce(
+            'low_stock_threshold', 'category__low_stock_threshold',
+            models.Value(settings.LOW_STOCK_THRESHOLD)
+        )
+    ).order_by('pk').values_list('pk', 'quantity', 'effective_threshold')
+
+    changed = 0
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            if changed:
+                forget_stock_summary()
+            return changed
+        last_pk = batch[-1][0]
+
+        expected = {}
+        for pk, quantity, threshold in batch:
+            level = stock_level(quantity, threshold)
+            if level is not None:
+                expected[pk] = (level, threshold)
+        existing = {
+            alert.product_id: alert
+            for alert in StockAlert.objects.filter(product_id__in=[row[0] for row in batch])
+        }
+
+        stale = [pk for pk in existing if pk not in expected]
+        created = [
+            StockAlert(product_id=pk, level=level, threshold=threshold)
+            for pk, (level, threshold) in expected.items() if pk not in existing
+        ]
+        updated = []
+        now = timezone.now()
+        for pk, (level, threshold) in expected.items():
+            alert = existing.get(pk)
+            if alert is not None and (alert.level, alert.threshold) != (level, threshold):
+                alert.level, alert.threshold, alert.changed_at = level, threshold, now
+                updated.append(alert)
+
+        if stale:
+            StockAlert.objects.filter(product_id__in=stale).delete()
+        StockAlert.objects.bulk_create(created)
+        StockAlert.objects.bulk_update(updated, ['level', 'threshold', 'changed_at'])
+        changed += len(stale) + len(created) + len(updated)
+
+
+def stock_levels(params):
+    """Уровни из параметров low_stock=true и out_of_stock=true запроса остатков"""
+    flags = [('low_stock', StockAlert.Level.LOW), ('out_of_stock', StockAlert.Level.OUT)]
+    return [level for name, level in flags if (params.get(name) or '').lower() == 'true']
+
+
+def stock_listing_key(levels, fields, scope):
+    """Ключ объединения запросов остатков: разобранные параметры, а не строка запроса"""
+    return (tuple(levels), tuple(fields) if fields else None, scope)
+
+
+def forget_stock_summary():
+    # После фиксации: иначе другой процесс может пересчитать сводку по еще
+    # не зафиксированным строкам и закэшировать старое значение на весь TTL
+    transaction.on_commit(STOCK_SUMMARY.invalidate)
+
+
+def stock_summary(*levels):
+    """
+    Число активных товаров с малым и нулевым остатком среди товаров
+    уровней levels (все товары списка, если уровни не заданы). Хранится в
+    двухуровневом кэше STOCK_SUMMARY_TTL секунд и сбрасывается при
+    изменении списка наблюдения; при промахе считается одним запросом
+    к stock_watchlist основной БД одним процессом (single-flight).
+    """
+    def compute():
+        alerts = StockAlert.objects.filter(product__is_active=True)
+        for level in levels:
+            alerts = alerts.filter(level=level)
+        # С основной БД: версия сбрасывается сразу после фиксации записи, и
+        # отстающая реплика сохранила бы под новой версией старые счетчики
+        with primary_reads():
+            counts = dict(alerts.values_list('level').annotate(count=Count('pk')).order_by())
+        return {
+            'low_stock_count': counts.get(StockAlert.Level.LOW, 0),
+            'out_of_stock_count': counts.get(StockAlert.Level.OUT, 0),
+        }
+
+    return STOCK_SUMMARY.get_or_compute(
+        ['-'.join(sorted(levels)) or 'all'], compute, settings.STOCK_SUMMARY_TTL
+    )
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.archive import archive_orders
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .factories import OrderFactory, OrderItemFactory, UserFactory
+
+
+def make_order(order_status, days_ago, items=1):
+    order = OrderFactory(status=order_status)
+    for _ in range(items):
+        OrderItemFactory(order=order, quantity=2)
+    Order.objects.filter(id=order.id).update(updated_at=timezone.now() - timedelta(days=days_ago))
+    return order
+
+
+class ArchiveOrdersTest(TestCase):
+    def test_archives_old_completed_orders(self):
+        """В архив переносятся только старые доставленные и отмененные заказы"""
+        delivered = make_order(Order.Status.DELIVERED, 100, items=2)
+        cancelled = make_order(Order.Status.CANCELLED, 100)
+        recent = make_order(Order.Status.DELIVERED, 10)
+        open_order = make_order(Order.Status.PROCESSING, 100)
+
+        self.assertEqual(archive_orders(days=90), 2)
+
+        self.assertEqual(
+            set(Order.objects.values_list('id', flat=True)), {recent.id, open_order.id}
+        )
+        self.assertEqual(
+            set(ArchivedOrder.objects.values_list('id', flat=True)), {delivered.id, cancelled.id}
+        )
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=delivered.id).count(), 2)
+        self.assertFalse(OrderItem.objects.filter(order_id__in=[delivered.id, cancelled.id]).exists())
+
+    def test_archived_fields_preserved(self):
+        """Архивная копия сохраняет сумму, даты и позиции заказа"""
+        order = make_order(Order.Status.DELIVERED, 100)
+        order.refresh_from_db()
+        item = order.items.get()
+
+        archive_orders(days=90)
+
+        archived = ArchivedOrder.objects.get(id=order.id)
+        self.assertEqual(archived.total_amount, order.total_amount)
+        self.assertEqual(archived.created_at, order.created_at)
+        self.assertEqual(archived.updated_at, order.updated_at)
+        archived_item = archived.items.get()
+        self.assertEqual(archived_item.id, item.id)
+        self.assertEqual(archived_item.total_price, item.total_price)
+
+    def test_bounded_batches(self):
+        """max_batches ограничивает объем работы за один запуск"""
+        for _ in range(5):
+            make_order(Order.Status.DELIVERED, 100)
+
+        self.assertEqual(archive_orders(days=90, batch_size=2, max_batches=2), 4)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(archive_orders(days=90, batch_size=2), 1)
+
+    def test_command(self):
+        """Команда archive_orders выводит число перенесенных заказов"""
+        make_order(Order.Status.CANCELLED, 100)
+        out = StringIO()
+
+        call_command('archive_orders', '--days', '90', stdout=out)
+
+        self.assertIn('Archived 1 orders', out.getvalue())
+
+
+class ArchivedOrderDetailTest(APITestCase):
+    def setUp(self):
+        user = UserFactory()
+        self.client.force_authenticate(user=user)
+        self.async_client.force_login(user)
+        self.order = make_order(Order.Status.DELIVERED, 100)
+        archive_orders(days=90)
+
+    def test_detail_falls_back_to_archive(self):
+        """Детали заказа доступны по тому же id после архивации"""
+        response = self.client.get(reverse('order-detail', kwargs={'order_id': self.order.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.order.id)
+        self.assertEqual(response.data['status'], Order.Status.DELIVERED)
+        self.assertEqual(len(response.data['items']), 1)
+        self.assertIsNotNone(response.data['archived_at'])
+
+    def test_missing_order_not_found(self):
+        """Заказ, которого нет ни в горячей таблице, ни в архиве, возвращает 404"""
+        response = self.client.get(reverse('order-detail', kwargs={'order_id': 999}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_detail_falls_back_to_archive(self):
+        """Асинхронный эндпоинт тоже читает архив"""
+        response = await self.async_client.get(
+            reverse('async-order-detail', kwargs={'order_id': self.order.id})
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.order.id)
+        self.assertEqual(len(response.json()['items']), 1)
@@ -0,0 +1,64 @@
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+
+from .factories import (
+    OrderFactory, OrderItemFactory, ProductFactory, UserFactory, CategoryFactory
+)
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.async_client.force_login(self.user)
+
+        self.order = OrderFactory()
+        OrderItemFactory(order=self.order, quantity=2)
+
+        category = CategoryFactory()
+        ProductFactory(quantity=15, category=category)
+        ProductFactory(quantity=5, category=category)
+        ProductFactory(quantity=0, category=category)
+
+    async def test_order_detail(self):
+        """Асинхронное получение деталей заказа"""
+        response = await self.async_client.get(
+            reverse('async-order-detail', kwargs={'order_id': self.order.id})
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['id'], self.order.id)
+        self.assertEqual(len(data['items']), 1)
+        self.assertIn('customer_name', data)
+
+    async def test_order_detail_not_found(self):
+        """Несуществующий заказ возвращает 404"""
+        response = await self.async_client.get(
+            reverse('async-order-detail', kwargs={'order_id': 999})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_order_list(self):
+        """Асинхронный список заказов с пагинацией и фильтром"""
+        response = await self.async_client.get(reverse('async-order-list'), {'status': 'pending'})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_orders'], 1)
+        self.assertEqual(len(data['orders'][0]['items']), 1)
+        self.assertFalse(data['has_next'])
+
+    async def test_product_stock(self):
+        """Асинхронная информация о запасах"""
+        response = await self.async_client.get(reverse('async-product-stock'), {'low_stock': 'true'})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        # Товар из позиции заказа (quantity=10) тоже попадает в низкий запас
+        self.assertEqual(len(data['products']), 2)
+        self.assertEqual(data['low_stock_count'], 2)
+
+    async def test_requires_authentication(self):
+        """Асинхронные эндпоинты требуют авторизации"""
+        response = await AsyncClient().get(reverse('async-order-list'))
+        self.assertEqual(response.status_code, 403)
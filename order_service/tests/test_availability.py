@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders import inventory
+from orders.availability import MAX_QUOTE_LINES, HotSkuSnapshot
+from orders.middleware import PRIMARY_PIN_COOKIE, PRIMARY_PIN_KEY
+from orders.models import Product
+from .factories import ProductFactory, UserFactory
+
+
+class ProductAvailabilityViewTest(APITestCase):
+    url = reverse('product-availability')
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        self.product = ProductFactory(quantity=5, price=Decimal('10.50'))
+        self.inactive = ProductFactory(quantity=5, is_active=False)
+
+    def test_quote_in_one_query(self):
+        """Позиции корзины проверяются одним запросом к товарам"""
+        lines = [
+            {'product_id': self.product.id, 'quantity': 2},
+            {'product_id': self.inactive.id, 'quantity': 1},
+            {'product_id': 999, 'quantity': 1},
+        ]
+
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'lines': lines}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['available'])
+        first, inactive, missing = response.data['lines']
+        self.assertTrue(first['available'])
+        self.assertEqual(first['price'], '10.50')
+        self.assertEqual(first['line_total'], '21.00')
+        self.assertEqual(first['available_quantity'], 5)
+        self.assertEqual((inactive['reason'], inactive['is_active']), ('inactive', False))
+        self.assertEqual(missing['reason'], 'not_found')
+        self.assertIsNone(missing['price'])
+
+    def test_repeated_product_checked_by_total(self):
+        """Несколько строк одного товара проверяются по суммарному количеству"""
+        lines = [{'product_id': self.product.id, 'quantity': 3}] * 2
+
+        response = self.client.post(self.url, {'lines': lines}, format='json')
+
+        self.assertEqual([line['reason'] for line in response.data['lines']], ['insufficient_stock'] * 2)
+
+    def test_sharded_stock(self):
+        """Остаток шардированного товара — сумма шардов"""
+        inventory.enable_sharding(self.product, shards=2)
+        Product.objects.filter(id=self.product.id).update(quantity=0)
+
+        response = self.client.post(
+            self.url, {'lines': [{'product_id': self.product.id, 'quantity': 5}]}, format='json'
+        )
+
+        self.assertTrue(response.data['available'])
+        self.assertEqual(response.data['total_amount'], '52.50')
+
+    @override_settings(REPLICA_DATABASES=['replica_1'], REPLICA_PIN_SECONDS=5)
+    def test_does_not_pin_primary(self):
+        """Проверка корзины только читает и не закрепляет клиента за основной БД"""
+        response = self.client.post(
+            self.url, {'lines': [{'product_id': self.product.id, 'quantity': 1}]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+        self.assertIsNone(cache.get(PRIMARY_PIN_KEY.format(self.user.pk)))
+
+    def test_validation(self):
+        """Пустая корзина, неверные позиции и превышение лимита отклоняются"""
+        for lines in [[], [{'product_id': 1, 'quantity': 0}],
+                      [{'product_id': 1, 'quantity': 1}] * (MAX_QUOTE_LINES + 1)]:
+            response = self.client.post(self.url, {'lines': lines}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(
+    AVAILABILITY_SNAPSHOT_SIZE=2,
+    AVAILABILITY_SNAPSHOT_REFRESH_SECONDS=1,
+    AVAILABILITY_SNAPSHOT_FULL_REFRESH_SECONDS=60,
+)
+class HotSkuSnapshotTest(TestCase):
+    def setUp(self):
+        self.snapshot = HotSkuSnapshot()
+        self.hot = ProductFactory(quantity=5)
+        self.warm = ProductFactory(quantity=5)
+        self.cold = ProductFactory(quantity=5)
+        self.snapshot.lookup([self.hot.id] * 3 + [self.warm.id] * 2 + [self.cold.id])
+
+    def test_keeps_most_requested(self):
+        """В снимок попадают самые запрашиваемые товары"""
+        self.assertTrue(self.snapshot.refresh(now=0))
+
+        found = self.snapshot.lookup([self.hot.id, self.warm.id, self.cold.id])
+
+        self.assertEqual(set(found), {self.hot.id, self.warm.id})
+        self.assertEqual(found[self.hot.id]['stock'], 5)
+
+    def test_incremental_refresh(self):
+        """Между полными обновлениями перечитываются только измененные товары"""
+        self.snapshot.refresh(now=0)
+        self.assertFalse(self.snapshot.refresh(now=0.5))
+
+        self.hot.quantity = 1
+        self.hot.save()
+        self.snapshot.refresh(now=2)
+
+        self.assertEqual(self.snapshot.lookup([self.hot.id])[self.hot.id]['stock'], 1)
+        stats = self.snapshot.snapshot()
+        self.assertEqual((stats['refreshes'], stats['full_refreshes']), (2, 1))
+
+    def test_full_refresh_sees_bulk_updates(self):
+        """Полное обновление подхватывает изменения через update()"""
+        self.snapshot.refresh(now=0)
+        Product.objects.filter(id=self.hot.id).update(price=Decimal('1.00'))
+
+        self.snapshot.refresh(now=61)
+
+        self.assertEqual(self.snapshot.lookup([self.hot.id])[self.hot.id]['price'], Decimal('1.00'))
+
+    def test_sharded_products_not_cached(self):
+        """Шардированный товар не хранится в снимке"""
+        inventory.enable_sharding(self.hot)
+
+        self.snapshot.refresh(now=0)
+
+        self.assertNotIn(self.hot.id, self.snapshot.lookup([self.hot.id]))
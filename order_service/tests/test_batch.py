@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.archive import archive_orders
+from orders.filters import MAX_BATCH_IDS, parse_order_ids
+from orders.middleware import PRIMARY_PIN_COOKIE, PRIMARY_PIN_KEY
+from orders.models import Order
+from .factories import OrderFactory, OrderItemFactory, UserFactory
+from .test_archive import make_order
+
+
+class ParseOrderIdsTest(APITestCase):
+    def test_parse(self):
+        """Строка и список дают id без повторов в порядке запроса"""
+        self.assertEqual(parse_order_ids('3, 1,3,2'), [3, 1, 2])
+        self.assertEqual(parse_order_ids([5, '4', 5]), [5, 4])
+
+    def test_invalid(self):
+        """Пустой список, не целые и неположительные id и превышение лимита отклоняются"""
+        for value in [None, '', [], 'a,1', [1.5], [0], [True], {'1': 1},
+                      list(range(1, MAX_BATCH_IDS + 2))]:
+            with self.assertRaises(ValueError):
+                parse_order_ids(value)
+
+
+class OrderBatchViewTest(APITestCase):
+    url = reverse('order-batch')
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        self.orders = [OrderFactory() for _ in range(3)]
+        for order in self.orders:
+            OrderItemFactory.create_batch(2, order=order)
+
+    def test_orders_keyed_by_id(self):
+        """Заказы читаются двумя запросами и возвращаются по id, отсутствующие перечислены"""
+        ids = [order.id for order in self.orders]
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+
+        # Не найденные id ищутся в архиве еще одним запросом
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'ids': f'{ids[2]},999,{ids[0]},{ids[1]}'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['orders']), [str(ids[2]), str(ids[0]), str(ids[1])])
+        self.assertEqual(response.data['missing'], [999])
+        order = response.data['orders'][str(ids[0])]
+        self.assertEqual(order['id'], ids[0])
+        self.assertEqual(len(order['items']), 2)
+        self.assertIn('product_name', order['items'][0])
+
+    def test_post_body_and_fields(self):
+        """Список id можно передать в теле POST, поля ответа выбираются параметром fields"""
+        response = self.client.post(
+            f'{self.url}?fields=status', {'ids': [self.orders[0].id]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['orders'], {str(self.orders[0].id): {'status': 'pending'}})
+        self.assertEqual(response.data['missing'], [])
+
+    def test_archived_orders(self):
+        """Заказы, перенесенные в архив, читаются из архива"""
+        archived = make_order(Order.Status.DELIVERED, 100)
+        archive_orders(days=90)
+
+        response = self.client.get(self.url, {'ids': f'{archived.id},{self.orders[0].id}'})
+
+        self.assertEqual(set(response.data['orders']), {str(archived.id), str(self.orders[0].id)})
+        self.assertIsNotNone(response.data['orders'][str(archived.id)]['archived_at'])
+
+    def test_size_cap(self):
+        """Слишком длинный список id отклоняется с 400"""
+        ids = list(range(1, MAX_BATCH_IDS + 2))
+
+        response = self.client.post(self.url, {'ids': ids}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Invalid ids parameter')
+
+    def test_body_must_be_object(self):
+        """Массив в теле POST вместо {"ids": [...]} отклоняется с 400"""
+        response = self.client.post(self.url, [self.orders[0].id], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Invalid ids parameter')
+
+    @override_settings(REPLICA_DATABASES=['replica_1'], REPLICA_PIN_SECONDS=5)
+    def test_post_does_not_pin_primary(self):
+        """POST только читает и не закрепляет клиента за основной БД"""
+        response = self.client.post(self.url, {'ids': [self.orders[0].id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+        self.assertIsNone(cache.get(PRIMARY_PIN_KEY.format(self.user.pk)))
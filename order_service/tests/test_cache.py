@@ -0,0 +1,202 @@
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.admin.sites import site
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from orders.cache import L1Store, Namespace, cache_stats, get_or_compute
+from orders.imports import ProductImporter
+from orders.models import Product
+from orders.routers import replica_reads
+from orders.watchlist import stock_summary
+from .factories import ProductFactory, UserFactory
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-l2'},
+    'tiered': {
+        'BACKEND': 'orders.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {'L1_MAX_ENTRIES': 2, 'L1_TIMEOUT': 60},
+    },
+}
+
+
+class L1StoreTest(SimpleTestCase):
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно не читанная запись"""
+        store = L1Store(max_entries=2)
+        store.set('a', 1, 60)
+        store.set('b', 2, 60)
+        store.get('a')
+        store.set('c', 3, 60)
+
+        self.assertEqual(store.get('a'), 1)
+        self.assertEqual(store.get('c'), 3)
+        self.assertIsNot(store.get('b'), 2)
+        self.assertEqual(store.snapshot()['evictions'], 1)
+        self.assertEqual(store.snapshot()['entries'], 2)
+
+    def test_expiration(self):
+        """Запись с истекшим временем жизни не читается"""
+        store = L1Store(max_entries=10)
+        store.set('a', 1, 0.01)
+        time.sleep(0.02)
+
+        self.assertNotEqual(store.get('a'), 1)
+        self.assertEqual(store.snapshot()['expirations'], 1)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['tiered']
+        self.cache.clear()
+
+    def test_reads_from_l1(self):
+        """Повторное чтение обслуживается L1 без обращения к L2"""
+        self.cache.set('key', 'value')
+        caches['default'].set('key', 'changed')
+        hits = self.cache.stats()['l1_hits']
+
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats()['l1_hits'], hits + 1)
+
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertIsNone(caches['default'].get('key'))
+
+    def test_l2_hit_fills_l1(self):
+        """Значение из L2 (записанное другим процессом) попадает в L1"""
+        caches['default'].set('shared', 42)
+
+        self.assertEqual(self.cache.get('shared'), 42)
+        caches['default'].delete('shared')
+        self.assertEqual(self.cache.get('shared'), 42)
+
+    def test_single_flight(self):
+        """Одновременные промахи по одному ключу вычисляют значение один раз"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'fresh'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute('hot', compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['fresh'] * 8)
+        self.assertGreaterEqual(cache_stats()['single_flight']['coalesced'], 1)
+
+    def test_waits_for_other_process(self):
+        """Ключ, который пересчитывает другой процесс, не вычисляется повторно"""
+        self.cache.add('remote:lock', 1, 10)
+        threading.Timer(0.1, lambda: caches['default'].set('remote', 'theirs')).start()
+
+        value = get_or_compute('remote', lambda: 'ours', lock_timeout=2)
+
+        self.assertEqual(value, 'theirs')
+
+    def test_namespace_invalidation(self):
+        """Смена версии пространства делает старые ключи недоступными"""
+        namespace = Namespace('catalog')
+        self.assertEqual(namespace.get_or_compute(['page', 1], lambda: 'v1'), 'v1')
+        self.assertEqual(namespace.get_or_compute(['page', 1], lambda: 'v2'), 'v1')
+
+        namespace.invalidate()
+
+        self.assertEqual(namespace.get_or_compute(['page', 1], lambda: 'v2'), 'v2')
+
+
+class StockSummaryCacheTest(TestCase):
+    def test_invalidated_by_watchlist_change(self):
+        """Счетчики кэшируются и сбрасываются при пересечении порога"""
+        product = ProductFactory(quantity=0)
+        self.assertEqual(stock_summary(), {'low_stock_count': 0, 'out_of_stock_count': 1})
+
+        with CaptureQueriesContext(connection) as context:
+            stock_summary()
+        self.assertFalse(any('stock_watchlist' in query['sql'] for query in context.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.quantity = 100
+            product.save()
+            # До фиксации транзакции записи счетчики не сбрасываются
+            self.assertEqual(stock_summary()['out_of_stock_count'], 1)
+        self.assertEqual(stock_summary(), {'low_stock_count': 0, 'out_of_stock_count': 0})
+
+    def test_invalidated_by_deactivation(self):
+        """Деактивация товара сбрасывает счетчики"""
+        ProductFactory(quantity=0)
+        stock_summary()
+
+        product = Product.objects.get()
+        product.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        self.assertEqual(stock_summary()['out_of_stock_count'], 0)
+
+    def test_invalidated_by_bulk_deactivation(self):
+        """Действие админки и импорт меняют is_active без save() и тоже сбрасывают счетчики"""
+        ProductFactory(quantity=0, sku='SKU-1')
+        product = ProductFactory(quantity=0, sku='SKU-2')
+        self.assertEqual(stock_summary()['out_of_stock_count'], 2)
+
+        model_admin = site._registry[Product]
+        with patch.object(model_admin, 'message_user'), self.captureOnCommitCallbacks(execute=True):
+            model_admin.deactivate_products(None, Product.objects.filter(sku='SKU-1'))
+        self.assertEqual(stock_summary()['out_of_stock_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report = ProductImporter().run(StringIO(
+                'sku,name,quantity,price,category,is_active\n'
+                f'SKU-2,Товар,0,10.00,{product.category.name},false\n'
+            ), 'csv')
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(stock_summary()['out_of_stock_count'], 0)
+
+
+@override_settings(REPLICA_DATABASES=['replica_1'])
+class StockSummaryReplicaTest(TransactionTestCase):
+    """Вне транзакции теста: внутри нее чтение и так идет с основной БД"""
+
+    def setUp(self):
+        self.addCleanup(caches['tiered'].clear)
+
+    def test_computed_on_primary(self):
+        """Счетчики считаются с основной БД даже в запросе, читающем с реплик"""
+        ProductFactory(quantity=0)
+
+        with replica_reads():
+            self.assertEqual(stock_summary()['out_of_stock_count'], 1)
+
+
+class ProductStockSummaryViewTest(APITestCase):
+    def test_summary_in_stock_response(self):
+        """Ответ остатков берет счетчики из кэша"""
+        self.client.force_authenticate(user=UserFactory())
+        ProductFactory(quantity=0)
+        ProductFactory(quantity=500)
+        self.client.get(reverse('product-stock'))
+
+        response = self.client.get(reverse('product-stock'), {'out_of_stock': 'true'})
+
+        self.assertEqual(response.data['total_count'], 1)
+        self.assertEqual(response.data['out_of_stock_count'], 1)
+        self.assertEqual(response.data['low_stock_count'], 0)
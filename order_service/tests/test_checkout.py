@@ -0,0 +1,155 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders import inventory, outbox
+from orders.views import OrderItemThrottle
+from orders.models import Order, OrderItem, OutboxEvent, Product, StockAlert
+from .factories import CustomerFactory, OrderFactory, ProductFactory, UserFactory
+
+
+class OrderCreateViewTest(APITestCase):
+    url = reverse('order-list')
+
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.customer = CustomerFactory()
+        self.products = [
+            ProductFactory(quantity=10, price=Decimal('100.00')),
+            ProductFactory(quantity=3, price=Decimal('25.50')),
+        ]
+
+    def create(self, items, **kwargs):
+        data = {'customer_id': self.customer.id, 'items': items}
+        return self.client.post(self.url, data, format='json', **kwargs)
+
+    def test_create_order(self):
+        """Заказ создается со всеми позициями, ценой на момент заказа и суммой"""
+        response = self.create([
+            {'product_id': self.products[0].id, 'quantity': 2},
+            {'product_id': self.products[1].id, 'quantity': 3},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get()
+        self.assertEqual(response.data['id'], order.id)
+        self.assertEqual(response['Location'], f'http://testserver/api/v1/orders/{order.id}/')
+        self.assertEqual(order.total_amount, Decimal('276.50'))
+        self.assertEqual(response.data['total_amount'], '276.50')
+        self.assertEqual(response.data['customer_name'], self.customer.name)
+        self.assertEqual(
+            [(item['product_id'], item['quantity'], item['unit_price']) for item in response.data['items']],
+            [(self.products[0].id, 2, '100.00'), (self.products[1].id, 3, '25.50')]
+        )
+        self.assertEqual(
+            list(Product.objects.order_by('id').values_list('quantity', flat=True)), [8, 0]
+        )
+        # Остаток закончился — товар попал в список наблюдения
+        self.assertEqual(StockAlert.objects.get(product=self.products[1]).level, StockAlert.Level.OUT)
+        event = OutboxEvent.objects.get(event_type=outbox.ORDER_CREATED)
+        self.assertEqual(event.payload['order_total'], '276.50')
+
+    def test_queries_do_not_grow_with_items(self):
+        """Число запросов не зависит от числа позиций"""
+        more = [ProductFactory(quantity=10) for _ in range(3)]
+        # Первый запрос создает строки счетчиков лимитов
+        self.create([{'product_id': self.products[0].id, 'quantity': 1}])
+
+        with CaptureQueriesContext(connection) as one_item:
+            self.create([{'product_id': self.products[0].id, 'quantity': 1}])
+        with CaptureQueriesContext(connection) as four_items:
+            self.create([{'product_id': product.id, 'quantity': 1} for product in [self.products[0], *more]])
+
+        self.assertEqual(len(four_items), len(one_item))
+        self.assertEqual(OrderItem.objects.count(), 6)
+
+    def test_repeated_product_merged(self):
+        """Строки одного товара складываются в одну позицию"""
+        response = self.create([{'product_id': self.products[0].id, 'quantity': 1}] * 3)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(OrderItem.objects.get().quantity, 3)
+
+    def test_insufficient_stock_writes_nothing(self):
+        """При нехватке остатка не создается ничего и остаток не меняется"""
+        response = self.create([
+            {'product_id': self.products[0].id, 'quantity': 2},
+            {'product_id': self.products[1].id, 'quantity': 4},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['details'], [
+            {'product_id': self.products[1].id, 'available': 3, 'requested': 4}
+        ])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(id=self.products[0].id).quantity, 10)
+
+    def test_sharded_product(self):
+        """Остаток шардированного товара резервируется по шардам"""
+        inventory.enable_sharding(self.products[0], shards=2)
+
+        response = self.create([{'product_id': self.products[0].id, 'quantity': 7}])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(inventory.available_quantity(self.products[0].id), 3)
+
+    def test_invalid_requests(self):
+        """Неактивный товар, неизвестный клиент и пустой заказ отклоняются"""
+        self.products[1].is_active = False
+        self.products[1].save()
+
+        inactive = self.create([{'product_id': self.products[1].id, 'quantity': 1}])
+        self.assertEqual(inactive.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(inactive.data['details'], [{'product_id': self.products[1].id}])
+
+        unknown_customer = self.client.post(self.url, {
+            'customer_id': 999, 'items': [{'product_id': self.products[0].id, 'quantity': 1}]
+        }, format='json')
+        self.assertEqual(unknown_customer.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('customer_id', unknown_customer.data)
+
+        self.assertEqual(self.create([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_idempotent_retry(self):
+        """Повтор с тем же Idempotency-Key не создает второй заказ"""
+        items = [{'product_id': self.products[0].id, 'quantity': 1}]
+
+        first = self.create(items, HTTP_IDEMPOTENCY_KEY='order-1')
+        second = self.create(items, HTTP_IDEMPOTENCY_KEY='order-1')
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_throttled_with_order_items(self):
+        """Создание заказа расходует лимит пользователя на запись позиций"""
+        items = [{'product_id': self.products[0].id, 'quantity': 1}]
+        with patch.object(OrderItemThrottle, 'rate', '2/hour'):
+            self.client.post(
+                reverse('add-order-item', kwargs={'order_id': OrderFactory().id}), items[0], format='json'
+            )
+            self.assertEqual(self.create(items).status_code, status.HTTP_201_CREATED)
+
+            response = self.create(items)
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(Order.objects.filter(customer=self.customer).count(), 1)
+        # Чтение списка заказов этим лимитом не ограничивается
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_ENDPOINT_RATES={'POST order-list': '1/min'})
+    def test_endpoint_rate_for_creation_only(self):
+        """Лимит "POST order-list" действует на создание, но не на чтение списка"""
+        items = [{'product_id': self.products[0].id, 'quantity': 1}]
+        self.assertEqual(self.create(items).status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.create(items).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
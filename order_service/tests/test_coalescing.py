@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from orders.coalescing import Coalescer, coalescing_stats
+from orders.watchlist import STOCK_LISTING
+from .factories import ProductFactory, UserFactory
+
+
+class CoalescerTest(SimpleTestCase):
+    def setUp(self):
+        self.coalescer = Coalescer('test')
+
+    def run_concurrently(self, key, compute, count=8):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.coalescer.run(key, compute)))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    @override_settings(COALESCE_WINDOW_SECONDS=0)
+    def test_concurrent_requests_share_computation(self):
+        """Одновременные запросы с одним ключом ждут одно вычисление"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'value': len(calls)}
+
+        results = self.run_concurrently('key', compute)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 1}] * 8)
+        stats = self.coalescer.snapshot()
+        self.assertEqual((stats['computes'], stats['coalesced']), (1, 7))
+        self.assertEqual(stats['ratio'], 0.875)
+
+        # Без окна переиспользования следующий запрос вычисляется заново
+        self.assertEqual(self.coalescer.run('key', compute), {'value': 2})
+
+    @override_settings(COALESCE_WINDOW_SECONDS=0.05)
+    def test_reuse_window(self):
+        """Готовый ответ переиспользуется только в пределах окна"""
+        self.coalescer.run('key', lambda: 'first')
+
+        self.assertEqual(self.coalescer.run('key', lambda: 'second'), 'first')
+        self.assertEqual(self.coalescer.run('other', lambda: 'other'), 'other')
+        time.sleep(0.06)
+        self.assertEqual(self.coalescer.run('key', lambda: 'third'), 'third')
+        self.assertEqual(self.coalescer.snapshot()['reused'], 1)
+
+    def test_error_propagates_to_waiters(self):
+        """Ошибку вычисления получают все ожидающие, результат не сохраняется"""
+        def compute():
+            time.sleep(0.05)
+            raise RuntimeError('boom')
+
+        errors = []
+
+        def request():
+            try:
+                self.coalescer.run('key', compute)
+            except RuntimeError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(self.coalescer.run('key', lambda: 'ok'), 'ok')
+
+    @override_settings(COALESCE_WINDOW_SECONDS=0)
+    def test_async_requests_share_computation(self):
+        """Одновременные корутины с одним ключом ждут одно вычисление"""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        async def requests():
+            return await asyncio.gather(*[self.coalescer.arun('key', compute) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(requests()), ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.coalescer.snapshot()['coalesced'], 4)
+        self.assertIn('test', coalescing_stats())
+
+    @override_settings(COALESCE_WINDOW_SECONDS=0)
+    def test_async_leader_cancelled(self):
+        """Отмена запроса ведущего не отменяет ожидающих: один из них вычисляет заново"""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        async def requests():
+            leader = asyncio.create_task(self.coalescer.arun('key', compute))
+            await asyncio.sleep(0)
+            waiters = [asyncio.create_task(self.coalescer.arun('key', compute)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            results = await asyncio.gather(*waiters)
+            self.assertTrue(leader.cancelled())
+            return results
+
+        self.assertEqual(asyncio.run(requests()), [2, 2, 2])
+        stats = self.coalescer.snapshot()
+        self.assertEqual((stats['computes'], stats['coalesced']), (1, 2))
+
+
+class ProductStockCoalescingTest(TransactionTestCase):
+    """Вне транзакции теста, как при обычном запросе"""
+
+    def setUp(self):
+        # Записи кэша вне транзакции теста не откатываются
+        self.addCleanup(caches['tiered'].clear)
+        self.addCleanup(STOCK_LISTING.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory())
+        ProductFactory(quantity=0)
+
+    def stats(self):
+        return STOCK_LISTING.snapshot()
+
+    @override_settings(COALESCE_WINDOW_SECONDS=60)
+    def test_identical_requests_reuse_response(self):
+        """Запросы с теми же разобранными параметрами и правами получают один ответ"""
+        before = self.stats()
+        first = self.client.get(reverse('product-stock'), {'out_of_stock': 'true'})
+        ProductFactory(quantity=0)
+
+        second = self.client.get(reverse('product-stock'), {'out_of_stock': 'TRUE', 'x': '1'})
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.data['total_count'], 1)
+        self.assertEqual(self.stats()['reused'] - before['reused'], 1)
+
+        # Другие параметры или права — отдельный ответ
+        self.assertEqual(self.client.get(reverse('product-stock')).data['total_count'], 2)
+        self.client.force_authenticate(user=User.objects.create_superuser('admin', 'a@example.com', 'pass'))
+        response = self.client.get(reverse('product-stock'), {'out_of_stock': 'true'})
+        self.assertEqual(response.data['total_count'], 2)
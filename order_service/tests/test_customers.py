@@ -0,0 +1,97 @@
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.customers import lookup_customers, normalize_email, normalize_phone
+from orders.models import Customer
+from .factories import CustomerFactory, UserFactory
+
+
+class NormalizationTest(SimpleTestCase):
+    def test_normalize_phone(self):
+        """Телефоны в разных записях приводятся к цифрам E.164"""
+        self.assertEqual(normalize_phone('+7 (916) 123-45-67'), '79161234567')
+        self.assertEqual(normalize_phone('8 916 123 45 67'), '79161234567')
+        self.assertEqual(normalize_phone('9161234567'), '79161234567')
+        self.assertEqual(normalize_phone('0044 20 7946 0958'), '442079460958')
+        self.assertEqual(normalize_phone(''), '')
+
+    def test_normalize_email(self):
+        """Email приводится к нижнему регистру без пробелов"""
+        self.assertEqual(normalize_email('  Ivan.Petrov@Example.COM '), 'ivan.petrov@example.com')
+
+
+class CustomerNormalizedFieldsTest(TestCase):
+    def test_fields_synced_on_save(self):
+        """Нормализованные поля обновляются при сохранении"""
+        customer = CustomerFactory(phone='8 (916) 123-45-67', email='A@B.RU')
+        self.assertEqual(customer.phone_normalized, '79161234567')
+        self.assertEqual(customer.email_normalized, 'a@b.ru')
+
+        customer.phone = '+7 916 000 00 00'
+        customer.save(update_fields=['phone'])
+        customer.refresh_from_db()
+        self.assertEqual(customer.phone_normalized, '79160000000')
+
+
+class CustomerLookupTest(TestCase):
+    def setUp(self):
+        self.ivan = CustomerFactory(phone='+7 916 123-45-67', email='ivan@example.com')
+        self.ivanova = CustomerFactory(phone='8 916 123 99 99', email='ivanova@example.com')
+
+    def test_exact_phone(self):
+        """Точное совпадение телефона в любой записи"""
+        customers, match = lookup_customers(phone='8(916)1234567')
+
+        self.assertEqual(match, 'exact')
+        self.assertEqual(list(customers), [self.ivan])
+
+    def test_phone_prefix(self):
+        """Частично введенный номер ищется по префиксу, в том числе без кода страны"""
+        customers, match = lookup_customers(phone='916 123')
+
+        self.assertEqual(match, 'prefix')
+        self.assertEqual(list(customers), [self.ivan, self.ivanova])
+
+    def test_email_exact_and_prefix(self):
+        """Email ищется без учета регистра, точно и по префиксу"""
+        exact, exact_match = lookup_customers(email='IVAN@example.com')
+        prefix, prefix_match = lookup_customers(email='ivan')
+
+        self.assertEqual((list(exact), exact_match), ([self.ivan], 'exact'))
+        self.assertEqual((list(prefix), prefix_match), ([self.ivan, self.ivanova], 'prefix'))
+
+    def test_admin_search(self):
+        """Поиск в админ-панели по телефону идет через нормализованное поле"""
+        request = RequestFactory().get('/admin/orders/customer/')
+        queryset, _ = site._registry[Customer].get_search_results(
+            request, Customer.objects.all(), '+7 916 123-99-99'
+        )
+
+        self.assertEqual(list(queryset), [self.ivanova])
+        self.assertIn('phone_normalized', str(queryset.query))
+
+
+class CustomerLookupViewTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.url = reverse('customer-lookup')
+        self.customer = CustomerFactory(phone='+7 916 123-45-67', email='ivan@example.com')
+
+    def test_lookup_by_q(self):
+        """Параметр q определяет телефон или email автоматически"""
+        by_phone = self.client.get(self.url, {'q': '89161234567'})
+        by_email = self.client.get(self.url, {'q': 'Ivan@Example.com'})
+
+        self.assertEqual(by_phone.status_code, status.HTTP_200_OK)
+        self.assertEqual(by_phone.data['match'], 'exact')
+        self.assertEqual(by_phone.data['customers'][0]['id'], self.customer.id)
+        self.assertEqual(by_email.data['customers'][0]['id'], self.customer.id)
+
+    def test_lookup_requires_one_parameter(self):
+        """Нужен ровно один критерий поиска"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
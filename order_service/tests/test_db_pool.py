@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.db_pool import ConnectionPool, PoolTimeout
+
+
+def sqlite_connect():
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+def check_connection(connection):
+    connection.execute('SELECT 1')
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        pool = ConnectionPool(sqlite_connect, check=check_connection, **kwargs)
+        self.addCleanup(pool.close_all)
+        return pool
+
+    def test_connection_reused(self):
+        """Возвращенное в пул соединение выдается повторно"""
+        pool = self.make_pool(max_size=2)
+        conn = pool.checkout()
+        pool.checkin(conn)
+
+        self.assertIs(pool.checkout(), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['idle'], 0)
+
+    def test_timeout_when_exhausted(self):
+        """При исчерпании пула ожидание ограничено timeout"""
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.checkout()
+
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        """Ожидающий поток получает соединение, возвращенное другим потоком"""
+        pool = self.make_pool(max_size=1, timeout=5)
+        conn = pool.checkout()
+        result = []
+
+        waiter = threading.Thread(target=lambda: result.append(pool.checkout()))
+        waiter.start()
+        while pool.stats()['waiting'] == 0:
+            pass
+        pool.checkin(conn)
+        waiter.join()
+
+        self.assertIs(result[0], conn)
+
+    def test_failed_health_check_replaces_connection(self):
+        """Соединение, не прошедшее проверку при выдаче, заменяется новым"""
+        pool = self.make_pool(max_size=1)
+        conn = pool.checkout()
+        pool.checkin(conn)
+        conn.close()
+
+        new_conn = pool.checkout()
+        self.assertIsNot(new_conn, conn)
+        stats = pool.stats()
+        self.assertEqual(stats['failed_checks'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_max_lifetime(self):
+        """Соединение старше max_lifetime закрывается при возврате"""
+        pool = self.make_pool(max_lifetime=0)
+        pool.checkin(pool.checkout())
+
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 0)
+        self.assertEqual(stats['connections_closed'], 1)
+
+    def test_idle_reaping_keeps_min_size(self):
+        """Простаивающие соединения закрываются, но не меньше min_size"""
+        pool = self.make_pool(max_size=3, min_size=1, idle_timeout=60)
+        conns = [pool.checkout() for _ in range(3)]
+        for conn in conns:
+            pool.checkin(conn)
+        self.assertEqual(pool.stats()['idle'], 3)
+
+        with mock.patch('orders.db_pool.time.monotonic', return_value=10 ** 9):
+            pool.reap()
+        stats = pool.stats()
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['connections_closed'], 2)
+
+    def test_failed_reset_discards_connection(self):
+        """Соединение, которое не удалось сбросить, не возвращается в пул"""
+        pool = self.make_pool(reset=mock.Mock(side_effect=sqlite3.Error))
+        pool.checkin(pool.checkout())
+
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_connect_error_releases_slot(self):
+        """Ошибка подключения не занимает место в пуле"""
+        pool = self.make_pool(max_size=1)
+        with self.assertRaises(sqlite3.Error):
+            pool.checkout(mock.Mock(side_effect=sqlite3.Error))
+
+        self.assertEqual(pool.stats()['size'], 0)
+        pool.checkout()
+
+
+class MetricsViewTest(APITestCase):
+    url = '/api/v1/metrics/'
+
+    def test_admin_gets_metrics(self):
+        """Администратор получает метрики процесса"""
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(user=admin)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('pid', response.data)
+        self.assertIn('db_pool', response.data)
+
+    def test_regular_user_forbidden(self):
+        """Обычному пользователю метрики недоступны"""
+        user = User.objects.create_user('user', password='pass')
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
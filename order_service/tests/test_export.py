@@ -0,0 +1,101 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from orders import exports
+from orders.models import Order
+from .factories import OrderFactory, OrderItemFactory, ProductFactory, UserFactory
+
+
+class OrderExportViewTest(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('order-export')
+
+        self.orders = [OrderFactory() for _ in range(3)]
+        self.product = ProductFactory(quantity=100, price=50)
+        OrderItemFactory(order=self.orders[0], product=self.product, quantity=2, unit_price=50)
+        OrderItemFactory(order=self.orders[0], quantity=1)
+
+        now = timezone.now()
+        for order, days_ago in zip(self.orders, (30, 20, 10)):
+            Order.objects.filter(id=order.id).update(created_at=now - timedelta(days=days_ago))
+
+    def read_ndjson(self, response):
+        body = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_export_ndjson(self):
+        """Выгрузка всех заказов в NDJSON в порядке создания"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = self.read_ndjson(response)
+        self.assertEqual([r['id'] for r in records], [o.id for o in self.orders])
+        self.assertEqual(len(records[0]['items']), 2)
+        self.assertEqual(records[1]['items'], [])
+
+    def test_export_csv_one_row_per_item(self):
+        """Выгрузка в CSV: по строке на позицию, заказ без позиций — одна строка"""
+        response = self.client.get(self.url, {'format': 'csv'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['order_id'], str(self.orders[0].id))
+        self.assertEqual(rows[-1]['product_id'], '')
+
+    def test_export_period(self):
+        """Фильтрация выгрузки по периоду"""
+        date_from = (timezone.now() - timedelta(days=25)).date().isoformat()
+        date_to = (timezone.now() - timedelta(days=15)).date().isoformat()
+
+        response = self.client.get(self.url, {'from': date_from, 'to': date_to})
+
+        records = self.read_ndjson(response)
+        self.assertEqual([r['id'] for r in records], [self.orders[1].id])
+
+    def test_export_resume_from_checkpoint(self):
+        """Продолжение выгрузки с контрольной точки (created_at, id)"""
+        first = self.read_ndjson(self.client.get(self.url))[0]
+
+        response = self.client.get(self.url, {
+            'after_created_at': first['created_at'],
+            'after_id': first['id'],
+        })
+
+        records = self.read_ndjson(response)
+        self.assertEqual([r['id'] for r in records], [o.id for o in self.orders[1:]])
+
+    def test_items_loaded_in_batches(self):
+        """Позиции подгружаются одним запросом на пачку заказов"""
+        orders = exports.export_queryset()
+        with self.assertNumQueries(3):
+            rows = list(exports.iter_orders_with_items(orders, chunk_size=2))
+        self.assertEqual(len(rows), 3)
+
+    def test_invalid_parameters(self):
+        """Неверный формат или дата возвращают 400"""
+        response = self.client.get(self.url, {'format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'from': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'after_id': 5})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_unauthorized(self):
+        """Выгрузка недоступна без авторизации"""
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.archive import archive_orders
+from orders.models import Order
+from .factories import OrderFactory, OrderItemFactory, ProductFactory, UserFactory
+
+
+class OrderFieldsetsTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.order = OrderFactory()
+        OrderItemFactory(order=self.order, quantity=2)
+        self.url = reverse('order-detail', args=[self.order.id])
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_order_fields(self):
+        """Только запрошенные поля, без JOIN клиента и без запроса позиций"""
+        response, queries = self.get(self.url, {'fields': 'id,status,status_display'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'id', 'status', 'status_display'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('customers', queries[0])
+        self.assertNotIn('notes', queries[0])
+
+    def test_item_fields(self):
+        """fields[items] ограничивает позиции; товар без product_name не присоединяется"""
+        response, queries = self.get(
+            self.url, {'fields': 'id,items', 'fields[items]': 'product_id,quantity'}
+        )
+
+        self.assertEqual(response.data['items'], [
+            {'product_id': self.order.items.get().product_id, 'quantity': 2}
+        ])
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('products', queries[1])
+        self.assertNotIn('unit_price', queries[1])
+
+    def test_all_fields_by_default(self):
+        """Без параметра fields ответ не меняется"""
+        response = self.client.get(self.url)
+
+        self.assertIn('customer_email', response.data)
+        self.assertIn('product_name', response.data['items'][0])
+
+    def test_archived_order_fields(self):
+        """archived_at доступно для заказа из архива"""
+        Order.objects.filter(id=self.order.id).update(
+            status=Order.Status.DELIVERED, updated_at=timezone.now() - timedelta(days=100)
+        )
+        archive_orders(days=90)
+
+        response = self.client.get(self.url, {'fields': 'id,archived_at'})
+
+        self.assertEqual(set(response.data), {'id', 'archived_at'})
+
+    def test_order_list_fields(self):
+        """Список заказов поддерживает те же параметры"""
+        response = self.client.get(reverse('order-list'), {'fields': 'id,total_amount'})
+
+        self.assertEqual(response.data['orders'], [
+            {'id': self.order.id, 'total_amount': '%.2f' % self.order.items.get().total_price}
+        ])
+
+    def test_unknown_fields(self):
+        """Неизвестные поля возвращают 400"""
+        for url, params in [
+            (self.url, {'fields': 'id,password'}),
+            (self.url, {'fields[items]': 'order'}),
+            (reverse('order-list'), {'fields': 'archived_at'}),
+            (reverse('product-stock'), {'fields': ''}),
+        ]:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductFieldsetsTest(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        self.async_client.force_login(self.user)
+        self.product = ProductFactory(quantity=5)
+
+    def test_product_fields(self):
+        """Запрос товаров без JOIN категории и без лишних колонок"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('product-stock'), {'fields': 'id,quantity,low_stock'})
+
+        self.assertEqual(response.data['products'], [
+            {'id': self.product.id, 'quantity': 5, 'low_stock': True}
+        ])
+        product_query = next(
+            query['sql'] for query in context.captured_queries if 'COUNT' not in query['sql']
+        )
+        self.assertNotIn('categories', product_query)
+        self.assertNotIn('price', product_query)
+
+    async def test_async_product_fields(self):
+        """Асинхронный эндпоинт поддерживает те же параметры"""
+        response = await self.async_client.get(reverse('async-product-stock'), {'fields': 'id,name'})
+
+        self.assertEqual(response.json()['products'], [
+            {'id': self.product.id, 'name': self.product.name}
+        ])
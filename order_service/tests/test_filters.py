@@ -0,0 +1,147 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.filters import filter_orders, ordering_warnings, parse_order_filters
+from orders.models import Order
+from .factories import CustomerFactory, OrderFactory, OrderItemFactory, UserFactory
+
+
+class ParseOrderFiltersTest(SimpleTestCase):
+    def test_valid_filters(self):
+        """Параметры приводятся к типам фильтров"""
+        filters, ordering = parse_order_filters({
+            'status': 'pending', 'customer': '7', 'min_total': '10.50',
+            'created_after': '2024-01-01', 'ordering': '-total_amount',
+        })
+
+        self.assertEqual(filters['status'], 'pending')
+        self.assertEqual(filters['customer'], 7)
+        self.assertEqual(filters['min_total'], Decimal('10.50'))
+        self.assertEqual(filters['created_after'].year, 2024)
+        self.assertEqual(ordering, '-total_amount')
+
+    def test_invalid_filters(self):
+        """Неверные значения и противоречивые диапазоны отклоняются"""
+        for params in [
+            {'status': 'lost'},
+            {'customer': 'abc'},
+            {'min_total': 'много'},
+            {'max_total': '-1'},
+            {'min_total': '100', 'max_total': '10'},
+            {'created_after': '2024-02-01', 'created_before': '2024-01-01'},
+            {'ordering': 'notes'},
+        ]:
+            with self.assertRaises(ValueError):
+                parse_order_filters(params)
+
+    def test_ordering_warnings(self):
+        """Предупреждение, если отбор и сортировка идут по разным индексам"""
+        self.assertEqual(ordering_warnings({}, '-total_amount'), [])
+        self.assertEqual(ordering_warnings({'customer': 1}, '-created_at'), [])
+        self.assertEqual(ordering_warnings({'min_total': 1}, 'total_amount'), [])
+        self.assertEqual(len(ordering_warnings({'min_total': 1}, '-created_at')), 1)
+        self.assertEqual(len(ordering_warnings({'status': 'pending'}, '-created_at')), 1)
+
+
+class OrderFilterIndexTest(TestCase):
+    """Каждый фильтр со своей сортировкой выполняется по индексу"""
+
+    def plan(self, params):
+        filters, ordering = parse_order_filters(params)
+        sql, sql_params = filter_orders(Order.objects.all(), filters, ordering)[:20].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, sql_params)
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertUsesIndex(self, params, index_fields):
+        index_name = next(
+            index.name for index in Order._meta.indexes if index.fields == index_fields
+        )
+        plan = self.plan(params)
+        self.assertIn(f'INDEX {index_name}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_created_range(self):
+        """Период по дате создания — индекс (created_at, id)"""
+        self.assertUsesIndex({'created_after': '2024-01-01', 'created_before': '2024-02-01'}, ['created_at', 'id'])
+
+    def test_customer(self):
+        """Клиент — индекс (customer, created_at, ...) без сортировки"""
+        self.assertUsesIndex({'customer': '1'}, ['customer', 'created_at', 'id', 'status'])
+
+    def test_customer_and_created_range(self):
+        """Клиент и период — диапазон того же составного индекса"""
+        self.assertUsesIndex(
+            {'customer': '1', 'created_after': '2024-01-01'}, ['customer', 'created_at', 'id', 'status']
+        )
+
+    def test_total_range(self):
+        """Диапазон суммы с сортировкой по сумме — индекс (total_amount, id)"""
+        self.assertUsesIndex({'min_total': '100', 'ordering': '-total_amount'}, ['total_amount', 'id'])
+        self.assertUsesIndex({'max_total': '100', 'ordering': 'total_amount'}, ['total_amount', 'id'])
+
+    def test_status(self):
+        """Статус — поиск по индексу со статусом"""
+        plan = self.plan({'status': 'pending', 'ordering': 'status'})
+        self.assertIn('(status=?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_ordering_without_filters(self):
+        """Без фильтров страница читается обходом индекса сортировки"""
+        self.assertUsesIndex({'ordering': '-total_amount'}, ['total_amount', 'id'])
+        self.assertUsesIndex({}, ['created_at', 'id'])
+
+
+class OrderListFiltersViewTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.url = reverse('order-list')
+        self.customer = CustomerFactory()
+        self.small = OrderFactory(customer=self.customer)
+        OrderItemFactory(order=self.small, quantity=1, unit_price=Decimal('10.00'), product__price=Decimal('10.00'))
+        self.large = OrderFactory()
+        OrderItemFactory(order=self.large, quantity=5, unit_price=Decimal('100.00'), product__price=Decimal('100.00'))
+
+    def test_filters(self):
+        """Фильтры по клиенту и сумме"""
+        by_customer = self.client.get(self.url, {'customer': self.customer.id})
+        by_total = self.client.get(self.url, {'min_total': '100', 'ordering': '-total_amount'})
+
+        self.assertEqual([o['id'] for o in by_customer.data['orders']], [self.small.id])
+        self.assertEqual([o['id'] for o in by_total.data['orders']], [self.large.id])
+        self.assertNotIn('warnings', by_total.data)
+
+    def test_pages_with_equal_sort_keys(self):
+        """При равных значениях сортировки страницы не повторяют и не теряют заказы"""
+        orders = [self.small, self.large] + [OrderFactory() for _ in range(3)]
+
+        pages = [
+            self.client.get(self.url, {'ordering': '-status', 'page_size': 2, 'page': page}).data['orders']
+            for page in (1, 2, 3)
+        ]
+
+        ids = [order['id'] for page in pages for order in page]
+        self.assertEqual(ids, sorted((order.id for order in orders), reverse=True))
+
+    def test_warning_for_unindexed_combination(self):
+        """Сортировка не по индексу фильтра возвращает предупреждение"""
+        response = self.client.get(self.url, {'min_total': '1'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['warnings']), 1)
+
+    def test_invalid_parameters(self):
+        """Неверные параметры возвращают 400 вместо 500"""
+        for params in [{'ordering': 'notes'}, {'page': 'first'}, {'page_size': '0'}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count(self):
+        """Позиции с товарами подгружаются одним запросом, число заказов — одним COUNT"""
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
@@ -0,0 +1,166 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.archive import archive_orders
+from orders.history import customer_order_count, customer_order_page
+from orders.models import Order
+from orders.pagination import decode_cursor, encode_cursor
+from orders.routers import replica_reads
+from .factories import CustomerFactory, OrderFactory, UserFactory
+
+
+def make_order(customer, days_ago, order_status=Order.Status.PENDING):
+    order = OrderFactory(customer=customer, status=order_status)
+    moment = timezone.now() - timedelta(days=days_ago)
+    Order.objects.filter(id=order.id).update(created_at=moment, updated_at=moment)
+    return order
+
+
+class CursorTest(SimpleTestCase):
+    def test_round_trip(self):
+        """Курсор восстанавливает пару (created_at, id)"""
+        moment = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+
+    def test_invalid_cursor(self):
+        """Поврежденный курсор вызывает ValueError"""
+        for value in ['', 'not-a-cursor', encode_cursor(timezone.now(), 1)[:-3]]:
+            with self.assertRaises(ValueError):
+                decode_cursor(value)
+
+
+class CustomerOrderPageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = CustomerFactory()
+        self.orders = [make_order(self.customer, days) for days in (1, 2, 3, 4, 5)]
+        make_order(CustomerFactory(), 1)
+
+    def test_pages_follow_keyset(self):
+        """Страницы идут от новых заказов к старым без пропусков и повторов"""
+        first, last = customer_order_page(self.customer.id, page_size=2)
+        second, last = customer_order_page(self.customer.id, after=last, page_size=2)
+        third, last = customer_order_page(self.customer.id, after=last, page_size=2)
+
+        ids = [order['id'] for order in first + second + third]
+        self.assertEqual(ids, [order.id for order in self.orders])
+        self.assertIsNone(last)
+
+    def test_same_created_at(self):
+        """Заказы с одинаковым created_at упорядочиваются по id"""
+        moment = timezone.now()
+        Order.objects.filter(customer=self.customer).update(created_at=moment)
+
+        first, last = customer_order_page(self.customer.id, page_size=3)
+        second, _ = customer_order_page(self.customer.id, after=last, page_size=3)
+
+        ids = [order['id'] for order in first + second]
+        self.assertEqual(ids, sorted((order.id for order in self.orders), reverse=True))
+
+    def test_merges_archive(self):
+        """Архивные заказы попадают в историю на свое место по дате"""
+        Order.objects.filter(id=self.orders[2].id).update(
+            status=Order.Status.DELIVERED, updated_at=timezone.now() - timedelta(days=100)
+        )
+        archive_orders(days=90)
+
+        orders, _ = customer_order_page(self.customer.id, page_size=10)
+
+        self.assertEqual([order['id'] for order in orders], [order.id for order in self.orders])
+        self.assertEqual([order['archived'] for order in orders], [False, False, True, False, False])
+
+    def test_filters(self):
+        """Фильтры по статусу и периоду"""
+        Order.objects.filter(id=self.orders[0].id).update(status=Order.Status.SHIPPED)
+
+        shipped, _ = customer_order_page(self.customer.id, status=Order.Status.SHIPPED)
+        recent, _ = customer_order_page(
+            self.customer.id, date_from=timezone.now() - timedelta(days=2, hours=12)
+        )
+
+        self.assertEqual([order['id'] for order in shipped], [self.orders[0].id])
+        self.assertEqual([order['id'] for order in recent], [order.id for order in self.orders[:2]])
+
+    def test_page_queries(self):
+        """Страница читается по индексу клиента: ключи из двух таблиц и строки по pk"""
+        with CaptureQueriesContext(connection) as context:
+            customer_order_page(self.customer.id, page_size=2)
+
+        self.assertEqual(len(context.captured_queries), 3)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + context.captured_queries[0]['sql'])
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('COVERING INDEX orders_customer_history_idx', plan)
+
+    def test_cached_count(self):
+        """Число заказов кэшируется и сбрасывается при создании заказа"""
+        self.assertEqual(customer_order_count(self.customer.id), 5)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(customer_order_count(self.customer.id), 5)
+        # Повторное чтение берется из общего кэша, без COUNT по заказам
+        self.assertFalse(any('"orders' in query['sql'] for query in context.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderFactory(customer=self.customer)
+        self.assertEqual(customer_order_count(self.customer.id), 6)
+
+
+@override_settings(REPLICA_DATABASES=['replica_1'])
+class CustomerOrderCountReplicaTest(TransactionTestCase):
+    """Вне транзакции теста: внутри нее чтение и так идет с основной БД"""
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def test_counted_on_primary(self):
+        """Число заказов считается с основной БД даже в запросе, читающем с реплик"""
+        customer = CustomerFactory()
+        OrderFactory(customer=customer)
+
+        with replica_reads():
+            self.assertEqual(customer_order_count(customer.id), 1)
+
+
+class CustomerOrderHistoryViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=UserFactory())
+        self.customer = CustomerFactory()
+        self.orders = [make_order(self.customer, days) for days in (1, 2, 3)]
+        self.url = reverse('customer-orders', args=[self.customer.id])
+
+    def test_cursor_pagination(self):
+        """next_cursor ведет на следующую страницу"""
+        first = self.client.get(self.url, {'page_size': 2})
+        second = self.client.get(self.url, {'page_size': 2, 'cursor': first.data['next_cursor']})
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertTrue(first.data['has_next'])
+        self.assertEqual(first.data['total_orders'], 3)
+        self.assertEqual(
+            [order['id'] for order in first.data['orders'] + second.data['orders']],
+            [order.id for order in self.orders]
+        )
+        self.assertFalse(second.data['has_next'])
+        self.assertIsNone(second.data['next_cursor'])
+
+    def test_invalid_parameters(self):
+        """Неверный курсор, статус или дата возвращают 400"""
+        for params in [{'cursor': 'broken'}, {'status': 'unknown'}, {'from': 'yesterday'}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_customer(self):
+        """Несуществующий клиент возвращает 404"""
+        response = self.client.get(reverse('customer-orders', args=[999]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
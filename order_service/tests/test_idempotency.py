@@ -0,0 +1,207 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework.views import APIView
+
+from orders.idempotency import idempotent, request_fingerprint
+from orders.models import IdempotencyRecord, Order
+from .factories import OrderFactory, ProductFactory, UserFactory
+
+
+class IdempotencyKeyTest(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        self.product = ProductFactory(quantity=10)
+        self.order = OrderFactory()
+        self.url = reverse('add-order-item', kwargs={'order_id': self.order.id})
+        self.data = {'product_id': self.product.id, 'quantity': 2}
+
+    def post(self, data=None, key='key-1'):
+        return self.client.post(self.url, data or self.data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_response(self):
+        """Повтор с тем же ключом не добавляет товар второй раз"""
+        first = self.post()
+        second = self.post()
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.order.items.get().quantity, 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 8)
+
+    def test_replay_does_not_touch_orders(self):
+        """Повтор отвечает одним запросом к хранилищу ключей"""
+        self.post()
+        with CaptureQueriesContext(connection) as queries:
+            self.post()
+
+        # Счетчики ограничения частоты хранятся в rate_limit_counters
+        app_queries = [
+            query['sql'] for query in queries if 'rate_limit_counters' not in query['sql']
+        ]
+        self.assertEqual(len(app_queries), 1)
+        self.assertIn('idempotency_records', app_queries[0])
+
+    def test_different_keys_execute(self):
+        """Разные ключи выполняются как разные запросы"""
+        self.post(key='key-1')
+        self.post(key='key-2')
+
+        self.assertEqual(self.order.items.get().quantity, 4)
+
+    def test_key_reuse_with_different_body(self):
+        """Ключ нельзя использовать для другого тела запроса"""
+        self.post()
+        response = self.post({'product_id': self.product.id, 'quantity': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_error_responses_are_replayed(self):
+        """Ответ 4xx тоже сохраняется и повторяется"""
+        data = {'product_id': self.product.id, 'quantity': 20}
+        first = self.post(data)
+        self.product.quantity = 100
+        self.product.save()
+
+        second = self.post(data)
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.order.items.exists())
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_in_progress_conflict(self):
+        """Параллельный запрос с тем же ключом не выполняется повторно"""
+        IdempotencyRecord.objects.create(
+            user=self.user,
+            key='key-1',
+            fingerprint=self.fingerprint(),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+        response = self.post()
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(self.order.items.exists())
+
+    def test_expired_record_executes_again(self):
+        """После истечения TTL ключ можно использовать заново"""
+        self.post()
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.post()
+
+        self.assertEqual(self.order.items.get().quantity, 4)
+
+    def test_abandoned_record_executes_again(self):
+        """Давно незавершенную запись без блокировки выполняет повтор"""
+        IdempotencyRecord.objects.create(
+            user=self.user,
+            key='key-1',
+            fingerprint=self.fingerprint(),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        IdempotencyRecord.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+        response = self.post()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.order.items.get().quantity, 2)
+        self.assertEqual(IdempotencyRecord.objects.get().status, IdempotencyRecord.Status.COMPLETED)
+
+    def test_keys_are_per_user(self):
+        """Одинаковые ключи разных пользователей не пересекаются"""
+        self.post()
+        self.client.force_authenticate(user=UserFactory())
+        self.post()
+
+        self.assertEqual(self.order.items.get().quantity, 4)
+
+    def test_status_update(self):
+        """Idempotency-Key поддерживается при смене статуса"""
+        url = reverse('order-status-update', kwargs={'order_id': self.order.id})
+        first = self.client.patch(url, {'status': 'confirmed'}, format='json', HTTP_IDEMPOTENCY_KEY='s-1')
+        Order.objects.filter(id=self.order.id).update(status=Order.Status.SHIPPED)
+        second = self.client.patch(url, {'status': 'confirmed'}, format='json', HTTP_IDEMPOTENCY_KEY='s-1')
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Order.objects.get(id=self.order.id).status, Order.Status.SHIPPED)
+
+    def test_purge_command(self):
+        """Команда удаляет истекшие записи"""
+        self.post()
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+
+        call_command('purge_idempotency_keys', stdout=out)
+
+        self.assertIn('Purged 1', out.getvalue())
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def fingerprint(self):
+        class FakeRequest:
+            method = 'POST'
+            path = self.url
+            data = self.data
+        return request_fingerprint(FakeRequest)
+
+
+class CreateOrderView(APIView):
+    response_status = status.HTTP_201_CREATED
+
+    @idempotent
+    def post(self, request):
+        order = OrderFactory()
+        if self.response_status is None:
+            raise RuntimeError('handler failed')
+        return Response({'id': order.id}, status=self.response_status)
+
+
+class IdempotentTransactionTest(APITestCase):
+    """Сохраненный ответ фиксируется в одной транзакции с изменениями обработчика"""
+
+    def setUp(self):
+        self.user = UserFactory()
+
+    def post(self, response_status):
+        request = APIRequestFactory().post('/orders/', {}, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        force_authenticate(request, user=self.user)
+        view = CreateOrderView.as_view(response_status=response_status)
+        return view(request)
+
+    def test_completed_with_changes(self):
+        """Успешный ответ сохраняется вместе с заказом"""
+        response = self.post(status.HTTP_201_CREATED)
+
+        record = IdempotencyRecord.objects.get()
+        self.assertEqual(record.status, IdempotencyRecord.Status.COMPLETED)
+        self.assertEqual(record.response_body, {'id': response.data['id']})
+        self.assertTrue(Order.objects.filter(id=response.data['id']).exists())
+
+    def test_server_error_rolls_back_changes(self):
+        """Ответ 5xx откатывает изменения обработчика и освобождает ключ"""
+        self.post(status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_exception_rolls_back_changes(self):
+        """Исключение обработчика откатывает его изменения и освобождает ключ"""
+        with self.assertRaises(RuntimeError):
+            self.post(None)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(IdempotencyRecord.objects.exists())
@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from orders.imports import ProductImporter
+from orders.models import Product
+from .factories import CategoryFactory, ProductFactory, UserFactory
+
+CSV_FEED = (
+    'sku,name,quantity,price,category,is_active\n'
+    'SKU-1,Ноутбук,5,999.99,Электроника > Компьютеры,true\n'
+    'SKU-2,Мышь,-1,10.00,Компьютеры,true\n'
+    'SKU-3,Клавиатура,7,-5,Компьютеры,true\n'
+    'SKU-4,Книга,3,15.50,Неизвестная,true\n'
+    'SKU-5,Кабель,100,2.50,компьютеры,false\n'
+)
+
+
+class ProductImporterTest(APITestCase):
+    def setUp(self):
+        self.root = CategoryFactory(name='Электроника')
+        self.category = CategoryFactory(name='Компьютеры', parent=self.root)
+
+    def run_import(self, text, input_format='csv', batch_size=2):
+        return ProductImporter(batch_size=batch_size).run(StringIO(text), input_format)
+
+    def test_valid_rows_created_invalid_reported(self):
+        """Валидные строки сохраняются, ошибочные попадают в отчет"""
+        report = self.run_import(CSV_FEED)
+
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['error_count'], 3)
+        errors = {error['sku']: error['errors'] for error in report['errors']}
+        self.assertIn('check_quantity_positive', errors['SKU-2']['quantity'])
+        self.assertIn('check_price_positive', errors['SKU-3']['price'])
+        self.assertIn('category', errors['SKU-4'])
+
+        laptop = Product.objects.get(sku='SKU-1')
+        self.assertEqual(laptop.category, self.category)
+        self.assertEqual(laptop.price, Decimal('999.99'))
+        self.assertFalse(Product.objects.get(sku='SKU-5').is_active)
+
+    def test_upsert_updates_existing(self):
+        """Повторный импорт обновляет товары по SKU"""
+        product = ProductFactory(sku='SKU-1', quantity=1, price=1, category=self.category)
+
+        report = self.run_import(
+            '{"sku": "SKU-1", "name": "Ноутбук", "quantity": 50, "price": "899.00", '
+            '"category": "Компьютеры"}\n'
+            'not json\n',
+            input_format='ndjson'
+        )
+
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(report['created'], 0)
+        self.assertEqual(report['errors'][0]['line'], 2)
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 50)
+        self.assertEqual(product.price, Decimal('899.00'))
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_ambiguous_category_name(self):
+        """Неоднозначное имя категории требует полного пути"""
+        CategoryFactory(name='Компьютеры', parent=CategoryFactory(name='Офис'))
+
+        report = self.run_import(
+            'sku,name,quantity,price,category\n'
+            'SKU-1,Ноутбук,1,1,Компьютеры\n'
+            'SKU-2,Ноутбук,1,1,Электроника>Компьютеры\n'
+        )
+
+        self.assertEqual(report['created'], 1)
+        self.assertIn('Ambiguous', report['errors'][0]['errors']['category'])
+
+    def test_management_command(self):
+        """Импорт из файла через команду управления"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write(CSV_FEED)
+        self.addCleanup(os.remove, f.name)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_products', f.name, stdout=out, stderr=err)
+
+        self.assertIn('2 created', out.getvalue())
+        self.assertIn('SKU-2', err.getvalue())
+
+
+class ProductImportViewTest(APITestCase):
+    def setUp(self):
+        CategoryFactory(name='Компьютеры')
+        self.url = reverse('product-import')
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory(is_staff=True))
+
+    def test_import_ndjson(self):
+        """Импорт NDJSON через API"""
+        body = '\n'.join(json.dumps({
+            'sku': f'SKU-{n}', 'name': f'Товар {n}', 'quantity': n,
+            'price': '10.00', 'category': 'Компьютеры'
+        }) for n in range(3))
+
+        response = self.client.generic('POST', self.url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['success'])
+        self.assertEqual(response.data['created'], 3)
+
+    def test_unsupported_content_type(self):
+        """Неподдерживаемый формат тела запроса"""
+        response = self.client.post(self.url, {'sku': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_import_requires_staff(self):
+        """Импорт доступен только персоналу"""
+        client = APIClient()
+        client.force_authenticate(user=UserFactory())
+
+        response = client.generic('POST', self.url, 'sku,name\n', content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,132 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders import inventory
+from orders.models import Product, ProductStockShard
+from .factories import OrderFactory, ProductFactory, UserFactory
+
+
+def shard_quantities(product):
+    return list(
+        ProductStockShard.objects.filter(product=product).order_by('shard').values_list('quantity', flat=True)
+    )
+
+
+class ShardedStockTest(TestCase):
+    def setUp(self):
+        self.product = inventory.enable_sharding(ProductFactory(quantity=10), shards=4)
+
+    def test_enable_splits_evenly(self):
+        """Остаток делится между шардами поровну"""
+        self.assertTrue(self.product.sharded_stock)
+        self.assertEqual(shard_quantities(self.product), [3, 3, 2, 2])
+
+    def test_reserve_single_shard(self):
+        """Небольшое списание идет с одного шарда"""
+        with transaction.atomic():
+            inventory.reserve(self.product.id, 2)
+
+        changed = [
+            (before, after) for before, after in zip([3, 3, 2, 2], shard_quantities(self.product))
+            if before != after
+        ]
+        self.assertEqual(len(changed), 1)
+        self.assertEqual(changed[0][0] - changed[0][1], 2)
+
+    def test_reserve_falls_back_across_shards(self):
+        """Если ни в одном шарде не хватает остатка, списание идет с нескольких"""
+        with transaction.atomic():
+            inventory.reserve(self.product.id, 7)
+
+        self.assertEqual(sum(shard_quantities(self.product)), 3)
+
+    def test_reserve_insufficient_stock(self):
+        """Списание больше общего остатка не выполняется"""
+        with self.assertRaises(inventory.InsufficientStock) as cm:
+            with transaction.atomic():
+                inventory.reserve(self.product.id, 11)
+
+        self.assertEqual(cm.exception.available, 10)
+        self.assertEqual(sum(shard_quantities(self.product)), 10)
+
+    def test_reconcile(self):
+        """Product.quantity пересчитывается как сумма шардов"""
+        with transaction.atomic():
+            inventory.reserve(self.product.id, 4)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 10)
+
+        self.assertEqual(inventory.reconcile(), 1)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 6)
+
+    def test_rebalance(self):
+        """Остаток выравнивается между шардами"""
+        ProductStockShard.objects.filter(product=self.product, shard=0).update(quantity=0)
+        ProductStockShard.objects.filter(product=self.product, shard=1).update(quantity=0)
+
+        inventory.rebalance(self.product)
+
+        self.assertEqual(shard_quantities(self.product), [1, 1, 1, 1])
+
+    def test_disable_sharding(self):
+        """Выключение режима собирает остаток обратно в товар"""
+        with transaction.atomic():
+            inventory.reserve(self.product.id, 1)
+
+        product = inventory.disable_sharding(self.product)
+
+        self.assertFalse(product.sharded_stock)
+        self.assertEqual(Product.objects.get(id=product.id).quantity, 9)
+        self.assertFalse(ProductStockShard.objects.filter(product=product).exists())
+
+    def test_reconcile_command(self):
+        """Команда reconcile_stock пересчитывает остатки"""
+        out = StringIO()
+        call_command('reconcile_stock', '--rebalance', stdout=out)
+        self.assertIn('Reconciled 1 sharded products', out.getvalue())
+
+    def test_admin_changelist_quantity_readonly(self):
+        """В списке товаров остаток шардированного товара не редактируется"""
+        plain = ProductFactory(quantity=5)
+        request = RequestFactory().get('/admin/orders/product/')
+        request.user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        formset_class = site._registry[Product].get_changelist_formset(request)
+        formset = formset_class(queryset=Product.objects.filter(id__in=[self.product.id, plain.id]).order_by('id'))
+
+        sharded_form, plain_form = formset.forms
+        self.assertTrue(sharded_form.fields['quantity'].disabled)
+        self.assertFalse(plain_form.fields['quantity'].disabled)
+
+
+class ShardedAddOrderItemTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.product = inventory.enable_sharding(ProductFactory(quantity=5), shards=2)
+        self.order = OrderFactory()
+        self.url = reverse('add-order-item', kwargs={'order_id': self.order.id})
+
+    def test_add_item_reserves_from_shards(self):
+        """Добавление шардированного товара списывает остаток с шардов"""
+        response = self.client.post(self.url, {'product_id': self.product.id, 'quantity': 4}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(shard_quantities(self.product)), 1)
+        self.assertEqual(self.order.items.get().quantity, 4)
+
+    def test_add_item_insufficient_stock(self):
+        """Недостаток остатка по шардам возвращает 400"""
+        response = self.client.post(self.url, {'product_id': self.product.id, 'quantity': 6}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['available'], 5)
+        self.assertFalse(self.order.items.exists())
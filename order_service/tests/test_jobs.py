@@ -0,0 +1,179 @@
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders import jobs
+from orders.models import Job, Order
+from .factories import OrderFactory, OrderItemFactory, UserFactory
+
+calls = []
+
+
+@jobs.task('test_record')
+def record(value):
+    calls.append(value)
+    return {'value': value}
+
+
+@jobs.task('test_fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_validation(self):
+        """Неизвестная задача и неподходящие аргументы отклоняются при постановке"""
+        for name, args in [('unknown', {}), ('test_record', {}), ('test_record', {'value': 1, 'x': 2})]:
+            with self.assertRaises(ValueError):
+                jobs.enqueue(name, args)
+
+    def test_priority_order(self):
+        """Задачи выполняются по приоритету, при равном — в порядке постановки"""
+        jobs.enqueue('test_record', {'value': 'low'}, priority=-1)
+        jobs.enqueue('test_record', {'value': 'first'})
+        jobs.enqueue('test_record', {'value': 'urgent'}, priority=10)
+        jobs.enqueue('test_record', {'value': 'second'})
+
+        self.assertEqual(jobs.work(burst=True), 4)
+
+        self.assertEqual(calls, ['urgent', 'first', 'second', 'low'])
+        job = Job.objects.get(args__value='urgent')
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result, {'value': 'urgent'})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claim_once(self):
+        """Задачу в аренде не забирает другой воркер"""
+        job = jobs.enqueue('test_record', {'value': 1})
+
+        self.assertEqual(jobs.claim('worker-a').id, job.id)
+        self.assertIsNone(jobs.claim('worker-b'))
+
+    @override_settings(JOBS_MAX_BACKOFF_SECONDS=60)
+    def test_retry_with_backoff(self):
+        """Ошибка откладывает повтор, после последней попытки задача неудачна"""
+        job = jobs.enqueue('test_fail', max_attempts=2)
+
+        self.assertEqual(jobs.work(burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.last_error, 'boom')
+        self.assertGreater(job.available_at, timezone.now())
+
+        Job.objects.filter(id=job.id).update(available_at=timezone.now())
+        jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_visibility_timeout(self):
+        """Задача упавшего воркера возвращается в очередь после истечения аренды"""
+        job = jobs.enqueue('test_record', {'value': 'again'})
+        jobs.claim('crashed-worker')
+        Job.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(jobs.work(burst=True), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(calls, ['again'])
+
+    def test_stale_worker_cannot_overwrite(self):
+        """Воркер, потерявший аренду, не перезаписывает результат"""
+        job = jobs.enqueue('test_record', {'value': 1})
+        claimed = jobs.claim('slow-worker')
+        Job.objects.filter(id=job.id).update(locked_by='other-worker')
+
+        jobs.execute(claimed, 'slow-worker')
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.RUNNING)
+
+    def test_stats(self):
+        """Метрики очереди"""
+        jobs.enqueue('test_record', {'value': 1})
+        Job.objects.update(available_at=timezone.now() - timedelta(seconds=30))
+
+        stats = jobs.jobs_stats()
+
+        self.assertEqual((stats['queued'], stats['running']), (1, 0))
+        self.assertGreaterEqual(stats['queue_lag_seconds'], 30)
+
+
+class BuiltinTasksTest(TestCase):
+    def test_recalculate_order_totals(self):
+        """Пересчет сумм заказов пачками"""
+        order = OrderFactory()
+        OrderItemFactory(order=order, quantity=2, unit_price=Decimal('5.00'))
+        Order.objects.update(total_amount=0)
+        jobs.enqueue('recalculate_order_totals', {'batch_size': 1})
+
+        call_command('run_workers', '--workers=1', '--burst', stdout=StringIO())
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('10.00'))
+        self.assertEqual(Job.objects.get().result, {'updated': 1})
+
+    def test_export_orders(self):
+        """Выгрузка заказов пишет файл в JOBS_EXPORT_DIR"""
+        OrderFactory()
+        with tempfile.TemporaryDirectory() as directory, override_settings(JOBS_EXPORT_DIR=directory):
+            job = jobs.enqueue('export_orders', {'format': 'csv'})
+            jobs.work(burst=True)
+
+            job.refresh_from_db()
+            with open(job.result['path'], encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            self.assertEqual(os.path.dirname(job.result['path']), directory)
+        self.assertEqual(len(lines), 2)
+
+
+class JobViewsTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(user=self.admin)
+
+    def test_enqueue_returns_accepted(self):
+        """Постановка задачи возвращает 202 и ссылку на статус"""
+        response = self.client.post(
+            reverse('job-create'), {'task': 'test_record', 'args': {'value': 7}}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response['Location'], response.data['status_url'])
+
+        jobs.work(burst=True)
+        job_status = self.client.get(response.data['status_url'])
+        self.assertEqual(job_status.data['status'], Job.Status.SUCCEEDED)
+        self.assertEqual(job_status.data['result'], {'value': 7})
+
+    def test_invalid_job(self):
+        """Неизвестная задача возвращает 400 со списком задач"""
+        response = self.client.post(reverse('job-create'), {'task': 'rm_rf'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('export_orders', response.data['tasks'])
+
+    def test_permissions(self):
+        """Ставит задачи только персонал, статус виден только автору"""
+        job = jobs.enqueue('test_record', {'value': 1}, user=self.admin)
+        self.client.force_authenticate(user=UserFactory())
+
+        response = self.client.post(reverse('job-create'), {'task': 'test_record'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('job-status', args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
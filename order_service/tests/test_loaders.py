@@ -0,0 +1,93 @@
+from django.db import connection, transaction
+from django.http import Http404
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from orders.loaders import IdentityMap, identity_map, identity_map_scope
+from orders.models import Order, Product, StockAlert
+from orders.watchlist import sync_watchlist
+from .factories import OrderFactory, OrderItemFactory, ProductFactory, UserFactory
+
+
+class IdentityMapTest(TestCase):
+    def setUp(self):
+        self.products = [ProductFactory() for _ in range(3)]
+        self.loader = IdentityMap()
+
+    def test_load_returns_same_instance(self):
+        """Повторная загрузка возвращает тот же экземпляр без запроса"""
+        product = self.loader.load(Product, self.products[0].id)
+
+        with self.assertNumQueries(0):
+            self.assertIs(self.loader.load(Product, self.products[0].id), product)
+
+    def test_load_many_single_query(self):
+        """Недостающие объекты загружаются одним запросом"""
+        self.loader.load(Product, self.products[0].id)
+        ids = [product.id for product in self.products] + [999]
+
+        with self.assertNumQueries(1):
+            loaded = self.loader.load_many(Product, ids)
+
+        self.assertEqual(sorted(loaded), sorted(product.id for product in self.products))
+
+    def test_lock_refreshes_loaded_instance(self):
+        """Блокирующее чтение всегда идет в БД и обновляет выданный экземпляр"""
+        product = self.loader.load(Product, self.products[0].id)
+        Product.objects.filter(id=product.id).update(quantity=3)
+
+        with transaction.atomic(), self.assertNumQueries(1):
+            locked = self.loader.lock(Product.objects.all(), product.id)
+
+        self.assertIs(locked, product)
+        self.assertEqual(product.quantity, 3)
+
+    def test_lock_refreshes_load_state(self):
+        """После блокировки save() сравнивает остаток с заблокированным, а не с загруженным ранее"""
+        Product.objects.filter(id=self.products[0].id).update(quantity=5)
+        sync_watchlist()
+        product = self.loader.load(Product, self.products[0].id)
+
+        # Пополнение между загрузкой и блокировкой убирает товар из списка наблюдения
+        Product.objects.filter(id=product.id).update(quantity=50)
+        sync_watchlist()
+        with transaction.atomic():
+            locked = self.loader.lock(Product.objects.all(), product.id)
+            locked.quantity -= 45
+            locked.save()
+
+        self.assertEqual(StockAlert.objects.get(product=product).level, StockAlert.Level.LOW)
+
+    def test_lock_missing_raises_404(self):
+        """Отсутствующая строка дает Http404"""
+        with self.assertRaises(Http404):
+            with transaction.atomic():
+                self.loader.lock(Order.objects.all(), 999)
+
+    def test_no_caching_outside_request(self):
+        """Вне запроса каждая загрузка получает новую карту"""
+        self.assertIsNot(identity_map(), identity_map())
+        with identity_map_scope():
+            self.assertIs(identity_map(), identity_map())
+
+
+class AddOrderItemLoadsTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.product = ProductFactory(quantity=10)
+        self.order = OrderFactory()
+        OrderItemFactory(order=self.order, product=self.product)
+        self.url = reverse('add-order-item', kwargs={'order_id': self.order.id})
+
+    def test_product_and_order_loaded_once(self):
+        """Товар читается дважды (проверка и блокировка), заказ — один раз"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'product_id': self.product.id, 'quantity': 2}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(sum('FROM "products"' in sql for sql in selects), 2)
+        self.assertEqual(sum('FROM "orders"' in sql for sql in selects), 1)
+        self.assertEqual(response.data['order_total'], float(Order.objects.get(id=self.order.id).total_amount))
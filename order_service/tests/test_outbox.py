@@ -0,0 +1,186 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders import outbox
+from orders.models import Order, OutboxEvent
+from .factories import OrderFactory, ProductFactory, UserFactory
+
+
+class FailingSink:
+    def send(self, messages):
+        raise OSError('sink is down')
+
+
+class ListSink:
+    def __init__(self):
+        self.messages = []
+
+    def send(self, messages):
+        self.messages.extend(messages)
+
+
+class OutboxPublishTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.order = OrderFactory()
+
+    def test_add_item_event(self):
+        """Добавление товара записывает событие в той же транзакции"""
+        product = ProductFactory(quantity=10)
+
+        self.client.post(
+            reverse('add-order-item', args=[self.order.id]),
+            {'product_id': product.id, 'quantity': 2}, format='json'
+        )
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.event_type, outbox.ORDER_ITEM_ADDED)
+        self.assertEqual(event.aggregate_id, self.order.id)
+        self.assertEqual(event.payload['product_id'], product.id)
+        self.assertEqual(event.payload['quantity'], 2)
+
+    def test_failed_add_item_has_no_event(self):
+        """Отклоненное изменение не оставляет события"""
+        product = ProductFactory(quantity=1)
+
+        response = self.client.post(
+            reverse('add-order-item', args=[self.order.id]),
+            {'product_id': product.id, 'quantity': 5}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_status_change_event(self):
+        """Смена статуса публикует событие, повтор того же статуса — нет"""
+        url = reverse('order-status-update', args=[self.order.id])
+
+        self.client.patch(url, {'status': Order.Status.PROCESSING}, format='json')
+        self.client.patch(url, {'status': Order.Status.PROCESSING}, format='json')
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.event_type, outbox.ORDER_STATUS_CHANGED)
+        self.assertEqual(event.payload, {
+            'order_id': self.order.id, 'old_status': 'pending', 'new_status': 'processing'
+        })
+
+    def test_admin_bulk_action(self):
+        """Массовое действие админки публикует событие для каждого измененного заказа"""
+        shipped = OrderFactory(status=Order.Status.SHIPPED)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin)
+
+        self.client.post(reverse('admin:orders_order_changelist'), {
+            'action': 'mark_as_shipped', '_selected_action': [self.order.id, shipped.id],
+        })
+
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('aggregate_id', flat=True)), [self.order.id]
+        )
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.SHIPPED)
+
+
+class OutboxDispatchTest(TestCase):
+    def setUp(self):
+        self.order = OrderFactory()
+        for new_status in ['processing', 'shipped', 'delivered']:
+            outbox.publish(outbox.ORDER_STATUS_CHANGED, self.order, {'new_status': new_status})
+
+    def test_file_sink(self):
+        """Файловый приемник получает события по порядку, события отмечаются отправленными"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'outbox.ndjson')
+
+            dispatched, failed = outbox.drain(outbox.get_sink(f'file:{path}'), batch_size=2)
+
+            with open(path, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual((dispatched, failed), (3, 0))
+        self.assertEqual(
+            [line['payload']['new_status'] for line in lines], ['processing', 'shipped', 'delivered']
+        )
+        self.assertFalse(OutboxEvent.objects.filter(dispatched_at__isnull=True).exists())
+
+    @override_settings(OUTBOX_MAX_BACKOFF_SECONDS=60)
+    def test_failure_backoff(self):
+        """Ошибка приемника откладывает повтор, аренда снимается"""
+        self.assertEqual(outbox.drain(FailingSink()), (0, 3))
+
+        event = OutboxEvent.objects.first()
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'sink is down')
+        self.assertIsNone(event.locked_until)
+        self.assertGreater(event.available_at, timezone.now())
+        # До истечения паузы событие не отправляется
+        self.assertEqual(outbox.drain(ListSink()), (0, 0))
+        self.assertEqual(outbox.retry_delay(10), 60)
+
+    def test_lease_skips_claimed_events(self):
+        """События в аренде другого диспетчера не забираются до ее истечения"""
+        claimed = outbox.claim_batch(2, lease_seconds=30, worker='other')
+        sink = ListSink()
+
+        self.assertEqual(outbox.dispatch_batch(sink, batch_size=10), (1, 0))
+        OutboxEvent.objects.filter(id__in=[e.id for e in claimed]).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(outbox.dispatch_batch(sink, batch_size=10), (2, 0))
+        self.assertEqual(len({message['id'] for message in sink.messages}), 3)
+
+    def test_http_sink(self):
+        """HTTP-приемник отправляет пачку POST-запросом"""
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers['Content-Length'])
+                received.extend(json.loads(self.rfile.read(length))['events'])
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            sink = outbox.get_sink(f'http://127.0.0.1:{server.server_port}/')
+            self.assertEqual(outbox.drain(sink), (3, 0))
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(len(received), 3)
+        self.assertEqual(received[0]['aggregate_id'], self.order.id)
+
+    def test_stats_and_command(self):
+        """Метрика показывает задержку, команда отправляет и удаляет старые события"""
+        OutboxEvent.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        stats = outbox.outbox_stats()
+        self.assertEqual(stats['pending'], 3)
+        self.assertGreaterEqual(stats['lag_seconds'], 300)
+
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'dispatch_outbox', f'--sink=file:{os.path.join(directory, "out.ndjson")}',
+                '--purge-days=0', stdout=out
+            )
+
+        self.assertIn('Dispatched 3 events (0 failed)', out.getvalue())
+        self.assertIn('Purged 3 dispatched events', out.getvalue())
+        self.assertEqual(outbox.outbox_stats()['lag_seconds'], 0.0)
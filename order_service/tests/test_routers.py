@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from orders.middleware import PRIMARY_PIN_COOKIE, PRIMARY_PIN_KEY, ReplicaRoutingMiddleware
+from orders.models import Order, Product, RateLimitCounter
+from orders.routers import PrimaryReplicaRouter, primary_reads, replica_reads
+
+
+@override_settings(REPLICA_DATABASES=['replica_1', 'replica_2'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """Без явного разрешения чтение идет в основную БД"""
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_replica_reads(self):
+        """Внутри replica_reads чтение идет на одну из реплик"""
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Product), ['replica_1', 'replica_2'])
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_primary_only_models(self):
+        """Счетчики лимитов читаются с основной БД даже при разрешенном чтении с реплик"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(RateLimitCounter), 'default')
+
+    def test_writes_use_primary(self):
+        """Запись всегда идет в основную БД"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Order), 'default')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_configured(self):
+        """Без настроенных реплик все запросы идут в основную БД"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_migrations_only_on_primary(self):
+        """Миграции не применяются к репликам"""
+        self.assertTrue(self.router.allow_migrate('default', 'orders'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'orders'))
+
+
+@override_settings(REPLICA_DATABASES=['replica_1'])
+class ReplicaAtomicBlockTest(TestCase):
+    def test_reads_inside_transaction_stay_on_primary(self):
+        """Чтения внутри транзакции (select_for_update) остаются на основной БД"""
+        with replica_reads(), transaction.atomic():
+            self.assertEqual(Product.objects.select_for_update().db, 'default')
+
+
+@override_settings(
+    REPLICA_DATABASES=['replica_1'],
+    REPLICA_PIN_SECONDS=5,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pins'}},
+)
+class ReplicaRoutingMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.factory = RequestFactory()
+        self.routed_to = None
+
+        def get_response(request):
+            self.routed_to = PrimaryReplicaRouter().db_for_read(Product)
+            return HttpResponse(status=200)
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def request(self, method, path, user=None):
+        request = getattr(self.factory, method)(path)
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_get_reads_from_replica(self):
+        """GET-запрос читает с реплики"""
+        self.middleware(self.request('get', '/api/v1/products/stock/'))
+        self.assertEqual(self.routed_to, 'replica_1')
+
+    def test_write_pins_user(self):
+        """Запись идет в основную БД и закрепляет за ней пользователя, а не cookie клиента"""
+        user = SimpleNamespace(pk=7, is_authenticated=True)
+        response = self.middleware(self.request('post', '/api/v1/orders/1/items/', user))
+
+        self.assertEqual(self.routed_to, 'default')
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+        self.assertTrue(caches['default'].get(PRIMARY_PIN_KEY.format(7)))
+
+        # Следующее чтение того же пользователя (например, с JWT без cookie) — с основной БД
+        self.middleware(self.request('get', '/api/v1/orders/1/', user))
+        self.assertEqual(self.routed_to, 'default')
+        self.middleware(self.request('get', '/api/v1/orders/1/', SimpleNamespace(pk=8, is_authenticated=True)))
+        self.assertEqual(self.routed_to, 'replica_1')
+
+    def test_anonymous_write_pins_cookie(self):
+        """Анонимный клиент закрепляется cookie"""
+        response = self.middleware(self.request('post', '/api/v1/orders/1/items/'))
+
+        self.assertEqual(response.cookies[PRIMARY_PIN_COOKIE]['max-age'], 5)
+
+    def test_pinned_client_reads_from_primary(self):
+        """После записи клиент с cookie читает свои изменения с основной БД"""
+        request = self.request('get', '/api/v1/orders/1/')
+        request.COOKIES[PRIMARY_PIN_COOKIE] = '1'
+
+        self.middleware(request)
+        self.assertEqual(self.routed_to, 'default')
+
+    async def test_async_chain(self):
+        """В асинхронной цепочке middleware — корутина и так же направляет чтение на реплику"""
+        async def get_response(request):
+            self.routed_to = PrimaryReplicaRouter().db_for_read(Product)
+            return HttpResponse(status=200)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        await middleware(self.request('get', '/api/v1/products/stock/'))
+        self.assertEqual(self.routed_to, 'replica_1')
@@ -0,0 +1,105 @@
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.models import Product
+from orders.search import search_products
+from .factories import CategoryFactory, ProductFactory, UserFactory
+
+
+class SearchIndexTest(TestCase):
+    def search(self, query):
+        return list(search_products(Product.objects.all(), query).values_list('name', flat=True))
+
+    def test_prefix_matching(self):
+        """Слова ищутся по префиксу, все слова должны совпасть"""
+        ProductFactory(name='Беспроводная мышь')
+        ProductFactory(name='Проводная мышь')
+        ProductFactory(name='Клавиатура')
+
+        self.assertEqual(sorted(self.search('мыш')), ['Беспроводная мышь', 'Проводная мышь'])
+        self.assertEqual(self.search('беспров мыш'), ['Беспроводная мышь'])
+
+    def test_index_follows_save(self):
+        """Изменение названия через save() обновляет индекс"""
+        product = ProductFactory(name='Старое название')
+        product.name = 'Новое название'
+        product.save()
+
+        self.assertEqual(self.search('новое'), ['Новое название'])
+        self.assertEqual(self.search('старое'), [])
+
+    def test_index_follows_bulk_operations(self):
+        """bulk_create, update() и delete() тоже отражаются в индексе"""
+        category = CategoryFactory()
+        Product.objects.bulk_create([
+            Product(name='Кабель USB', quantity=1, price=1, category=category),
+            Product(name='Кабель HDMI', quantity=1, price=1, category=category),
+        ])
+        Product.objects.filter(name='Кабель HDMI').update(name='Переходник HDMI')
+        Product.objects.filter(name='Кабель USB').delete()
+
+        self.assertEqual(self.search('кабель'), [])
+        self.assertEqual(self.search('hdmi'), ['Переходник HDMI'])
+
+    def test_search_by_sku_and_description(self):
+        """Индекс включает SKU и описание"""
+        ProductFactory(name='Товар', sku='ABC-123', description='Подходит для ноутбука')
+
+        self.assertEqual(self.search('abc 123'), ['Товар'])
+        self.assertEqual(self.search('ноутбук'), ['Товар'])
+
+    def test_ranking_prefers_name(self):
+        """Совпадение в названии ранжируется выше совпадения в описании"""
+        ProductFactory(name='Чехол', description='Для телефона и планшета, телефон в комплекте не входит')
+        ProductFactory(name='Телефон', description='Смартфон')
+
+        results = search_products(Product.objects.all(), 'телефон').order_by('-search_rank')
+        self.assertEqual(results[0].name, 'Телефон')
+
+
+class ProductSearchViewTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.url = reverse('product-search')
+        self.category = CategoryFactory()
+        ProductFactory(name='Ноутбук игровой', category=self.category, quantity=5)
+        ProductFactory(name='Ноутбук офисный', quantity=0)
+        ProductFactory(name='Ноутбук старый', is_active=False)
+
+    def test_search(self):
+        """Поиск возвращает активные товары с рангом"""
+        response = self.client.get(self.url, {'q': 'ноут'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_count'], 2)
+        self.assertIn('search_rank', response.data['products'][0])
+
+    def test_filters(self):
+        """Фильтры по категории, наличию и активности"""
+        by_category = self.client.get(self.url, {'q': 'ноутбук', 'category': self.category.id})
+        in_stock = self.client.get(self.url, {'q': 'ноутбук', 'in_stock': 'true'})
+        inactive = self.client.get(self.url, {'q': 'ноутбук', 'is_active': 'false'})
+
+        self.assertEqual([p['name'] for p in by_category.data['products']], ['Ноутбук игровой'])
+        self.assertEqual([p['name'] for p in in_stock.data['products']], ['Ноутбук игровой'])
+        self.assertEqual([p['name'] for p in inactive.data['products']], ['Ноутбук старый'])
+
+    def test_query_required(self):
+        """Пустой запрос возвращает 400"""
+        response = self.client.get(self.url, {'q': '  '})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админ-панели использует тот же индекс"""
+        request = RequestFactory().get('/admin/orders/product/', {'q': 'игров'})
+        queryset, may_have_duplicates = site._registry[Product].get_search_results(
+            request, Product.objects.all(), 'игров'
+        )
+
+        self.assertEqual([p.name for p in queryset], ['Ноутбук игровой'])
+        self.assertFalse(may_have_duplicates)
+        self.assertIn('products_fts', str(queryset.query))
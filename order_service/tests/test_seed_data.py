@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.test import TestCase
+
+from orders.models import Category, Customer, Product, Order, OrderItem
+
+
+class SeedDataCommandTest(TestCase):
+    def seed(self, **options):
+        defaults = {
+            'seed': 7, 'root_categories': 2, 'category_depth': 3, 'category_children': 2,
+            'customers': 5, 'products': 12, 'orders': 20, 'max_items': 3, 'batch_size': 4,
+        }
+        defaults.update(options)
+        out = StringIO()
+        call_command('seed_data', stdout=out, **defaults)
+        return out.getvalue()
+
+    def test_creates_category_tree(self):
+        """Тест построения многоуровневого дерева категорий"""
+        self.seed()
+
+        self.assertEqual(Category.objects.count(), 2 + 4 + 8)
+        self.assertEqual(Category.objects.filter(parent__isnull=True).count(), 2)
+        leaf = Category.objects.filter(children__isnull=True).first()
+        self.assertEqual(len(leaf.get_full_path().split(' > ')), 3)
+        self.assertFalse(
+            Product.objects.filter(category__children__isnull=False).exists()
+        )
+
+    def test_creates_rows_and_reports_rate(self):
+        """Тест количества строк и вывода скорости вставки"""
+        output = self.seed()
+
+        self.assertEqual(Customer.objects.count(), 5)
+        self.assertEqual(Product.objects.count(), 12)
+        self.assertEqual(Order.objects.count(), 20)
+        self.assertTrue(OrderItem.objects.exists())
+        self.assertIn('rows/s', output)
+        self.assertIn('Order totals: 20 rows', output)
+
+    def test_order_totals_are_recalculated(self):
+        """Тест пересчета total_amount после массовой вставки"""
+        self.seed()
+
+        for order in Order.objects.annotate(
+            expected=Sum(F('items__quantity') * F('items__unit_price'))
+        ):
+            self.assertEqual(order.total_amount, order.expected)
+
+    def test_same_seed_is_deterministic(self):
+        """Тест воспроизводимости данных при одинаковом seed"""
+        def snapshot():
+            return (
+                list(Product.objects.order_by('id').values_list('name', 'quantity', 'price')),
+                list(OrderItem.objects.order_by('id').values_list(
+                    'order__customer__name', 'product__name', 'quantity'
+                )),
+            )
+
+        self.seed()
+        first = snapshot()
+        Order.objects.all().delete()
+        Customer.objects.all().delete()
+        Product.objects.all().delete()
+        Category.objects.all().delete()
+
+        self.seed()
+        self.assertEqual(snapshot(), first)
@@ -0,0 +1,159 @@
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.middleware import IdentityMapMiddleware, LoadSheddingMiddleware, ReplicaRoutingMiddleware
+from orders.shedding import HIGH, LOW, NORMAL, LatencyEwma, LoadTracker, priority_for, tracker
+from .factories import CustomerFactory, OrderFactory, ProductFactory, UserFactory
+
+
+@override_settings(
+    LOAD_SHEDDING_MAX_INFLIGHT=4,
+    LOAD_SHEDDING_DB_LATENCY_MS=100,
+    LOAD_SHEDDING_CONCURRENCY={'limited': 1},
+)
+class LoadTrackerTest(SimpleTestCase):
+    def setUp(self):
+        self.tracker = LoadTracker()
+
+    def test_endpoint_concurrency_limit(self):
+        """Лимит эндпоинта действует для любого приоритета и освобождается после запроса"""
+        self.assertIsNone(self.tracker.admit('limited', HIGH))
+        self.assertEqual(self.tracker.admit('limited', HIGH), 'concurrency')
+
+        self.tracker.release('limited')
+
+        self.assertIsNone(self.tracker.admit('limited', HIGH))
+        self.assertEqual(self.tracker.snapshot()['endpoints']['limited']['shed'], {'concurrency': 1})
+
+    def test_priorities_under_inflight_load(self):
+        """Низкий приоритет отклоняется раньше обычного, высокий не отклоняется"""
+        for _ in range(2):
+            self.assertIsNone(self.tracker.admit('write', HIGH))
+
+        self.assertEqual(self.tracker.admit('stock', LOW), 'inflight')
+        self.assertIsNone(self.tracker.admit('read', NORMAL))
+        self.assertIsNone(self.tracker.admit('read', NORMAL))
+        self.assertEqual(self.tracker.admit('read', NORMAL), 'inflight')
+        self.assertIsNone(self.tracker.admit('write', HIGH))
+        self.assertEqual(self.tracker.snapshot()['inflight'], 5)
+
+    def test_db_latency_sheds_low_priority(self):
+        """При высокой задержке БД отклоняются только низкоприоритетные запросы"""
+        for _ in range(30):
+            self.tracker.observe_query('write', 0.5, now=10)
+
+        self.assertEqual(self.tracker.admit('stock', LOW, now=10), 'db_latency')
+        self.assertIsNone(self.tracker.admit('read', NORMAL, now=10))
+        self.assertGreater(self.tracker.endpoint_latency['write'].value(10), 0.1)
+
+        # Без новых замеров задержка затухает, и запросы снова принимаются
+        self.assertIsNone(self.tracker.admit('stock', LOW, now=40))
+
+
+class PriorityTest(SimpleTestCase):
+    def test_method_specific_priority(self):
+        """Приоритет "МЕТОД имя" важнее приоритета имени URL"""
+        self.assertEqual(priority_for('order-list', 'POST'), HIGH)
+        self.assertEqual(priority_for('order-list', 'GET'), NORMAL)
+        self.assertEqual(priority_for('product-stock', 'GET'), LOW)
+
+
+class LatencyEwmaTest(SimpleTestCase):
+    def test_decay(self):
+        """Среднее сглаживает замеры и затухает с полупериодом"""
+        ewma = LatencyEwma(alpha=0.5, half_life=1)
+        ewma.observe(1.0, now=0)
+        ewma.observe(1.0, now=0)
+
+        self.assertAlmostEqual(ewma.value(0), 0.75)
+        self.assertAlmostEqual(ewma.value(1), 0.375)
+
+
+class LoadSheddingMiddlewareTest(APITestCase):
+    def setUp(self):
+        tracker.reset()
+        self.addCleanup(tracker.reset)
+        user = UserFactory()
+        self.client.force_authenticate(user=user)
+        self.async_client.force_login(user)
+        self.order = OrderFactory(customer=CustomerFactory())
+        self.product = ProductFactory(quantity=10, price=100)
+
+    def add_item(self):
+        return self.client.post(
+            reverse('add-order-item', kwargs={'order_id': self.order.id}),
+            {'product_id': self.product.id, 'quantity': 1}, format='json'
+        )
+
+    def test_requests_released(self):
+        """После ответа запрос не числится в обработке, задержка БД замерена"""
+        self.assertEqual(self.client.get(reverse('product-stock')).status_code, status.HTTP_200_OK)
+
+        stats = tracker.snapshot()
+        self.assertEqual(stats['inflight'], 0)
+        self.assertEqual(stats['endpoints']['product-stock']['inflight'], 0)
+        self.assertGreater(stats['endpoints']['product-stock']['db_latency_ms'], 0)
+
+    @override_settings(LOAD_SHEDDING_CONCURRENCY={'order-export': 1})
+    def test_streaming_response_holds_slot(self):
+        """Выгрузка числится в обработке, пока тело не отдано, ее запросы замеряются"""
+        first = self.client.get(reverse('order-export'))
+
+        self.assertEqual(tracker.snapshot()['endpoints']['order-export']['inflight'], 1)
+        self.assertEqual(
+            self.client.get(reverse('order-export')).status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+        self.assertIn(str(self.order.id).encode(), b''.join(first.streaming_content))
+        stats = tracker.snapshot()['endpoints']['order-export']
+        self.assertEqual(stats['inflight'], 0)
+        self.assertGreater(stats['db_latency_ms'], 0)
+        self.assertEqual(self.client.get(reverse('order-export')).status_code, status.HTTP_200_OK)
+
+    @override_settings(LOAD_SHEDDING_CONCURRENCY={'product-stock': 0})
+    def test_concurrency_limit_returns_503(self):
+        """Превышение лимита эндпоинта сразу отвечает 503 с Retry-After"""
+        response = self.client.get(reverse('product-stock'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertIn('error', response.json())
+
+    async def test_async_requests(self):
+        """Под ASGI middleware остаются асинхронными, запросы к БД в потоках замеряются"""
+        async def get_response(request):
+            return HttpResponse()
+
+        for middleware_class in [ReplicaRoutingMiddleware, IdentityMapMiddleware, LoadSheddingMiddleware]:
+            self.assertTrue(iscoroutinefunction(middleware_class(get_response)))
+        self.assertTrue(iscoroutinefunction(LoadSheddingMiddleware(get_response).process_view))
+
+        response = await self.async_client.get(reverse('async-product-stock'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = tracker.snapshot()['endpoints']['async-product-stock']
+        self.assertEqual(stats['inflight'], 0)
+        self.assertGreater(stats['db_latency_ms'], 0)
+
+    @override_settings(LOAD_SHEDDING_DB_LATENCY_MS=100)
+    def test_slow_database_keeps_order_writes(self):
+        """При медленной БД остатки отклоняются, запись заказов продолжается"""
+        for _ in range(30):
+            tracker.observe_query(None, 1.0)
+
+        self.assertEqual(
+            self.client.get(reverse('product-stock')).status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(self.add_item().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('order-list')).status_code, status.HTTP_200_OK)
+
+    @override_settings(LOAD_SHEDDING_ENABLED=False, LOAD_SHEDDING_CONCURRENCY={'product-stock': 0})
+    def test_disabled(self):
+        """Отключенный сброс нагрузки ничего не отклоняет"""
+        self.assertEqual(self.client.get(reverse('product-stock')).status_code, status.HTTP_200_OK)
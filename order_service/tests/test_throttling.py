@@ -0,0 +1,146 @@
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.models import RateLimitCounter
+from orders.routers import replica_reads
+from orders.throttling import CacheWindowCounters, DatabaseWindowCounters, UserSlidingWindowThrottle
+from .factories import UserFactory
+
+
+class ThreePerMinute(UserSlidingWindowThrottle):
+    rate = '3/min'
+
+
+def request_for(pk):
+    return SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=pk), META={})
+
+
+class SlidingWindowThrottleTest(TestCase):
+    throttle_class = ThreePerMinute
+
+    def allow(self, now, pk=1):
+        throttle = self.throttle_class()
+        throttle.timer = lambda: now
+        return throttle.allow_request(request_for(pk), None), throttle
+
+    def test_limit_within_window(self):
+        """Лимит действует на пользователя, отклоненные запросы не учитываются"""
+        results = [self.allow(600 + second)[0] for second in range(5)]
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertTrue(self.allow(605, pk=2)[0])
+        self.assertEqual(RateLimitCounter.objects.get(key='throttle_user_1').current, 3)
+
+    def test_previous_window_weight(self):
+        """Запросы предыдущего окна учитываются пропорционально перекрытию"""
+        for second in range(3):
+            self.allow(600 + second)
+
+        # Половина нового окна: 3 * 0.5 + 1 <= 3, следующий запрос — 3 * 0.5 + 2 > 3
+        self.assertTrue(self.allow(690)[0])
+        allowed, throttle = self.allow(690)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 10)
+
+        # Через окно без запросов счетчики обнуляются
+        self.assertTrue(self.allow(900)[0])
+        self.assertEqual(RateLimitCounter.objects.get().previous, 0)
+
+    def test_single_row_per_user(self):
+        """Состояние пользователя — одна строка независимо от числа запросов"""
+        for second in range(0, 600, 7):
+            self.allow(second)
+
+        self.assertEqual(RateLimitCounter.objects.count(), 1)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle'},
+})
+class CacheSlidingWindowThrottleTest(SlidingWindowThrottleTest):
+    """Те же проверки на кэше с атомарным incr (Redis, locmem)"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.throttle_class = type('CacheThrottle', (ThreePerMinute,), {'cache': caches['default']})
+
+    def test_limit_within_window(self):
+        """Лимит действует на пользователя, отклоненные запросы не учитываются"""
+        results = [self.allow(600 + second)[0] for second in range(5)]
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(caches['default'].get('throttle_user_1:10'), 3)
+
+    def test_previous_window_weight(self):
+        """Запросы предыдущего окна учитываются пропорционально перекрытию"""
+        for second in range(3):
+            self.allow(600 + second)
+
+        self.assertTrue(self.allow(690)[0])
+        self.assertFalse(self.allow(690)[0])
+
+    def test_single_row_per_user(self):
+        """Ключи хранятся два окна"""
+        counters = CacheWindowCounters(caches['default'])
+        self.assertEqual(counters.hit('k', 1, 60), (0, 1))
+        self.assertEqual(counters.hit('k', 2, 60), (1, 1))
+
+
+class WindowCountersTest(TestCase):
+    def test_database_counters_shift(self):
+        """Сдвиг окна переносит текущий счетчик в предыдущий одним UPDATE"""
+        counters = DatabaseWindowCounters()
+        counters.hit('k', 10, 60)
+        counters.hit('k', 10, 60)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(counters.hit('k', 11, 60), (2, 1))
+        self.assertEqual(counters.hit('k', 13, 60), (0, 1))
+
+
+    @override_settings(REPLICA_DATABASES=['replica_1'])
+    def test_database_counters_ignore_replicas(self):
+        """В GET-запросе с чтением с реплик счетчики читаются с основной БД"""
+        counters = DatabaseWindowCounters()
+        counters.hit('k', 10, 60)
+
+        with replica_reads():
+            self.assertEqual(counters.hit('k', 10, 60), (0, 2))
+
+
+class EndpointThrottleTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+
+    @override_settings(THROTTLE_ENDPOINT_RATES={'product-stock': '2/min'})
+    def test_global_endpoint_limit(self):
+        """Лимит эндпоинта общий для всех пользователей"""
+        self.client.get(reverse('product-stock'))
+        self.client.force_authenticate(user=UserFactory())
+        self.client.get(reverse('product-stock'))
+
+        response = self.client.get(reverse('product-stock'))
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.client.get(reverse('order-list')).status_code, status.HTTP_200_OK)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'},
+    })
+    def test_bench_command(self):
+        """Команда bench_throttle выводит строку на режим и число потоков"""
+        out = StringIO()
+
+        call_command(
+            'bench_throttle', '--duration=0.05', '--target-rate=200', '--threads', '1', stdout=out
+        )
+
+        self.assertEqual(len(out.getvalue().strip().splitlines()), 3)
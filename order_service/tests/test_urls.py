@@ -3,7 +3,7 @@ from django.urls import reverse, resolve
 
 from orders import urls
 from orders.views import (
-    AddOrderItemView, OrderDetailView, OrderListView,
+    AddOrderItemView, OrderDetailView, OrderExportView, OrderListView,
     OrderStatusUpdateView, ProductStockView
 )
 
@@ -47,6 +47,14 @@ class URLTests(TestCase):
         resolver = resolve('/api/v1/orders/')
         self.assertEqual(resolver.func.view_class, OrderListView)
 
+    def test_order_export_url(self):
+        """Тест URL для потоковой выгрузки заказов"""
+        url = reverse('order-export')
+        self.assertEqual(url, '/api/v1/orders/export/')
+
+        resolver = resolve('/api/v1/orders/export/')
+        self.assertEqual(resolver.func.view_class, OrderExportView)
+
     def test_product_stock_url(self):
         """Тест URL для информации о запасах товаров"""
         url = reverse('product-stock')
@@ -62,7 +70,8 @@ class URLTests(TestCase):
             'order-detail', 
             'order-status-update',
             'order-list',
-            'product-stock'
+            'product-stock',
+            'metrics'
         ]
 
         for name in url_names:
@@ -77,7 +86,7 @@ class URLTests(TestCase):
     def test_url_patterns_count(self):
         """Тест количества URL-паттернов"""
         from orders import urls
-        self.assertEqual(len(urls.urlpatterns), 5)
+        self.assertEqual(len(urls.urlpatterns), 19)
 
     def test_url_parameters(self):
         """Тест параметров в URL"""
@@ -248,7 +257,21 @@ class URLPatternAttributesTests(TestCase):
                     'order-detail',
                     'order-status-update', 
                     'order-list',
-                    'product-stock'
+                    'order-batch',
+                    'order-export',
+                    'product-stock',
+                    'product-availability',
+                    'product-import',
+                    'product-search',
+                    'product-watchlist',
+                    'customer-lookup',
+                    'customer-orders',
+                    'async-order-detail',
+                    'async-order-list',
+                    'async-product-stock',
+                    'job-create',
+                    'job-status',
+                    'metrics'
                 ])
 
 
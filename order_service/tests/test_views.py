@@ -105,6 +105,16 @@ class OrderDetailViewTest(APITestCase):
         self.assertIn('customer_name', response.data)
         self.assertIn('items', response.data)
 
+    def test_get_order_detail_with_items(self):
+        """Получение деталей заказа с позициями"""
+        OrderItemFactory(order=self.order, quantity=3, unit_price=100)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['items']), 1)
+        self.assertEqual(response.data['items'][0]['total_price'], '300.00')
+
     def test_get_nonexistent_order(self):
         """Попытка получить несуществующий заказ"""
         url = reverse('order-detail', kwargs={'order_id': 999})
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders import inventory
+from orders.imports import ProductImporter
+from orders.models import Product, StockAlert
+from orders.watchlist import sync_watchlist
+from .factories import CategoryFactory, OrderFactory, ProductFactory, UserFactory
+
+
+def alert_level(product):
+    alert = StockAlert.objects.filter(product=product).first()
+    return alert.level if alert else None
+
+
+@override_settings(LOW_STOCK_THRESHOLD=10)
+class StockWatchlistTest(TestCase):
+    def test_threshold_crossing(self):
+        """Строка появляется, меняется и удаляется при пересечении порогов"""
+        product = ProductFactory(quantity=12)
+        self.assertIsNone(alert_level(product))
+
+        for quantity, level in [(9, 'low'), (0, 'out'), (5, 'low'), (20, None)]:
+            product.quantity = quantity
+            product.save(update_fields=['quantity'])
+            self.assertEqual(alert_level(product), level)
+
+    def test_no_watchlist_write_without_crossing(self):
+        """Изменение остатка без пересечения порога не трогает список"""
+        product = Product.objects.get(pk=ProductFactory(quantity=50).pk)
+        product.quantity = 40
+
+        with CaptureQueriesContext(connection) as context:
+            product.save(update_fields=['quantity'])
+
+        self.assertFalse(any('stock_watchlist' in query['sql'] for query in context.captured_queries))
+
+    def test_product_and_category_thresholds(self):
+        """Порог товара важнее порога категории, порог категории — значения по умолчанию"""
+        category = CategoryFactory(low_stock_threshold=30)
+        by_category = ProductFactory(quantity=25, category=category)
+        own = ProductFactory(quantity=25, category=category, low_stock_threshold=5)
+
+        self.assertEqual(alert_level(by_category), 'low')
+        self.assertIsNone(alert_level(own))
+
+        category.low_stock_threshold = 20
+        category.save()
+
+        self.assertIsNone(alert_level(by_category))
+
+    def test_sync_repairs_bulk_updates(self):
+        """sync_watchlist пересчитывает уровни после UPDATE в обход save()"""
+        low = ProductFactory(quantity=3)
+        high = ProductFactory(quantity=100)
+        Product.objects.filter(pk=low.pk).update(quantity=100)
+        Product.objects.filter(pk=high.pk).update(quantity=0)
+
+        self.assertEqual(sync_watchlist(batch_size=1), 2)
+        self.assertIsNone(alert_level(low))
+        self.assertEqual(alert_level(high), 'out')
+
+    def test_import_and_reconcile(self):
+        """Импорт и reconcile шардированных товаров обновляют список"""
+        CategoryFactory(name='Книги')
+        ProductImporter().run(StringIO('sku,name,quantity,price,category\nB-1,Книга,2,10,Книги\n'), 'csv')
+        self.assertEqual(alert_level(Product.objects.get(sku='B-1')), 'low')
+
+        product = inventory.enable_sharding(ProductFactory(quantity=12), shards=2)
+        inventory.reserve(product.id, 6)
+        inventory.reconcile()
+        self.assertEqual(alert_level(product), 'low')
+
+    def test_sync_command(self):
+        """Команда sync_stock_watchlist пересчитывает каталог"""
+        product = ProductFactory(quantity=100)
+        Product.objects.filter(pk=product.pk).update(quantity=1)
+        out = StringIO()
+
+        call_command('sync_stock_watchlist', stdout=out)
+
+        self.assertIn('1 rows changed', out.getvalue())
+        self.assertEqual(alert_level(product), 'low')
+
+
+@override_settings(LOW_STOCK_THRESHOLD=10)
+class StockWatchlistViewTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=UserFactory())
+        self.url = reverse('product-watchlist')
+        self.low = ProductFactory(quantity=4)
+        self.out = ProductFactory(quantity=0)
+        ProductFactory(quantity=0, is_active=False)
+        ProductFactory(quantity=500)
+
+    def test_watchlist(self):
+        """Эндпоинт отдает только товары из списка наблюдения"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({p['product_id'] for p in response.data['products']}, {self.low.id, self.out.id})
+        self.assertEqual(response.data['low_stock_count'], 1)
+        self.assertEqual(response.data['out_of_stock_count'], 1)
+
+        out_only = self.client.get(self.url, {'level': 'out'})
+        self.assertEqual([p['product_id'] for p in out_only.data['products']], [self.out.id])
+
+    def test_invalid_level(self):
+        """Неизвестный уровень возвращает 400"""
+        response = self.client.get(self.url, {'level': 'soon'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_add_item_crossing(self):
+        """Добавление в заказ, опустившее остаток до порога, попадает в список"""
+        product = ProductFactory(quantity=12)
+        order = OrderFactory()
+
+        self.client.post(
+            reverse('add-order-item', args=[order.id]),
+            {'product_id': product.id, 'quantity': 3}, format='json'
+        )
+
+        self.assertEqual(alert_level(product), 'low')
+        stock = self.client.get(reverse('product-stock'), {'low_stock': 'true'})
+        self.assertIn(product.id, [p['id'] for p in stock.data['products']])